@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Asyncio (ASGI) variant of the internal link storage server.
+
+Serves the same routes and JSON shapes as the Flask app in
+``storage_server.py``, so pages generated with ``--server-url`` work against
+either server. Requests are handled on a single event loop instead of a
+thread per request; backends that touch the disk on the request path (SQLite,
+or the JSON file in shared mode) run in worker threads so the loop never
+blocks on I/O.
+
+The app has no dependencies beyond the standard library. Run it with any
+ASGI server, for example::
+
+    uvicorn async_storage_server:app --port 5000
+
+or ``python async_storage_server.py``, which uses uvicorn when installed.
+Storage is configured with the same ``STORAGE_*`` environment variables as
+the Flask server.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import time
+import traceback
+from urllib.parse import parse_qs
+
+from link_metrics import CONTENT_TYPE, REQUEST_SECONDS, REQUESTS, render, watch_store
+from link_storage import open_backend_from_env
+from link_streams import (IMPORT_BATCH_SIZE, JSON_TYPE, NDJSON_TYPE, NdjsonDecoder,
+                          NdjsonError, compress_chunks, export_format, is_link_store,
+                          iter_export, make_etag, negotiate_encoding)
+
+store = open_backend_from_env()
+atexit.register(store.close)
+watch_store(store)
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-expose-headers', b'ETag, X-Links-Revision'),
+]
+
+
+async def call_store(method, *args):
+    """Call a backend method without blocking the event loop on disk I/O."""
+    if store.blocking_io:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+def json_body(body: bytes):
+    """Parse a request body like ``get_json(force=True, silent=True)``."""
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def etag_matches(headers: dict, etag: str) -> bool:
+    header = headers.get(b'if-none-match')
+    if not header:
+        return False
+    for tag in header.decode('latin-1').split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag in ('*', etag):
+            return True
+    return False
+
+
+class Response:
+    def __init__(self, body=b'', status=200, content_type=b'application/json', headers=None):
+        self.body = body
+        self.status = status
+        self.headers = [(b'content-type', content_type)] if body or status == 200 else []
+        self.headers.extend(headers or [])
+
+    @classmethod
+    def json(cls, payload, status=200, headers=None):
+        body = json.dumps(payload, separators=(',', ':')).encode() + b'\n'
+        return cls(body, status, headers=headers)
+
+    async def send(self, send, include_body=True):
+        headers = self.headers + CORS_HEADERS + [(b'content-length', str(len(self.body)).encode())]
+        await send({'type': 'http.response.start', 'status': self.status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': self.body if include_body else b''})
+
+
+class StreamingResponse(Response):
+    """Response whose body is produced chunk by chunk from an iterator."""
+
+    def __init__(self, chunks, content_type, headers=None):
+        super().__init__(b'', 200, content_type, headers)
+        self.chunks = chunks
+
+    async def send(self, send, include_body=True):
+        await send({'type': 'http.response.start', 'status': self.status,
+                    'headers': self.headers + CORS_HEADERS})
+        if include_body:
+            while True:
+                # Producing a chunk may read from the backend.
+                chunk = await call_store(next, self.chunks, None)
+                if chunk is None:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+async def versioned(headers: dict, payload, revision: int, etag_revision=None) -> Response:
+    """Async counterpart of ``storage_server.versioned``."""
+    extra = [(b'x-links-revision', str(revision).encode())]
+    if etag_revision is not None:
+        etag = make_etag(await call_store(store.epoch), etag_revision)
+        extra.append((b'etag', etag.encode()))
+        if etag_matches(headers, etag):
+            return Response(status=304, headers=extra)
+    if callable(payload):
+        payload = await call_store(payload)
+    return Response.json(payload, headers=extra)
+
+
+async def get_links(url, headers, query, body):
+    revision = await call_store(store.revision)
+    url_revision = await call_store(store.url_revision, url)
+    return await versioned(headers, lambda: store.get(url), revision, url_revision)
+
+
+async def save_links(url, headers, query, body):
+    links = json_body(body)
+    if not isinstance(links, list):
+        return Response.json({'error': 'expected a JSON array of links'}, status=400)
+    revision = await call_store(store.set, url, links)
+    return Response.json({'status': 'ok', 'revision': revision})
+
+
+async def get_links_batch(headers, query, body):
+    payload = json_body(body) or {}
+    urls = payload.get('urls') if isinstance(payload, dict) else payload
+    if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+        return Response.json({'error': 'expected {"urls": [...]}'}, status=400)
+    revision = await call_store(store.revision)
+    return await versioned(headers, await call_store(store.get_many, urls), revision)
+
+
+async def get_changes(headers, query, body):
+    try:
+        since = int(query.get('since', ['0'])[0])
+    except ValueError:
+        since = 0
+    revision, changes = await call_store(store.changes, since)
+    if since > revision:
+        everything = await call_store(store.all)
+        return await versioned(headers, {'revision': revision, 'changes': everything, 'reset': True},
+                               revision)
+    return await versioned(headers, {'revision': revision, 'changes': changes}, revision)
+
+
+async def get_all(headers, query, body):
+    revision = await call_store(store.revision)
+    fmt = export_format(query.get('format', [''])[0],
+                        headers.get(b'accept', b'').decode('latin-1'))
+    encoding = negotiate_encoding(headers.get(b'accept-encoding', b'').decode('latin-1'))
+    variant = ''.join(f'-{part}' for part in (fmt, encoding) if part and part != 'json')
+    etag = make_etag(await call_store(store.epoch), revision, variant)
+    extra = [(b'x-links-revision', str(revision).encode()), (b'etag', etag.encode()),
+             (b'vary', b'Accept, Accept-Encoding')]
+    if etag_matches(headers, etag):
+        return Response(status=304, headers=extra)
+    if encoding:
+        extra.append((b'content-encoding', encoding.encode()))
+    items = await call_store(store.iter_items)
+    chunks = compress_chunks(iter_export(items, fmt), encoding)
+    content_type = NDJSON_TYPE if fmt == 'ndjson' else JSON_TYPE
+    return StreamingResponse(chunks, content_type.encode(), headers=extra)
+
+
+async def save_all(headers, query, body):
+    payload = json_body(body)
+    if not is_link_store(payload):
+        return Response.json({'error': 'expected {"<page url>": [...], ...}'}, status=400)
+    revision = await call_store(store.replace, payload)
+    return Response.json({'status': 'ok', 'revision': revision})
+
+
+async def import_ndjson(headers, receive):
+    """Merge an NDJSON upload into the store while it streams in."""
+    revision = await call_store(store.revision)
+    imported = 0
+    batch = {}
+    try:
+        decoder = NdjsonDecoder(headers.get(b'content-encoding', b'').decode('latin-1'))
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get('more_body', False)
+            batch.update(decoder.feed(message.get('body', b'')))
+            if not more_body:
+                batch.update(decoder.finish())
+            if batch and (len(batch) >= IMPORT_BATCH_SIZE or not more_body):
+                revision = await call_store(store.merge, batch)
+                imported += len(batch)
+                batch = {}
+    except NdjsonError as e:
+        return Response.json({'error': str(e), 'imported': imported, 'revision': revision},
+                             status=400)
+    return Response.json({'status': 'ok', 'imported': imported, 'revision': revision})
+
+
+async def metrics(headers, query, body):
+    # Gauges stat the data files, so render off the event loop.
+    text = await call_store(render)
+    return Response(text.encode(), content_type=CONTENT_TYPE.encode())
+
+
+async def ping(headers, query, body):
+    return Response(b'pong', content_type=b'text/html; charset=utf-8')
+
+
+# Fixed routes, tried before the ``/links/<path:url>`` routes just like
+# Flask prefers static rules over converters.
+ROUTES = {
+    ('POST', '/links/batch'): get_links_batch,
+    ('GET', '/links/changes'): get_changes,
+    ('GET', '/links'): get_all,
+    ('POST', '/links'): save_all,
+    ('GET', '/metrics'): metrics,
+    ('GET', '/ping'): ping,
+}
+URL_ROUTES = {
+    'GET': get_links,
+    'POST': save_links,
+}
+
+
+async def dispatch(method: str, path: str, headers: dict, query: dict, body: bytes) -> Response:
+    if method == 'OPTIONS':
+        # CORS preflight, answered the way Flask-CORS does.
+        allow_headers = headers.get(b'access-control-request-headers', b'')
+        return Response(content_type=b'text/html; charset=utf-8', headers=[
+            (b'access-control-allow-methods', b'DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT'),
+            (b'access-control-allow-headers', allow_headers),
+        ])
+    if method == 'HEAD':
+        method = 'GET'
+    handler = ROUTES.get((method, path))
+    if handler is not None:
+        return await handler(headers, query, body)
+    if path.startswith('/links/') and len(path) > len('/links/'):
+        handler = URL_ROUTES.get(method)
+        if handler is None:
+            return Response(b'Method Not Allowed', 405, b'text/plain')
+        return await handler(path[len('/links/'):], headers, query, body)
+    if any(path == route_path for _, route_path in ROUTES):
+        return Response(b'Method Not Allowed', 405, b'text/plain')
+    return Response(b'Not Found', 404, b'text/plain')
+
+
+def route_label(path: str) -> str:
+    """Metrics label for ``path``, spelled like the Flask route rule."""
+    if any(path == route_path for _, route_path in ROUTES):
+        return path
+    if path.startswith('/links/') and len(path) > len('/links/'):
+        return '/links/<path:url>'
+    return 'unmatched'
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # Persist pending writes before the server exits.
+            await asyncio.to_thread(store.close)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    start = time.perf_counter()
+    headers = dict(scope['headers'])
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    content_type = headers.get(b'content-type', b'').split(b';')[0].strip().decode('latin-1')
+    try:
+        if scope['method'] == 'POST' and scope['path'] == '/links' and content_type == NDJSON_TYPE:
+            response = await import_ndjson(headers, receive)
+        else:
+            body = await read_body(receive)
+            response = await dispatch(scope['method'], scope['path'], headers, query, body)
+    except Exception:
+        # Answer and count the request like Flask does for an unhandled error.
+        traceback.print_exc()
+        response = Response(b'Internal Server Error', 500, b'text/plain')
+    route = route_label(scope['path'])
+    REQUESTS.inc(route=route, method=scope['method'], status=response.status)
+    REQUEST_SECONDS.observe(time.perf_counter() - start, route=route)
+    await response.send(send, include_body=scope['method'] != 'HEAD')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve internal links with an asyncio server")
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=5000, help='Port to listen on')
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is required to run the server directly: pip install uvicorn")
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
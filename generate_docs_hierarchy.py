@@ -3,19 +3,367 @@
 
 The generated HTML allows users to store custom internal links for each page.
 Each link can have a custom name and description which are persisted in the
-browser's localStorage. Optionally, links can be saved to and loaded from a
-remote server if a storage URL is provided when generating the HTML.
+browser's IndexedDB (or localStorage where IndexedDB is unavailable).
+Optionally, links can be saved to and loaded from a remote server if a
+storage URL is provided when generating the HTML.
+
+With ``--shard-dir`` the taxonomy is not inlined into the HTML. Instead each
+top-level section is written to its own content-hashed JSON file, which the
+page fetches when the section is first expanded.
+
+A search index over page titles, descriptions and headings is written next
+to the page as a separate script, loaded the first time the search box is
+used.
+
+With ``--server-url`` the page queues edits and sends them to the server in
+batches, and a service worker written next to the page keeps the page, its
+taxonomy and the last known link store available offline.
+
+``--compact`` embeds the taxonomy in a columnar encoding with base-URL
+relative links and a string table, which the page expands on load.
+
+Builds are incremental: a stamp file next to the output records a hash of
+the taxonomy, this generator and the options, and an unchanged build is
+skipped. Use ``--force`` to rebuild anyway.
 """
+import hashlib
 import json
 import argparse
+import os
+import re
+import tempfile
+from collections import Counter
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+COMPACT_FORMAT = 'compact-v1'
+
+# Page fields covered by the search index and the weight of a match in each.
+SEARCH_FIELDS = (('title', 3), ('h1_heading', 2), ('description', 1), ('h2_headings', 1))
+
+
+def count_pages(section: dict) -> int:
+    """Number of pages in ``section`` and all of its subsections."""
+    return len(section.get('pages') or []) + sum(
+        count_pages(sub) for sub in (section.get('subsections') or {}).values())
+
+
+def write_asset(directory: Path, prefix: str, extension: str, body: bytes) -> str:
+    """Write ``body`` to ``<prefix>.<content hash>.<extension>`` and return the name.
+
+    Files are named after their content, so an existing file is never
+    rewritten and can be cached forever. The body goes to a temporary file
+    that is renamed into place, so a hashed name never holds a partial file.
+    """
+    name = f"{prefix}.{hashlib.sha256(body).hexdigest()[:16]}.{extension}"
+    path = directory / name
+    if path.exists():
+        return name
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return name
+
+
+def write_hashed(directory: Path, prefix: str, payload) -> str:
+    """Write ``payload`` as a content-hashed JSON file and return the name."""
+    return write_asset(directory, prefix, 'json', json.dumps(payload, separators=(',', ':')).encode())
+
+
+def write_shards(data: dict, shard_dir: Path, prefix: str) -> Tuple[str, List[str]]:
+    """Split the taxonomy into an index plus one shard per top-level section.
+
+    The index lists each section's title, page count and shard file name.
+    File names start with ``prefix`` so that several pages can share one
+    shard directory. Returns the file name of the index and those of the
+    shards.
+    """
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    sections = []
+    for i, (key, section) in enumerate(data.get('structure', {}).items()):
+        slug = re.sub(r'[^a-z0-9]+', '-', key.lower()).strip('-') or 'section'
+        sections.append({
+            'title': section.get('title', key),
+            'pages': count_pages(section),
+            'shard': write_hashed(shard_dir, f"{prefix}.section-{i}-{slug}", section),
+        })
+    index = write_hashed(shard_dir, f"{prefix}.index", {'metadata': data.get('metadata', {}),
+                                                       'sections': sections})
+    return index, [section['shard'] for section in sections]
+
+
+def prune_assets(directory: Path, keep: Iterable[str], patterns: Iterable[str]) -> List[str]:
+    """Delete content-hashed files in ``directory`` that are not in ``keep``.
+
+    Only file names fully matching one of the regular expressions in
+    ``patterns`` are considered. Returns the names of the deleted files.
+    """
+    keep = set(keep)
+    pattern = re.compile('|'.join(f'(?:{p})' for p in patterns))
+    removed = []
+    for path in sorted(directory.iterdir()):
+        if path.is_file() and path.name not in keep and pattern.fullmatch(path.name):
+            path.unlink()
+            removed.append(path.name)
+    return removed
+
+
+def iter_pages(structure: dict, path: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], dict]]:
+    """Yield ``(section titles, page)`` for every page, depth first.
+
+    Sections and pages that are not objects are skipped.
+    """
+    if not isinstance(structure, dict):
+        return
+    for key, section in structure.items():
+        if not isinstance(section, dict):
+            continue
+        section_path = path + (section.get('title', key),)
+        pages = section.get('pages')
+        for page in pages if isinstance(pages, list) else []:
+            if isinstance(page, dict):
+                yield section_path, page
+        yield from iter_pages(section.get('subsections'), section_path)
+
+
+def tokenize(text: str) -> List[str]:
+    # Lowercase rather than casefold, to match toLowerCase() in the page.
+    return re.findall(r'\w+', text.lower())
+
+
+def build_search_index(data: dict) -> dict:
+    """Build an inverted index over the pages in ``data``.
+
+    ``docs`` holds ``[title, url, section]`` per page, with ``section`` an
+    index into ``sections``. Terms are sorted and front-coded: term ``i`` is
+    the first ``prefixes[i]`` characters of term ``i - 1`` followed by
+    ``suffixes[i]``. Because they are sorted, all terms sharing a prefix sit in
+    one run that the page finds with a binary search. ``postings[i]`` lists
+    the pages containing term ``i`` as ``doc gap * 4 + weight``, where
+    ``weight`` is the best ``SEARCH_FIELDS`` weight the term has on that page.
+    """
+    docs, sections, section_ids = [], [], {}
+    weights: Dict[str, Dict[int, int]] = {}
+    for section_path, page in iter_pages(data.get('structure', {})):
+        label = ' › '.join(section_path)
+        if label not in section_ids:
+            section_ids[label] = len(sections)
+            sections.append(label)
+        doc = len(docs)
+        docs.append([page.get('title', ''), page.get('url', ''), section_ids[label]])
+        for field, weight in SEARCH_FIELDS:
+            value = page.get(field)
+            if isinstance(value, list):
+                value = ' '.join(v for v in value if isinstance(v, str))
+            if not isinstance(value, str):
+                continue
+            for term in tokenize(value):
+                postings = weights.setdefault(term, {})
+                postings[doc] = max(postings.get(doc, 0), weight)
 
+    prefixes, suffixes, postings = [], [], []
+    previous = ''
+    for term in sorted(weights):
+        shared = len(os.path.commonprefix([previous, term]))
+        prefixes.append(shared)
+        suffixes.append(term[shared:])
+        encoded, last = [], 0
+        for doc, weight in sorted(weights[term].items()):
+            encoded.append((doc - last) * 4 + weight)
+            last = doc
+        postings.append(encoded)
+        previous = term
+    return {'sections': sections, 'docs': docs, 'prefixes': prefixes,
+            'suffixes': suffixes, 'postings': postings}
 
-def build_html(data: dict, server_url: Optional[str] = None) -> str:
-    json_str = json.dumps(data)
+
+def relative_url(url, base: str) -> Optional[str]:
+    """``url`` relative to ``base``, or None when it is not below ``base``."""
+    if not base or not isinstance(url, str) or not url.startswith(base):
+        return None
+    rest = url[len(base):]
+    return rest if rest[:1] in ('', '/', '?', '#') else None
+
+
+def encode_compact(data: dict) -> dict:
+    """Encode a taxonomy for embedding, dropping the per-page redundancy.
+
+    Each section's pages become one array per field. Fields listed in
+    ``tabled`` hold only strings; values that occur more than once anywhere
+    in the taxonomy, such as "No description available", move to the shared
+    ``strings`` table and are replaced by their index. URLs below
+    ``metadata.base_url`` keep only the remainder. A section whose pages do
+    not all have the same fields, or whose URLs are not all below the base,
+    keeps its plain list of pages, so decoding gives back exactly the input.
+    """
+    if not isinstance(data, dict) or {'format', 'base', 'strings', 'tabled'} & set(data):
+        return data
+    base = (data.get('metadata') or {}).get('base_url') or ''
+    pages = [page for _, page in iter_pages(data.get('structure', {}))]
+    string_fields = {key for page in pages for key, value in page.items() if isinstance(value, str)}
+    tabled = [key for key in sorted(string_fields - {'url'})
+              if all(isinstance(page[key], str) for page in pages if key in page)]
+    counts = Counter(page[key] for page in pages for key in tabled if key in page)
+    strings = sorted((text for text, n in counts.items() if n > 1), key=lambda text: -counts[text])
+    string_ids = {text: i for i, text in enumerate(strings)}
+
+    def encode_pages(section_pages):
+        if not section_pages or not all(isinstance(page, dict) for page in section_pages):
+            return section_pages
+        keys = list(section_pages[0])
+        if any(list(page) != keys for page in section_pages):
+            return section_pages
+        columns = {}
+        for key in keys:
+            values = [page[key] for page in section_pages]
+            if key == 'url':
+                values = [relative_url(url, base) for url in values]
+                if None in values:
+                    return section_pages
+            elif key in tabled:
+                values = [string_ids.get(value, value) for value in values]
+            columns[key] = values
+        return columns
+
+    def encode_section(section):
+        if not isinstance(section, dict):
+            return section
+        encoded = dict(section)
+        if 'pages' in section:
+            encoded['pages'] = encode_pages(section['pages'])
+        if isinstance(section.get('subsections'), dict):
+            encoded['subsections'] = {key: encode_section(sub)
+                                      for key, sub in section['subsections'].items()}
+        return encoded
+
+    compact = {'format': COMPACT_FORMAT, 'base': base, 'tabled': tabled, 'strings': strings}
+    for key, value in data.items():
+        if key == 'structure' and isinstance(value, dict):
+            value = {k: encode_section(section) for k, section in value.items()}
+        compact[key] = value
+    return compact
+
+
+def write_search_index(data: dict, directory: Path, prefix: str) -> str:
+    """Write the search index as a content-hashed script and return its name.
+
+    The index is wrapped in a ``searchIndexLoaded(...)`` call rather than
+    served as JSON so the page can load it with a script tag, which also
+    works for pages opened from ``file://``.
+    """
+    index = json.dumps(build_search_index(data), separators=(',', ':'), ensure_ascii=False)
+    body = f"searchIndexLoaded({index});\n".encode()
+    return write_asset(directory, prefix, 'js', body)
+
+
+SERVICE_WORKER_JS = """\
+// Service worker for the docs hierarchy page, written by generate_docs_hierarchy.py.
+// The page and the link store are fetched from the network first and served
+// from the cache when offline; content-hashed assets never change, so they
+// are served from the cache first.
+const CACHE = 'docs-hierarchy-v1';
+
+self.addEventListener('install', () => self.skipWaiting());
+self.addEventListener('activate', event => event.waitUntil(self.clients.claim()));
+
+self.addEventListener('fetch', event => {
+  const request = event.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+  if (LINKS_URL && url.search === '' && url.href === new URL(LINKS_URL).href) {
+    event.respondWith(networkFirst(request));
+  } else if (url.origin === self.location.origin) {
+    const hashed = /\\.[0-9a-f]{16}\\.(json|js)$/.test(url.pathname);
+    event.respondWith(hashed ? cacheFirst(request) : networkFirst(request));
+  }
+});
+
+async function networkFirst(request) {
+  const cache = await caches.open(CACHE);
+  try {
+    const response = await fetch(request);
+    if (response.ok) await cache.put(request, response.clone());
+    return response;
+  } catch (e) {
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    throw e;
+  }
+}
+
+async function cacheFirst(request) {
+  const cache = await caches.open(CACHE);
+  const cached = await cache.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok) await cache.put(request, response.clone());
+  return response;
+}
+"""
+
+
+def write_service_worker(directory: Path, name: str, server_url: Optional[str]) -> str:
+    """Write the page's service worker and return its file name.
+
+    The name stays the same across builds, which is how browsers detect an
+    updated worker.
+    """
+    links_url = json.dumps(f"{server_url.rstrip('/')}/links" if server_url else None)
+    write_if_changed(directory / name, [f"const LINKS_URL = {links_url};\n", SERVICE_WORKER_JS])
+    return name
+
+
+def iter_taxonomy_json(data, separators: Tuple[str, str] = (', ', ': ')) -> Iterator[str]:
+    """Serialize ``data`` exactly like ``json.dumps(data, separators=...)``, in pieces.
+
+    A taxonomy is emitted one top-level section at a time, so no more than
+    one section is ever held as a string. Anything else falls back to the
+    encoder's own incremental output.
+    """
+    item_sep, key_sep = separators
+    structure = data.get('structure') if isinstance(data, dict) else None
+    if not isinstance(structure, dict) or not all(isinstance(k, str) for k in data):
+        yield from json.JSONEncoder(separators=separators).iterencode(data)
+        return
+    yield '{'
+    for i, (key, value) in enumerate(data.items()):
+        yield (item_sep if i else '') + json.dumps(key) + key_sep
+        if key != 'structure' or not all(isinstance(k, str) for k in structure):
+            yield json.dumps(value, separators=separators)
+            continue
+        yield '{'
+        for j, (section_key, section) in enumerate(structure.items()):
+            yield ((item_sep if j else '') + json.dumps(section_key) + key_sep
+                   + json.dumps(section, separators=separators))
+        yield '}'
+    yield '}'
+
+
+def iter_html(data: Optional[dict], server_url: Optional[str] = None,
+              shard_index_url: Optional[str] = None,
+              search_index_url: Optional[str] = None,
+              service_worker_url: Optional[str] = None) -> Iterator[str]:
+    """Yield the page in pieces, serializing the taxonomy as it goes.
+
+    Pass ``data=None`` and the URL of an index written by ``write_shards`` as
+    ``shard_index_url`` to load the taxonomy from shards instead of inlining it.
+    The search box is only shown when ``search_index_url`` points to a script
+    written by ``write_search_index``. ``service_worker_url`` is registered
+    when the page is served over HTTP.
+    """
     server_json = json.dumps(server_url) if server_url else 'null'
-    html = f"""
+    shard_index_json = json.dumps(shard_index_url) if shard_index_url else 'null'
+    search_index_json = json.dumps(search_index_url) if search_index_url else 'null'
+    service_worker_json = json.dumps(service_worker_url) if service_worker_url else 'null'
+    search_box = ('<input type="search" id="search" placeholder="Search pages" autocomplete="off">'
+                  if search_index_url else '')
+    yield f"""
 <!doctype html>
 <html lang="en">
 <head>
@@ -30,6 +378,12 @@ def build_html(data: dict, server_url: Optional[str] = None) -> str:
  button {{ margin-left: 4px; }}
  .description {{ color: #555; margin-left: 4px; }}
  #toolbar {{ margin-bottom: 1em; }}
+ #search {{ margin-left: 1em; width: 20em; }}
+ #search-results {{ padding-left: 0; }}
+ .virtual-list {{ max-height: 70vh; overflow-y: auto; }}
+ .virtual-list > ul {{ position: relative; margin: 0; padding-left: 0; }}
+ .virtual-list > ul > li {{ position: absolute; left: 0; right: 0; margin: 0; padding: 2px 0; }}
+ .load-error {{ color: #b00020; margin-left: 1em; }}
 </style>
 </head>
 <body>
@@ -38,26 +392,160 @@ def build_html(data: dict, server_url: Optional[str] = None) -> str:
   <button id="export-links">Export Links</button>
   <button id="import-links">Import Links</button>
   <input type="file" id="import-file" style="display:none" accept="application/json">
+  {search_box}
+  <span id="sync-status" class="description"></span>
+  <button id="export-rejected" hidden>Export Rejected Edits</button>
  </div>
+ <ul id="search-results" hidden></ul>
  <div id="tree"></div>
-<script id="taxonomy-data" type="application/json">{json_str}</script>
+<script id="taxonomy-data" type="application/json">"""
+    # The compact encoding drops the whitespace too.
+    compact = isinstance(data, dict) and data.get('format') == COMPACT_FORMAT
+    yield from iter_taxonomy_json(data, (',', ':') if compact else (', ', ': '))
+    yield f"""</script>
 <script>
-const data = JSON.parse(document.getElementById('taxonomy-data').textContent);
+// Expand a taxonomy written with --compact back into the plain data model.
+function decodeTaxonomy(raw) {{
+  if (!raw || raw.format !== '{COMPACT_FORMAT}') return raw;
+  const tabled = new Set(raw.tabled);
+  // Pages stored as a list were left as they are; columns come as an object.
+  const decodePages = columns => {{
+    if (!columns || Array.isArray(columns)) return columns;
+    const names = Object.keys(columns);
+    const count = names.length ? columns[names[0]].length : 0;
+    const pages = new Array(count);
+    for (let i = 0; i < count; i++) {{
+      const page = {{}};
+      for (const name of names) {{
+        let value = columns[name][i];
+        if (name === 'url') value = raw.base + value;
+        else if (tabled.has(name) && typeof value === 'number') value = raw.strings[value];
+        page[name] = value;
+      }}
+      pages[i] = page;
+    }}
+    return pages;
+  }};
+  const decodeSection = section => {{
+    if (!section || typeof section !== 'object') return section;
+    const decoded = {{}};
+    for (const [key, value] of Object.entries(section)) {{
+      if (key === 'pages') {{
+        decoded.pages = decodePages(value);
+      }} else if (key === 'subsections' && value && typeof value === 'object') {{
+        decoded.subsections = {{}};
+        for (const [subKey, sub] of Object.entries(value)) decoded.subsections[subKey] = decodeSection(sub);
+      }} else {{
+        decoded[key] = value;
+      }}
+    }}
+    return decoded;
+  }};
+  const data = {{}};
+  for (const [key, value] of Object.entries(raw)) {{
+    if (key === 'format' || key === 'base' || key === 'tabled' || key === 'strings') continue;
+    if (key === 'structure' && value && typeof value === 'object') {{
+      data.structure = {{}};
+      for (const [sectionKey, section] of Object.entries(value)) {{
+        data.structure[sectionKey] = decodeSection(section);
+      }}
+    }} else {{
+      data[key] = value;
+    }}
+  }}
+  return data;
+}}
+const rawTaxonomy = JSON.parse(document.getElementById('taxonomy-data').textContent);
+const decodeStart = performance.now();
+const data = decodeTaxonomy(rawTaxonomy);
+if (data !== rawTaxonomy) {{
+  console.info(`Decoded compact taxonomy in ${{(performance.now() - decodeStart).toFixed(1)}} ms`);
+}}
 const SERVER_URL = {server_json};
+// Index of per-section taxonomy shards, or null when the taxonomy is inlined.
+const SHARD_INDEX_URL = {shard_index_json};
+// Search index script, or null when the page has no search box.
+const SEARCH_INDEX_URL = {search_index_json};
+const SEARCH_RESULTS_LIMIT = 50;
+// How often to ask the server for links changed by other users.
+const POLL_INTERVAL_MS = 30000;
+const SERVICE_WORKER_URL = {service_worker_json};
+// Edits are sent to the server this long after the first unsent one, so
+// quick successive edits go out in one request.
+const FLUSH_DELAY_MS = 1000;
+// Failed sends are retried with exponential backoff between these bounds.
+const RETRY_MIN_MS = 2000;
+const RETRY_MAX_MS = 5 * 60 * 1000;
+// Browsers cap the body of a keepalive request sent while the page unloads.
+const KEEPALIVE_MAX_BYTES = 60000;
+// Sections with more pages than this show them in a scrolling window that
+// keeps only the visible rows in the DOM.
+const VIRTUAL_LIST_THRESHOLD = 200;
+// Assumed height of a page row in pixels until it has been measured.
+const VIRTUAL_ROW_ESTIMATE = 64;
+// Rows kept rendered above and below the visible ones.
+const VIRTUAL_OVERSCAN = 10;
+let linksRevision = null;
+// Sections start out as a bare summary. Their pages and subsections are
+// built the first time they are opened, so the initial render only
+// touches the top level however large the taxonomy is. Sections from a
+// shard index carry a shard URL instead and are fetched at that point.
 function createSection(section) {{
   const details = document.createElement('details');
   const summary = document.createElement('summary');
-  summary.textContent = section.title;
+  summary.textContent = section.pageCount === undefined ?
+    section.title : `${{section.title}} (${{section.pageCount}})`;
   details.appendChild(summary);
+  let rendered = false;
+  details.addEventListener('toggle', async () => {{
+    if (details.open && !rendered) {{
+      rendered = true;
+      let body = section;
+      if (section.shard) {{
+        details.querySelector(':scope > .load-error')?.remove();
+        try {{
+          const resp = await fetch(section.shard);
+          if (!resp.ok) throw new Error(`HTTP ${{resp.status}}`);
+          body = await resp.json();
+        }} catch (e) {{
+          rendered = false;  // try again the next time it is opened
+          details.appendChild(loadError(`Could not load this section (${{e.message}}).`));
+          return;
+        }}
+      }}
+      renderSectionBody(details, body);
+    }}
+  }});
+  return details;
+}}
+function loadError(message) {{
+  const p = document.createElement('p');
+  p.className = 'load-error';
+  p.textContent = message;
+  return p;
+}}
+function createPageRow(pg) {{
+  const li = document.createElement('li');
+  li.innerHTML = `<div><a href="${{pg.url}}" target="_blank">${{pg.title}}</a>` +
+                 `<span class="description"> - ${{pg.description}}</span></div>` +
+                 `<ul class="internal-link-list" data-url="${{pg.url}}"></ul>`;
+  return li;
+}}
+function renderSectionBody(details, section) {{
   const ul = document.createElement('ul');
-  if (section.pages) {{
-    section.pages.forEach(pg => {{
-      const li = document.createElement('li');
-      li.innerHTML = `<div><a href="${{pg.url}}" target="_blank">${{pg.title}}</a>` +
-                     `<span class="description"> - ${{pg.description}}</span></div>` +
-                     `<ul class="internal-link-list" data-url="${{pg.url}}"></ul>`;
+  const pages = section.pages || [];
+  if (pages.length > VIRTUAL_LIST_THRESHOLD) {{
+    const holder = document.createElement('li');
+    holder.appendChild(createVirtualPageList(pages));
+    ul.appendChild(holder);
+  }} else {{
+    const lists = [];
+    pages.forEach(pg => {{
+      const li = createPageRow(pg);
+      lists.push(li.querySelector('.internal-link-list'));
       ul.appendChild(li);
     }});
+    loadLinkLists(lists);
   }}
   if (section.subsections) {{
     Object.values(section.subsections).forEach(sub => {{
@@ -65,65 +553,563 @@ function createSection(section) {{
     }});
   }}
   details.appendChild(ul);
-  return details;
+}}
+// Render a long page list as a window over absolutely positioned rows.
+// Row heights vary with the number of internal links, so each rendered
+// row is measured and the offsets of the rows after it are recomputed.
+function createVirtualPageList(pages) {{
+  const viewport = document.createElement('div');
+  viewport.className = 'virtual-list';
+  const list = document.createElement('ul');
+  viewport.appendChild(list);
+  const heights = new Float64Array(pages.length).fill(VIRTUAL_ROW_ESTIMATE);
+  const offsets = new Float64Array(pages.length + 1);
+  const rows = new Map();
+  let scheduled = false;
+
+  const layout = () => {{
+    for (let i = 0; i < pages.length; i++) offsets[i + 1] = offsets[i] + heights[i];
+    list.style.height = `${{offsets[pages.length]}}px`;
+    rows.forEach((li, i) => {{ li.style.top = `${{offsets[i]}}px`; }});
+  }};
+  const update = () => {{
+    scheduled = false;
+    const top = viewport.scrollTop;
+    const bottom = top + viewport.clientHeight;
+    let lo = 0, hi = pages.length;
+    while (lo < hi) {{
+      const mid = (lo + hi) >> 1;
+      if (offsets[mid + 1] <= top) lo = mid + 1; else hi = mid;
+    }}
+    let end = lo;
+    while (end < pages.length && offsets[end] < bottom) end++;
+    const first = Math.max(0, lo - VIRTUAL_OVERSCAN);
+    const last = Math.min(pages.length, end + VIRTUAL_OVERSCAN);
+    rows.forEach((li, i) => {{
+      if (i >= first && i < last) return;
+      resized.unobserve(li);
+      unregisterLinkList(li.querySelector('.internal-link-list'));
+      li.remove();
+      rows.delete(i);
+    }});
+    const added = [];
+    for (let i = first; i < last; i++) {{
+      if (rows.has(i)) continue;
+      const li = createPageRow(pages[i]);
+      li.dataset.index = i;
+      li.style.top = `${{offsets[i]}}px`;
+      rows.set(i, li);
+      list.appendChild(li);
+      resized.observe(li);
+      added.push(li.querySelector('.internal-link-list'));
+    }}
+    if (added.length) loadLinkLists(added);
+  }};
+  const schedule = () => {{
+    if (!scheduled) {{
+      scheduled = true;
+      requestAnimationFrame(update);
+    }}
+  }};
+  const resized = new ResizeObserver(entries => {{
+    let changed = false;
+    entries.forEach(entry => {{
+      const i = Number(entry.target.dataset.index);
+      const height = entry.target.offsetHeight;
+      if (rows.get(i) === entry.target && height && height !== heights[i]) {{
+        heights[i] = height;
+        changed = true;
+      }}
+    }});
+    if (changed) layout();
+    schedule();
+  }});
+  resized.observe(viewport);
+  viewport.addEventListener('scroll', schedule, {{passive: true}});
+  layout();
+  schedule();
+  return viewport;
+}}
+async function loadSections() {{
+  if (!SHARD_INDEX_URL) return Object.values(data.structure);
+  const resp = await fetch(SHARD_INDEX_URL);
+  if (!resp.ok) throw new Error(`HTTP ${{resp.status}}`);
+  const index = await resp.json();
+  // Shard names are relative to the index.
+  return index.sections.map(entry => ({{
+    title: entry.title,
+    pageCount: entry.pages,
+    shard: new URL(entry.shard, resp.url).href
+  }}));
 }}
 const container = document.getElementById('tree');
-Object.values(data.structure).forEach(sec => container.appendChild(createSection(sec)));
-async function loadLinks(url) {{
-  if (SERVER_URL) {{
+loadSections()
+  .then(sections => sections.forEach(sec => container.appendChild(createSection(sec))))
+  .catch(e => container.appendChild(loadError(`Could not load the taxonomy index (${{e.message}}).`)));
+// All stored links, keyed by page URL, loaded once at startup. Edits
+// update this map and only the lists showing the edited page.
+const linkMap = new Map();
+// The rendered .internal-link-list elements for each page URL.
+const linkLists = new Map();
+let linksReady = null;
+
+// Local links live in one IndexedDB object store keyed by page URL, read
+// and written in bulk transactions. Browsers without IndexedDB fall back
+// to one localStorage key per page, as older versions of this page used.
+const LINK_DB_NAME = "internal-links";
+const LINK_DB_STORE = "links";
+let linkDb = null;
+
+function openLinkDb() {{
+  if (!linkDb) {{
+    linkDb = new Promise(resolve => {{
+      if (!window.indexedDB) return resolve(null);
+      const req = indexedDB.open(LINK_DB_NAME, 1);
+      req.onupgradeneeded = () => req.result.createObjectStore(LINK_DB_STORE);
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => resolve(null);
+    }}).then(async db => {{
+      if (db) await migrateLocalStorage(db);
+      return db;
+    }});
+  }}
+  return linkDb;
+}}
+
+function linkTransaction(db, mode, work) {{
+  return new Promise((resolve, reject) => {{
+    const tx = db.transaction(LINK_DB_STORE, mode);
+    const result = work(tx.objectStore(LINK_DB_STORE));
+    tx.oncomplete = () => resolve(result);
+    tx.onerror = tx.onabort = () => reject(tx.error);
+  }});
+}}
+
+// Upgrade the old format that stored a bare list of URL strings.
+function normalizeLinks(stored) {{
+  return stored.map(l => typeof l === "string" ? {{url: l, name: "", description: ""}} : l);
+}}
+
+// Links stored under internal-<url> keys.
+function readLocalStorageLinks() {{
+  const store = {{}};
+  for (let i = 0; i < localStorage.length; i++) {{
+    const key = localStorage.key(i);
+    if (!key || !key.startsWith("internal-")) continue;
+    let stored;
     try {{
-      const resp = await fetch(`${{SERVER_URL}}/links/${{encodeURIComponent(url)}}`);
-      if (resp.ok) return await resp.json();
-    }} catch (e) {{}}
-    return [];
-  }} else {{
-    let stored = JSON.parse(localStorage.getItem("internal-" + url) || "[]");
-    if (stored.length && typeof stored[0] === "string") {{
-      stored = stored.map(l => ({{url: l, name: "", description: ""}}));
-      localStorage.setItem("internal-" + url, JSON.stringify(stored));
+      stored = JSON.parse(localStorage.getItem(key) || "[]");
+    }} catch (e) {{
+      continue;
     }}
-    return stored;
+    if (!Array.isArray(stored)) continue;
+    store[key.slice("internal-".length)] = normalizeLinks(stored);
   }}
+  return store;
 }}
 
-async function saveLinks(url, links) {{
+// One-time move of the localStorage entries into IndexedDB. The keys are
+// removed only after the transaction has committed.
+async function migrateLocalStorage(db) {{
+  const store = readLocalStorageLinks();
+  const urls = Object.keys(store);
+  if (!urls.length) return;
+  await linkTransaction(db, "readwrite", objects => {{
+    urls.forEach(url => {{
+      if (store[url].length) objects.put(store[url], url);
+    }});
+  }});
+  urls.forEach(url => localStorage.removeItem("internal-" + url));
+}}
+
+async function readLocalLinks() {{
+  const db = await openLinkDb();
+  if (!db) return readLocalStorageLinks();
+  let keys, values;
+  await linkTransaction(db, "readonly", objects => {{
+    keys = objects.getAllKeys();
+    values = objects.getAll();
+  }});
+  const store = {{}};
+  keys.result.forEach((url, i) => {{ store[url] = values.result[i]; }});
+  return store;
+}}
+
+// Write several pages in one transaction; an empty list deletes the page.
+async function writeLocalLinks(entries) {{
+  const db = await openLinkDb();
+  if (!db) {{
+    Object.entries(entries).forEach(([url, links]) => {{
+      if (links.length) localStorage.setItem("internal-" + url, JSON.stringify(links));
+      else localStorage.removeItem("internal-" + url);
+    }});
+    return;
+  }}
+  await linkTransaction(db, "readwrite", objects => {{
+    Object.entries(entries).forEach(([url, links]) => {{
+      if (links.length) objects.put(links, url); else objects.delete(url);
+    }});
+  }});
+}}
+
+// Read every stored entry: the whole store from the server, or all local links.
+async function loadAllLinks() {{
   if (SERVER_URL) {{
-    await fetch(`${{SERVER_URL}}/links/${{encodeURIComponent(url)}}`, {{
+    try {{
+      const resp = await fetch(`${{SERVER_URL}}/links`);
+      if (resp.ok) {{
+        const rev = resp.headers.get("X-Links-Revision");
+        if (rev !== null) linksRevision = parseInt(rev, 10);
+        return await resp.json();
+      }}
+    }} catch (e) {{}}
+    return {{}};
+  }}
+  return await readLocalLinks();
+}}
+
+// Edits not yet accepted by the server, by page URL; a later edit of the
+// same page replaces the earlier one. The queue is small, so it is kept in
+// localStorage to survive reloads while offline. Its key must not start
+// with "internal-", which marks link entries.
+const PENDING_KEY = "pending-internal-links";
+const pendingLinks = new Map(SERVER_URL ? JSON.parse(localStorage.getItem(PENDING_KEY) || "[]") : []);
+// Edits the server refused outright. They are kept, in the same shape, until
+// the user exports them, so a rejected batch is never silently lost.
+const REJECTED_KEY = "rejected-internal-links";
+const rejectedLinks = new Map(SERVER_URL ? JSON.parse(localStorage.getItem(REJECTED_KEY) || "[]") : []);
+let rejectedStatus = null;
+let flushTimer = null;
+let flushing = false;
+let retryDelay = RETRY_MIN_MS;
+
+function persistPending() {{
+  if (pendingLinks.size) localStorage.setItem(PENDING_KEY, JSON.stringify(Array.from(pendingLinks)));
+  else localStorage.removeItem(PENDING_KEY);
+  if (rejectedLinks.size) localStorage.setItem(REJECTED_KEY, JSON.stringify(Array.from(rejectedLinks)));
+  else localStorage.removeItem(REJECTED_KEY);
+}}
+
+function updateSyncStatus() {{
+  const status = document.getElementById("sync-status");
+  const parts = [];
+  if (!navigator.onLine) parts.push("offline");
+  if (pendingLinks.size) parts.push(`${{pendingLinks.size}} unsaved page${{pendingLinks.size === 1 ? "" : "s"}}`);
+  if (rejectedLinks.size) {{
+    const reason = rejectedStatus ? ` (HTTP ${{rejectedStatus}})` : "";
+    parts.push(`${{rejectedLinks.size}} page${{rejectedLinks.size === 1 ? "" : "s"}} rejected by the server${{reason}}`);
+  }}
+  status.textContent = parts.join(", ");
+  document.getElementById("export-rejected").hidden = !rejectedLinks.size;
+}}
+
+function scheduleFlush(delay) {{
+  if (!flushTimer) flushTimer = setTimeout(flushPending, delay);
+}}
+
+// Send every queued edit in one NDJSON request, which the server merges
+// into the store as a single write.
+async function flushPending(unloading = false) {{
+  clearTimeout(flushTimer);
+  flushTimer = null;
+  if (flushing || !pendingLinks.size) return;
+  flushing = true;
+  const batch = new Map(pendingLinks);
+  const body = Array.from(batch, ([url, links]) => JSON.stringify({{url: url, links: links}})).join("\\n") + "\\n";
+  try {{
+    const resp = await fetch(`${{SERVER_URL}}/links`, {{
       method: "POST",
-      headers: {{"Content-Type": "application/json"}},
-      body: JSON.stringify(links)
+      headers: {{"Content-Type": "application/x-ndjson"}},
+      body: body,
+      keepalive: unloading && body.length < KEEPALIVE_MAX_BYTES
     }});
-  }} else {{
-    if (links.length) {{
-      localStorage.setItem("internal-" + url, JSON.stringify(links));
+    // Other client errors would fail again on every retry.
+    const permanent = resp.status >= 400 && resp.status < 500 && resp.status !== 408 && resp.status !== 429;
+    if (!resp.ok && !permanent) throw new Error(`HTTP ${{resp.status}}`);
+    if (permanent) {{
+      console.warn(`Link server rejected ${{batch.size}} queued edits: HTTP ${{resp.status}}`);
+      rejectedStatus = resp.status;
+      batch.forEach((links, url) => {{
+        if (pendingLinks.get(url) === links) rejectedLinks.set(url, links);
+      }});
     }} else {{
-      localStorage.removeItem("internal-" + url);
+      // Skip our own edits in the change feed if nothing else happened in between.
+      const result = await resp.json();
+      if (linksRevision !== null && result.revision === linksRevision + 1) {{
+        linksRevision = result.revision;
+      }}
     }}
+    // Keep pages that were edited again while the request was in flight.
+    batch.forEach((links, url) => {{
+      if (pendingLinks.get(url) === links) pendingLinks.delete(url);
+    }});
+    persistPending();
+    retryDelay = RETRY_MIN_MS;
+  }} catch (e) {{
+    // Full jitter keeps many clients from retrying in lockstep.
+    flushTimer = setTimeout(flushPending, retryDelay * (0.5 + Math.random() / 2));
+    retryDelay = Math.min(retryDelay * 2, RETRY_MAX_MS);
+  }} finally {{
+    flushing = false;
+    updateSyncStatus();
   }}
+  if (pendingLinks.size) scheduleFlush(FLUSH_DELAY_MS);
 }}
 
-async function refreshLinks() {{
-  const lists = document.querySelectorAll(".internal-link-list");
+async function saveLinks(url, links) {{
+  if (SERVER_URL) {{
+    pendingLinks.set(url, links);
+    persistPending();
+    updateSyncStatus();
+    scheduleFlush(FLUSH_DELAY_MS);
+  }} else {{
+    await writeLocalLinks({{[url]: links}});
+  }}
+}}
+
+function renderLinks(ul, stored) {{
+  ul.innerHTML = "";
+  stored.forEach((link, idx) => {{
+    const li = document.createElement("li");
+    const text = link.name || `internal ${{idx + 1}}`;
+    const desc = link.description ? ` <span class="description">- ${{link.description}}</span>` : "";
+    li.innerHTML = `<a href="${{link.url}}" target="_blank">${{text}}</a>${{desc}}` +
+                   ` <button class="edit-link" data-index="${{idx}}">edit</button>` +
+                   ` <button class="delete-link" data-index="${{idx}}">delete</button>`;
+    ul.appendChild(li);
+  }});
+  const addLi = document.createElement("li");
+  addLi.innerHTML = `<button class="add-link">add internal link</button>`;
+  ul.appendChild(addLi);
+}}
+
+// Set the links of one page in the map and re-render just its lists.
+function setLinks(url, links) {{
+  if (links.length) linkMap.set(url, links); else linkMap.delete(url);
+  (linkLists.get(url) || []).forEach(ul => renderLinks(ul, links));
+}}
+
+// Register and fill the link lists of a section that has just been opened.
+async function loadLinkLists(lists) {{
   for (const ul of lists) {{
     const url = ul.dataset.url;
-    const stored = await loadLinks(url);
-    ul.innerHTML = "";
-    stored.forEach((link, idx) => {{
-      const li = document.createElement("li");
-      const text = link.name || `internal ${{idx + 1}}`;
-      const desc = link.description ? ` <span class="description">- ${{link.description}}</span>` : "";
-      li.innerHTML = `<a href="${{link.url}}" target="_blank">${{text}}</a>${{desc}}` +
-                     ` <button class="edit-link" data-index="${{idx}}">edit</button>` +
-                     ` <button class="delete-link" data-index="${{idx}}">delete</button>`;
-      ul.appendChild(li);
-    }});
-    const addLi = document.createElement("li");
-    addLi.innerHTML = `<button class="add-link">add internal link</button>`;
-    ul.appendChild(addLi);
+    if (!linkLists.has(url)) linkLists.set(url, new Set());
+    linkLists.get(url).add(ul);
+  }}
+  await linksReady;
+  for (const ul of lists) {{
+    renderLinks(ul, linkMap.get(ul.dataset.url) || []);
   }}
 }}
+
+function unregisterLinkList(ul) {{
+  const lists = linkLists.get(ul.dataset.url);
+  if (!lists) return;
+  lists.delete(ul);
+  if (!lists.size) linkLists.delete(ul.dataset.url);
+}}
+
+// Reload the whole map (after an import) and re-render every rendered list.
+async function refreshLinks() {{
+  linksReady = loadAllLinks();
+  const store = await linksReady;
+  linkMap.clear();
+  Object.entries(store).forEach(([url, links]) => {{
+    if (links.length) linkMap.set(url, links);
+  }});
+  // Unsent edits are newer than anything the server returned.
+  pendingLinks.forEach((links, url) => {{
+    if (links.length) linkMap.set(url, links); else linkMap.delete(url);
+  }});
+  linkLists.forEach((lists, url) => {{
+    const links = linkMap.get(url) || [];
+    lists.forEach(ul => renderLinks(ul, links));
+  }});
+}}
 refreshLinks();
 
+// Fetch only the entries changed since the last known revision and
+// re-render the affected link lists.
+async function pollChanges() {{
+  if (!SERVER_URL || linksRevision === null || document.hidden) return;
+  try {{
+    const resp = await fetch(`${{SERVER_URL}}/links/changes?since=${{linksRevision}}`);
+    if (!resp.ok) return;
+    const delta = await resp.json();
+    linksRevision = delta.revision;
+    // Pages with unsent edits keep them; the server gets them on the next flush.
+    if (delta.reset) {{
+      linkMap.clear();
+      linkLists.forEach((lists, url) => {{
+        if (!pendingLinks.has(url)) setLinks(url, delta.changes[url] || []);
+      }});
+      Object.entries(delta.changes).forEach(([url, links]) => {{
+        if (links.length && !pendingLinks.has(url)) linkMap.set(url, links);
+      }});
+      pendingLinks.forEach((links, url) => {{
+        if (links.length) linkMap.set(url, links);
+      }});
+      return;
+    }}
+    Object.entries(delta.changes).forEach(([url, links]) => {{
+      if (!pendingLinks.has(url)) setLinks(url, links);
+    }});
+  }} catch (e) {{}}
+}}
+if (SERVER_URL) {{
+  setInterval(pollChanges, POLL_INTERVAL_MS);
+  document.addEventListener("visibilitychange", pollChanges);
+  // Send queued edits as soon as the connection is back, and before the
+  // page goes away.
+  window.addEventListener("online", () => {{
+    retryDelay = RETRY_MIN_MS;
+    flushPending();
+  }});
+  window.addEventListener("offline", updateSyncStatus);
+  document.addEventListener("visibilitychange", () => {{
+    if (document.visibilityState === "hidden") flushPending(true);
+  }});
+  window.addEventListener("pagehide", () => flushPending(true));
+  updateSyncStatus();
+  scheduleFlush(FLUSH_DELAY_MS);
+}}
+if (SERVICE_WORKER_URL && "serviceWorker" in navigator && location.protocol.startsWith("http")) {{
+  navigator.serviceWorker.register(SERVICE_WORKER_URL).catch(() => {{}});
+}}
+
+// Search. The index is built by the generator and loaded on first use.
+let searchIndex = null;
+function loadSearchIndex() {{
+  if (!searchIndex) {{
+    searchIndex = new Promise((resolve, reject) => {{
+      window.searchIndexLoaded = raw => resolve(decodeSearchIndex(raw));
+      const script = document.createElement('script');
+      script.src = SEARCH_INDEX_URL;
+      script.onerror = () => {{
+        searchIndex = null;
+        reject(new Error('Failed to load the search index'));
+      }};
+      document.head.appendChild(script);
+    }});
+  }}
+  return searchIndex;
+}}
+
+// Expand the front-coded term list; postings stay encoded until searched.
+function decodeSearchIndex(raw) {{
+  const terms = new Array(raw.suffixes.length);
+  let previous = '';
+  for (let i = 0; i < terms.length; i++) {{
+    previous = previous.slice(0, raw.prefixes[i]) + raw.suffixes[i];
+    terms[i] = previous;
+  }}
+  return {{terms: terms, postings: raw.postings, docs: raw.docs, sections: raw.sections}};
+}}
+
+// Score the pages containing a term, or any term starting with it when
+// prefix is true. Exact matches count double.
+function matchTerm(index, token, prefix) {{
+  const scores = new Map();
+  const terms = index.terms;
+  let lo = 0, hi = terms.length;
+  while (lo < hi) {{
+    const mid = (lo + hi) >> 1;
+    if (terms[mid] < token) lo = mid + 1; else hi = mid;
+  }}
+  for (let i = lo; i < terms.length && terms[i].startsWith(token); i++) {{
+    const exact = terms[i] === token;
+    if (!exact && !prefix) break;
+    let doc = 0;
+    for (const value of index.postings[i]) {{
+      doc += value >> 2;
+      const score = (value & 3) * (exact ? 2 : 1);
+      if (score > (scores.get(doc) || 0)) scores.set(doc, score);
+    }}
+  }}
+  return scores;
+}}
+
+// Pages matching every word of the query. The last word may be incomplete,
+// so it also matches as a prefix once it is at least two characters long.
+function searchPages(index, query) {{
+  const tokens = query.toLowerCase().match(/[\\p{{L}}\\p{{N}}_]+/gu) || [];
+  let scores = null;
+  tokens.forEach((token, i) => {{
+    if (scores !== null && !scores.size) return;
+    const prefix = i === tokens.length - 1 && token.length > 1;
+    const matches = matchTerm(index, token, prefix);
+    if (scores === null) {{
+      scores = matches;
+    }} else {{
+      const both = new Map();
+      scores.forEach((score, doc) => {{
+        if (matches.has(doc)) both.set(doc, score + matches.get(doc));
+      }});
+      scores = both;
+    }}
+  }});
+  if (!scores) return [];
+  return Array.from(scores).sort((a, b) => b[1] - a[1] || a[0] - b[0])
+    .slice(0, SEARCH_RESULTS_LIMIT).map(([doc]) => index.docs[doc]);
+}}
+
+function renderSearchResults(index, results) {{
+  const list = document.getElementById('search-results');
+  list.innerHTML = '';
+  results.forEach(([title, url, section]) => {{
+    const li = document.createElement('li');
+    const a = document.createElement('a');
+    a.href = url;
+    a.target = '_blank';
+    a.textContent = title || url;
+    const path = document.createElement('span');
+    path.className = 'description';
+    path.textContent = ` - ${{index.sections[section]}}`;
+    li.append(a, path);
+    list.appendChild(li);
+  }});
+  if (!results.length) {{
+    const li = document.createElement('li');
+    li.textContent = 'No matching pages';
+    list.appendChild(li);
+  }}
+}}
+
+if (SEARCH_INDEX_URL) {{
+  const input = document.getElementById('search');
+  input.addEventListener('focus', () => loadSearchIndex().catch(() => {{}}), {{once: true}});
+  input.addEventListener('input', async () => {{
+    const query = input.value.trim();
+    const list = document.getElementById('search-results');
+    if (!query) {{
+      list.hidden = true;
+      container.hidden = false;
+      return;
+    }}
+    let index;
+    try {{
+      index = await loadSearchIndex();
+    }} catch (e) {{
+      return;
+    }}
+    // Ignore answers to queries that have since been edited.
+    if (input.value.trim() !== query) return;
+    renderSearchResults(index, searchPages(index, query));
+    list.hidden = false;
+    container.hidden = true;
+  }});
+}}
+
+
+function downloadJson(store, filename) {{
+  const blob = new Blob([JSON.stringify(store, null, 2)], {{type: 'application/json'}});
+  const url = URL.createObjectURL(blob);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = filename;
+  a.click();
+  URL.revokeObjectURL(url);
+}}
 
 // Export links to a JSON file
 document.getElementById('export-links').addEventListener('click', async () => {{
@@ -134,20 +1120,21 @@ document.getElementById('export-links').addEventListener('click', async () => {{
       store = await resp.json();
     }}
   }} else {{
-    for (let i = 0; i < localStorage.length; i++) {{
-      const key = localStorage.key(i);
-      if (key && key.startsWith('internal-')) {{
-        store[key.slice('internal-'.length)] = JSON.parse(localStorage.getItem(key));
-      }}
-    }}
+    store = await readLocalLinks();
+  }}
+  downloadJson(store, 'internal-links.json');
+}});
+
+// Save edits the server rejected in the Export Links format, so they can
+// be fixed and brought back with Import Links.
+document.getElementById('export-rejected').addEventListener('click', () => {{
+  downloadJson(Object.fromEntries(rejectedLinks), 'rejected-internal-links.json');
+  if (confirm('Remove the rejected edits from this browser?')) {{
+    rejectedLinks.clear();
+    rejectedStatus = null;
+    persistPending();
+    updateSyncStatus();
   }}
-  const blob = new Blob([JSON.stringify(store, null, 2)], {{type: 'application/json'}});
-  const url = URL.createObjectURL(blob);
-  const a = document.createElement('a');
-  a.href = url;
-  a.download = 'internal-links.json';
-  a.click();
-  URL.revokeObjectURL(url);
 }});
 
 // Import links from a JSON file
@@ -160,17 +1147,22 @@ document.getElementById('import-file').addEventListener('change', async ev => {{
   const reader = new FileReader();
   reader.onload = async e => {{
     try {{
-      const data = JSON.parse(e.target.result);
+      const data = {{}};
+      // Exports from older pages may hold bare URL strings.
+      Object.entries(JSON.parse(e.target.result)).forEach(([url, links]) => {{
+        if (Array.isArray(links)) data[url] = normalizeLinks(links);
+      }});
       if (SERVER_URL) {{
+        // Send NDJSON so the server merges entries as they stream in,
+        // the same way a local import adds to what is already stored.
+        const lines = Object.entries(data).map(([url, links]) => JSON.stringify({{url: url, links: links}}));
         await fetch(`${{SERVER_URL}}/links`, {{
           method: 'POST',
-          headers: {{'Content-Type': 'application/json'}},
-          body: JSON.stringify(data)
+          headers: {{'Content-Type': 'application/x-ndjson'}},
+          body: lines.join('\\n') + '\\n'
         }});
       }} else {{
-        Object.entries(data).forEach(([url, links]) => {{
-          localStorage.setItem('internal-' + url, JSON.stringify(links));
-        }});
+        await writeLocalLinks(data);
       }}
       await refreshLinks();
       alert('Links imported');
@@ -186,7 +1178,7 @@ document.body.addEventListener('click', async ev => {{
   const ul = ev.target.closest('.internal-link-list');
   if (!ul) return;
   const url = ul.dataset.url;
-  let stored = await loadLinks(url);
+  const stored = (linkMap.get(url) || []).slice();
 
   if (ev.target.classList.contains('add-link')) {{
     const link = prompt('Enter internal link URL:');
@@ -194,8 +1186,8 @@ document.body.addEventListener('click', async ev => {{
       const name = prompt('Enter link name (optional):') || '';
       const desc = prompt('Enter link description (optional):') || '';
       stored.push({{url: link, name: name, description: desc}});
+      setLinks(url, stored);
       await saveLinks(url, stored);
-      await refreshLinks();
     }}
   }} else if (ev.target.classList.contains('edit-link')) {{
     const idx = parseInt(ev.target.dataset.index, 10);
@@ -209,21 +1201,102 @@ document.body.addEventListener('click', async ev => {{
       }} else {{
         stored.splice(idx, 1);
       }}
+      setLinks(url, stored);
       await saveLinks(url, stored);
-      await refreshLinks();
     }}
   }} else if (ev.target.classList.contains('delete-link')) {{
     const idx = parseInt(ev.target.dataset.index, 10);
     stored.splice(idx, 1);
+    setLinks(url, stored);
     await saveLinks(url, stored);
-    await refreshLinks();
   }}
 }});
 </script>
 </body>
 </html>
 """
-    return html
+
+
+def build_html(data: Optional[dict], server_url: Optional[str] = None,
+               shard_index_url: Optional[str] = None,
+               search_index_url: Optional[str] = None,
+               service_worker_url: Optional[str] = None) -> str:
+    """Render the whole page as one string; see ``iter_html``."""
+    return ''.join(iter_html(data, server_url, shard_index_url, search_index_url,
+                             service_worker_url))
+
+
+def build_key(taxonomy_path: Path, options: dict) -> str:
+    """Hash everything the output depends on.
+
+    The generator's own source stands in for the template, so any change to
+    the page or the build code invalidates earlier outputs.
+    """
+    parts = {
+        'taxonomy': hashlib.sha256(taxonomy_path.read_bytes()).hexdigest(),
+        'generator': hashlib.sha256(Path(__file__).read_bytes()).hexdigest(),
+        'options': options,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def stamp_path(output_path: Path) -> Path:
+    return output_path.with_name(f".{output_path.name}.build.json")
+
+
+def is_up_to_date(output_path: Path, key: str) -> bool:
+    """Whether ``output_path`` and its assets were built with ``key``."""
+    try:
+        stamp = json.loads(stamp_path(output_path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return False
+    return (stamp.get('key') == key and output_path.is_file()
+            and all((output_path.parent / name).is_file() for name in stamp.get('assets', [])))
+
+
+def same_content(path: Path, other: Path) -> bool:
+    """Compare two files chunk by chunk."""
+    try:
+        if path.stat().st_size != other.stat().st_size:
+            return False
+        with path.open('rb') as a, other.open('rb') as b:
+            while True:
+                chunk = a.read(1024 * 1024)
+                if chunk != b.read(1024 * 1024):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+
+def write_if_changed(path: Path, pieces: Iterable[str]) -> bool:
+    """Stream ``pieces`` to ``path`` unless it already holds exactly that text.
+
+    The text goes to a temporary file first, so no second full copy of the
+    page is built in memory and the page is replaced atomically.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            buffer, size = [], 0
+            for piece in pieces:
+                buffer.append(piece)
+                size += len(piece)
+                if size >= 1024 * 1024:
+                    f.write(''.join(buffer))
+                    buffer, size = [], 0
+            f.write(''.join(buffer))
+        if same_content(path, tmp_path):
+            tmp_path.unlink()
+            return False
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        return True
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
 
 def main() -> None:
@@ -231,19 +1304,86 @@ def main() -> None:
     parser.add_argument('--taxonomy', default='dynatrace_fast_taxonomy.json', help='Path to taxonomy JSON file')
     parser.add_argument('--output', default='docs_hierarchy.html', help='Output HTML file')
     parser.add_argument('--server-url', help='Base URL of storage server')
+    parser.add_argument('--shard-dir', help='Write the taxonomy as per-section JSON shards into this '
+                        'directory instead of inlining it in the HTML')
+    parser.add_argument('--compact', action='store_true',
+                        help='Embed the taxonomy in a compact columnar encoding')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if the output is up to date')
+    parser.add_argument('--prune', action='store_true',
+                        help='Delete shard, index and search files left over from earlier builds')
     args = parser.parse_args()
+    if args.compact and args.shard_dir:
+        parser.error('--compact applies to the embedded taxonomy and cannot be used with --shard-dir')
 
     taxonomy_path = Path(args.taxonomy)
     if not taxonomy_path.is_file():
         raise SystemExit(f"Taxonomy file not found: {taxonomy_path}")
 
+    output_path = Path(args.output)
+    key = build_key(taxonomy_path, {'output': output_path.name, 'server_url': args.server_url,
+                                    'shard_dir': args.shard_dir, 'compact': args.compact,
+                                    'prune': args.prune})
+    if not args.force and is_up_to_date(output_path, key):
+        print(f"{output_path} is up to date")
+        return
+
+    # The parsed taxonomy and its search index stay in memory for the whole
+    # build; only the HTML itself is streamed to disk.
     with taxonomy_path.open() as f:
         data = json.load(f)
 
-    html = build_html(data, server_url=args.server_url)
-    output_path = Path(args.output)
-    output_path.write_text(html, encoding='utf-8')
-    print(f"Generated {output_path}")
+    # Assets go into the shard directory when there is one, otherwise next to
+    # the page, and are referenced relative to the page.
+    asset_dir = Path(args.shard_dir) if args.shard_dir else output_path.parent
+    asset_dir.mkdir(parents=True, exist_ok=True)
+    relative = Path(os.path.relpath(asset_dir.resolve(), output_path.resolve().parent))
+    search_name = write_search_index(data, asset_dir, f"{output_path.stem}.search")
+    options = {'server_url': args.server_url,
+               'search_index_url': (relative / search_name).as_posix()}
+    assets = [options['search_index_url']]
+    if args.server_url:
+        # A service worker only controls pages at or below its own
+        # directory, so it goes next to the page rather than with the assets.
+        options['service_worker_url'] = write_service_worker(
+            output_path.parent, f"{output_path.stem}.sw.js", args.server_url)
+        assets.append(options['service_worker_url'])
+    if args.shard_dir:
+        # Shards are content-addressed, so only sections that changed since
+        # the last build produce new files.
+        index_name, shard_names = write_shards(data, asset_dir, output_path.stem)
+        assets.extend((relative / name).as_posix() for name in shard_names)
+        assets.append((relative / index_name).as_posix())
+        pieces = iter_html(None, shard_index_url=assets[-1], **options)
+        print(f"Wrote taxonomy shards to {asset_dir}")
+    elif args.compact:
+        compact = encode_compact(data)
+        # Same separators on both sides, so the saving is the encoding's alone
+        plain_size = sum(len(piece) for piece in iter_taxonomy_json(data, (',', ':')))
+        compact_size = sum(len(piece) for piece in iter_taxonomy_json(compact, (',', ':')))
+        print(f"Compact taxonomy: {compact_size} bytes instead of {plain_size} "
+              f"({plain_size - compact_size} bytes, {1 - compact_size / max(plain_size, 1):.0%} saved)")
+        pieces = iter_html(compact, **options)
+    else:
+        pieces = iter_html(data, **options)
+    if write_if_changed(output_path, pieces):
+        print(f"Generated {output_path}")
+    else:
+        print(f"{output_path} is unchanged")
+    if args.prune:
+        # Pages that are already open may still ask for the old files, so
+        # pruning is left to the caller. Only files named after this page
+        # are candidates; other pages may share the directory.
+        hashed = r'\.[0-9a-f]{16}\.'
+        stem = re.escape(output_path.stem)
+        patterns = [stem + r'\.search' + hashed + 'js']
+        keep = [search_name]
+        if args.shard_dir:
+            patterns += [stem + r'\.section-\d+-[a-z0-9-]+' + hashed + 'json',
+                         stem + r'\.index' + hashed + 'json']
+            keep += [index_name, *shard_names]
+        for name in prune_assets(asset_dir, keep, patterns):
+            print(f"Removed {asset_dir / name}")
+    stamp_path(output_path).write_text(json.dumps({'key': key, 'assets': assets}), encoding='utf-8')
 
 if __name__ == '__main__':
     main()
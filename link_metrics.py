@@ -0,0 +1,165 @@
+"""Minimal Prometheus metrics for the link storage servers.
+
+Implements just enough of the Prometheus text exposition format (counters
+and histograms with labels) to avoid a dependency on ``prometheus_client``.
+Metrics are kept per process; under a multi-process server each worker
+reports its own values.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Each entry is [bucket counts, sum, count].
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            for bound, bucket_count in zip(self.buckets, counts):
+                le = _labels(self.labelnames, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {bucket_count}")
+            inf = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge(Metric):
+    """Gauge whose samples are computed by a callback at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, collect: Callable[[], float] = None):
+        super().__init__(name, documentation)
+        self.collect = collect
+
+    def _samples(self):
+        if self.collect is None:
+            return []
+        return [f"{self.name} {_number(self.collect())}"]
+
+
+REGISTRY: List[Metric] = []
+
+
+def render() -> str:
+    """Render every registered metric in Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+REQUESTS = Counter('link_server_requests_total', 'HTTP requests handled, by route, method and status.',
+                   ['route', 'method', 'status'])
+REQUEST_SECONDS = Histogram('link_server_request_duration_seconds',
+                            'Time to build the HTTP response, by route.', ['route'])
+PERSIST_SECONDS = Histogram('link_store_persist_duration_seconds',
+                            'Time spent reading or writing persisted link data.', ['backend', 'operation'])
+PERSIST_ERRORS = Counter('link_store_persist_errors_total',
+                         'Failed reads or writes of persisted link data, including ones the '
+                         'server recovered from.', ['backend', 'operation'])
+STORE_ENTRIES = Gauge('link_store_entries', 'Page URLs that have internal links stored.')
+STORE_BYTES = Gauge('link_store_bytes', 'Size of the persisted link store on disk.')
+
+
+def watch_store(store) -> None:
+    """Report the size of ``store`` through the store gauges."""
+    STORE_ENTRIES.collect = lambda: store.stats()['entries']
+    STORE_BYTES.collect = lambda: store.stats()['bytes']
+
+
+@contextmanager
+def persist_timer(backend: str, operation: str):
+    """Time a persistence operation and count it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        PERSIST_ERRORS.inc(backend=backend, operation=operation)
+        raise
+    finally:
+        PERSIST_SECONDS.observe(time.perf_counter() - start, backend=backend, operation=operation)
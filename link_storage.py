@@ -0,0 +1,904 @@
+"""Storage backends for the internal link server.
+
+A backend maps a documentation page URL to the list of internal links stored
+for it. Three implementations are provided:
+
+- ``JsonFileBackend`` keeps the whole store in memory and persists it to a
+  single JSON file, write-behind from a background thread or, when the file
+  is shared by several processes, write-through under a file lock.
+- ``SqliteBackend`` stores one row per page URL and link in an SQLite
+  database running in WAL mode, so saving one page only touches its rows.
+- ``JournalBackend`` keeps the store in memory, appends every write to a
+  journal file and periodically compacts it into a snapshot.
+
+Every write bumps a store-wide revision counter and stamps the changed page
+URLs with it, so clients can ask for everything modified after a revision
+they have already seen. Revisions restart at 0 when a store is created, so
+each store also carries a random epoch, fixed at creation, that tells two
+stores with the same revision apart.
+
+Use ``open_backend`` to create a backend by name.
+"""
+import functools
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from link_metrics import PERSIST_ERRORS, persist_timer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+Links = List[dict]
+
+# On-disk layout version of the JSON file. Files without it are treated as
+# the original flat ``{page_url: links}`` mapping at revision 0.
+JSON_FORMAT_VERSION = 2
+
+DEFAULT_PATHS = {
+    'json': 'stored_links.json',
+    'sqlite': 'stored_links.db',
+    'journal': 'stored_links.journal',
+}
+
+
+class StoreError(Exception):
+    """Raised when the persisted link store cannot be read."""
+
+
+def new_epoch() -> int:
+    """Random identifier for a newly created store (48 bits)."""
+    return secrets.randbits(48)
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive, cross-process lock on ``path`` for the block."""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(path: Path, write, binary: bool = False) -> None:
+    """Replace ``path`` with what ``write(f)`` writes, atomically.
+
+    The data goes to a temporary file in the same directory, is fsynced and
+    then renamed over ``path``, so readers never see a partial file.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb' if binary else 'w') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        mode = path.stat().st_mode & 0o777 if path.exists() else 0o644
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def file_size(*paths: Path) -> int:
+    """Total size in bytes of the given files that exist."""
+    total = 0
+    for path in paths:
+        try:
+            total += path.stat().st_size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+class LinkBackend:
+    """Interface shared by all storage backends."""
+
+    # Label used for this backend in metrics.
+    name = ''
+
+    # Whether calls may block on disk I/O. The asyncio server runs such
+    # backends in a worker thread instead of on the event loop.
+    blocking_io = True
+
+    def get(self, url: str) -> Links:
+        raise NotImplementedError
+
+    def get_many(self, urls: List[str]) -> Dict[str, Links]:
+        return {url: self.get(url) for url in urls}
+
+    def all(self) -> Dict[str, Links]:
+        raise NotImplementedError
+
+    def iter_items(self) -> Iterator[Tuple[str, Links]]:
+        """Yield ``(url, links)`` pairs for a streamed export."""
+        return iter(self.all().items())
+
+    def set(self, url: str, links: Links) -> int:
+        """Store ``links`` for ``url`` and return the new store revision."""
+        raise NotImplementedError
+
+    def replace(self, store: Dict[str, Links]) -> int:
+        """Replace the whole store and return the new store revision."""
+        raise NotImplementedError
+
+    def merge(self, entries: Dict[str, Links]) -> int:
+        """Store several entries in one write, leaving other URLs untouched."""
+        raise NotImplementedError
+
+    def revision(self) -> int:
+        """Return the revision of the most recent write."""
+        raise NotImplementedError
+
+    def url_revision(self, url: str) -> int:
+        """Return the revision at which ``url`` was last written (0 if never)."""
+        raise NotImplementedError
+
+    def epoch(self) -> int:
+        """Return the identifier chosen when the store was created.
+
+        Revisions start over in a re-created store; the epoch does not, so
+        validators built from both never match across stores.
+        """
+        raise NotImplementedError
+
+    def changes(self, since: int) -> Tuple[int, Dict[str, Links]]:
+        """Return the current revision and every entry written after ``since``.
+
+        Entries removed by a wholesale ``replace`` are reported with an empty
+        list. The revision is read before the entries, so a concurrent write
+        may show up early but is never missed by the next poll.
+        """
+        raise NotImplementedError
+
+    def is_empty(self) -> bool:
+        return not self.all()
+
+    def stats(self) -> Dict[str, int]:
+        """Return ``{'entries': ..., 'bytes': ...}`` for metrics.
+
+        ``entries`` counts page URLs with at least one link; ``bytes`` is the
+        size of the persisted store on disk.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(LinkBackend):
+    """Base for backends that keep the whole store resident in memory.
+
+    Reads are served from the in-memory dict. Every write is expressed as an
+    operation (``'merge'`` or ``'replace'``) on a dict of entries; subclasses
+    persist it by implementing ``_write``, which must call ``_apply`` with
+    ``self._lock`` held.
+    """
+
+    blocking_io = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revision, self._revisions, self._data = 0, {}, {}
+        self._epoch = new_epoch()
+
+    def _refresh(self):
+        """Hook to pick up changes made outside this process."""
+
+    def _apply(self, op: str, entries: Dict[str, Links]) -> int:
+        self._revision += 1
+        if op == 'replace':
+            # Keep removed URLs in the revision map so that they show up as
+            # deletions in the change feed.
+            for url in set(self._revisions).union(entries):
+                self._revisions[url] = self._revision
+            self._data = dict(entries)
+        else:
+            for url, links in entries.items():
+                self._data[url] = links
+                self._revisions[url] = self._revision
+        return self._revision
+
+    def _write(self, op: str, entries: Dict[str, Links]) -> int:
+        raise NotImplementedError
+
+    def _snapshot(self) -> dict:
+        return {
+            'version': JSON_FORMAT_VERSION,
+            'epoch': self._epoch,
+            'revision': self._revision,
+            'revisions': dict(self._revisions),
+            'links': dict(self._data),
+        }
+
+    def get(self, url):
+        with self._lock:
+            self._refresh()
+            return self._data.get(url, [])
+
+    def get_many(self, urls):
+        with self._lock:
+            self._refresh()
+            return {url: self._data.get(url, []) for url in urls}
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            return dict(self._data)
+
+    def iter_items(self):
+        # A shallow copy of the item references; link lists are never
+        # mutated in place, so they can be serialized outside the lock.
+        with self._lock:
+            self._refresh()
+            items = list(self._data.items())
+        return iter(items)
+
+    def set(self, url, links):
+        return self._write('merge', {url: links})
+
+    def replace(self, store):
+        return self._write('replace', dict(store))
+
+    def merge(self, entries):
+        return self._write('merge', dict(entries))
+
+    def revision(self):
+        with self._lock:
+            self._refresh()
+            return self._revision
+
+    def url_revision(self, url):
+        with self._lock:
+            self._refresh()
+            return self._revisions.get(url, 0)
+
+    def epoch(self):
+        with self._lock:
+            self._refresh()
+            return self._epoch
+
+    def _load_store(self, raw, path: Path) -> None:
+        """Replace the in-memory state with a JSON store read from ``path``."""
+        try:
+            self._revision, self._revisions, self._data, epoch = parse_store(raw)
+        except StoreError as e:
+            raise StoreError(f"{path} is not a link store: {e}") from e
+        # Files written before epochs existed keep the one chosen on open
+        # and get it persisted with the next write.
+        if epoch is not None:
+            self._epoch = epoch
+
+    def changes(self, since):
+        with self._lock:
+            self._refresh()
+            changed = {url: self._data.get(url, [])
+                       for url, rev in self._revisions.items() if rev > since}
+            return self._revision, changed
+
+    def is_empty(self):
+        with self._lock:
+            self._refresh()
+            return not self._data
+
+    def stats(self):
+        with self._lock:
+            entries = sum(1 for links in self._data.values() if links)
+        return {'entries': entries, 'bytes': self._disk_bytes()}
+
+    def _disk_bytes(self) -> int:
+        raise NotImplementedError
+
+
+class JsonFileBackend(MemoryBackend):
+    """Keep the link store resident in memory and persist it to a JSON file.
+
+    By default writes are persisted write-behind: they mark the store dirty
+    and a background thread flushes it every ``flush_interval`` seconds, or
+    as soon as ``flush_threshold`` writes are pending. ``close`` performs a
+    final flush.
+
+    With ``shared=True`` several server processes may use the same file.
+    Each write then takes an exclusive lock on ``<path>.lock``, picks up
+    changes made by other processes and goes straight to disk, and reads
+    reload the file whenever another process has replaced it.
+
+    The file is always replaced atomically (temporary file plus rename), so
+    readers see either the old or the new store, never a partial one. A file
+    that cannot be parsed raises ``StoreError`` instead of being treated as an
+    empty store.
+    """
+
+    name = 'json'
+
+    def __init__(self, path, flush_interval: float = 5.0, flush_threshold: int = 100,
+                 shared: bool = False):
+        super().__init__()
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.flush_interval = flush_interval
+        self.flush_threshold = max(1, flush_threshold)
+        self.shared = shared
+        # Only shared mode touches the disk on the request path.
+        self.blocking_io = shared
+        self._signature = None
+        self._load()
+        self._dirty = 0
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher = None
+        if not shared:
+            self._flusher = threading.Thread(target=self._run, name='link-store-flusher', daemon=True)
+            self._flusher.start()
+
+    def _load(self):
+        """Load the file unless the copy in memory is already current."""
+        try:
+            f = self.path.open('rb')
+        except FileNotFoundError:
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if signature == self._signature:
+                return
+            with persist_timer(self.name, 'read'):
+                try:
+                    raw = json.load(f)
+                except ValueError as e:
+                    raise StoreError(f"{self.path} is not valid JSON: {e}") from e
+        self._load_store(raw, self.path)
+        self._signature = signature
+
+    def _refresh(self):
+        """Pick up writes made by other processes (shared mode only)."""
+        if not self.shared:
+            return
+        try:
+            self._load()
+        except StoreError as e:
+            # Keep serving the last good copy rather than an empty store.
+            print(f"Failed to reload link store: {e}", file=sys.stderr)
+
+    def write_store(self, store: dict) -> None:
+        """Atomically replace the JSON file with ``store``."""
+        with persist_timer(self.name, 'write'):
+            atomic_write(self.path, lambda f: json.dump(store, f))
+        st = self.path.stat()
+        self._signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _write(self, op, entries):
+        with self._lock:
+            if not self.shared:
+                revision = self._apply(op, entries)
+                self._mark_dirty()
+                return revision
+            with file_lock(self.lock_path):
+                self._load()
+                revision = self._apply(op, entries)
+                try:
+                    self.write_store(self._snapshot())
+                except BaseException:
+                    # Force a reload so memory matches the file again.
+                    self._signature = None
+                    raise
+                return revision
+
+    def _disk_bytes(self):
+        return file_size(self.path)
+
+    def _mark_dirty(self):
+        self._dirty += 1
+        if self._dirty >= self.flush_threshold or self.flush_interval <= 0:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write pending changes to disk, if there are any."""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = self._snapshot()
+            self._dirty = 0
+        # Link lists are replaced, never mutated in place, so a shallow copy
+        # is enough to serialize outside the lock.
+        try:
+            with file_lock(self.lock_path):
+                self.write_store(snapshot)
+        except Exception:
+            with self._lock:
+                self._dirty += 1
+            raise
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval if self.flush_interval > 0 else None)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Failed to flush link store: {e}", file=sys.stderr)
+
+    def close(self):
+        """Stop the background flusher and persist any pending writes."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher is not None:
+            self._wakeup.set()
+            self._flusher.join()
+        self.flush()
+
+
+class JournalBackend(MemoryBackend):
+    """Log-structured store: an append-only journal plus periodic snapshots.
+
+    Each write appends one JSON line (revision, operation and the changed
+    entries) to the journal at ``path``, so an edit costs a small append
+    regardless of store size. On startup the snapshot next to it
+    (``<name>.snapshot.json``) is loaded and the journal replayed on top; a
+    torn last line left by a crash is dropped.
+
+    A background compactor writes a fresh snapshot and truncates the journal
+    once it grows past ``compact_threshold`` bytes, and every
+    ``compact_interval`` seconds if anything was written. Journal records
+    already covered by the snapshot are skipped on replay, so a crash in the
+    middle of a compaction loses nothing. The journal is flushed to the OS
+    after every write; pass ``fsync=True`` to also survive power loss at the
+    cost of one fsync per edit. Only one process may use a journal at a time.
+    """
+
+    name = 'journal'
+
+    def __init__(self, path, compact_interval: float = 300.0,
+                 compact_threshold: int = 4 * 1024 * 1024, fsync: bool = False):
+        super().__init__()
+        self.path = Path(path)
+        self.snapshot_path = self.path.with_name(self.path.stem + '.snapshot.json')
+        self.compact_interval = compact_interval
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        # Appends only reach the page cache unless every write is fsynced.
+        self.blocking_io = fsync
+        self._replay()
+        self._journal = self.path.open('ab')
+        self._journal_size = self._journal.tell()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._compactor = threading.Thread(target=self._run, name='link-store-compactor',
+                                           daemon=True)
+        self._compactor.start()
+
+    def _replay(self):
+        with persist_timer(self.name, 'read'):
+            self._replay_files()
+
+    def _replay_files(self):
+        if self.snapshot_path.is_file():
+            try:
+                with self.snapshot_path.open('rb') as f:
+                    raw = json.load(f)
+            except ValueError as e:
+                raise StoreError(f"{self.snapshot_path} is not valid JSON: {e}") from e
+            self._load_store(raw, self.snapshot_path)
+            self._replay_journal()
+            return
+        self._replay_journal()
+        # A new store, or a journal written before epochs existed, has no
+        # snapshot yet. Write one now so that the epoch survives a restart.
+        atomic_write(self.snapshot_path, lambda f: json.dump(self._snapshot(), f))
+
+    def _replay_journal(self):
+        if not self.path.is_file():
+            return
+        valid_size = 0
+        with self.path.open('rb') as f:
+            lines = f.readlines()
+        for number, line in enumerate(lines, 1):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("record is not terminated")
+                record = json.loads(line)
+                revision, op, entries = record['revision'], record['op'], record['entries']
+            except (ValueError, KeyError, TypeError) as e:
+                if number == len(lines):
+                    # A write interrupted by a crash; everything before it is intact.
+                    print(f"Dropping torn journal record at line {number}: {e}", file=sys.stderr)
+                    PERSIST_ERRORS.inc(backend=self.name, operation='read')
+                    break
+                raise StoreError(f"{self.path} line {number} is corrupt: {e}") from e
+            valid_size += len(line)
+            if revision <= self._revision:
+                continue  # Already part of the snapshot.
+            self._revision = revision - 1
+            self._apply(op, entries)
+        if valid_size < self.path.stat().st_size:
+            os.truncate(self.path, valid_size)
+
+    def _write(self, op, entries):
+        with self._lock:
+            record = {'revision': self._revision + 1, 'op': op, 'entries': entries}
+            line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+            # Append before applying, so a failed write leaves memory untouched.
+            with persist_timer(self.name, 'write'):
+                self._journal.write(line)
+                self._journal.flush()
+                if self.fsync:
+                    os.fsync(self._journal.fileno())
+            self._journal_size += len(line)
+            if self._journal_size >= self.compact_threshold:
+                self._wakeup.set()
+            return self._apply(op, entries)
+
+    def compact(self):
+        """Snapshot the current state and drop the journal records it covers."""
+        with persist_timer(self.name, 'compact'):
+            self._compact()
+
+    def _compact(self):
+        with self._lock:
+            if not self._journal_size:
+                return
+            snapshot = self._snapshot()
+            covered = self._journal_size
+        # Writes may continue while the snapshot is being serialized.
+        atomic_write(self.snapshot_path, lambda f: json.dump(snapshot, f))
+        with self._lock:
+            with self.path.open('rb') as f:
+                f.seek(covered)
+                tail = f.read()
+            # Windows cannot replace a file that is still open. If the
+            # rewrite fails the old journal is left in place, and reopening
+            # it keeps later writes working.
+            self._journal.close()
+            try:
+                atomic_write(self.path, lambda f: f.write(tail), binary=True)
+            finally:
+                self._journal = self.path.open('ab')
+                self._journal_size = self._journal.tell()
+
+    def _disk_bytes(self):
+        return file_size(self.path, self.snapshot_path)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.compact_interval if self.compact_interval > 0 else None)
+            self._wakeup.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Failed to compact link journal: {e}", file=sys.stderr)
+
+    def close(self):
+        """Stop the compactor, compact one last time and close the journal."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._compactor.join()
+        self.compact()
+        self._journal.close()
+
+
+def _timed(operation: str):
+    """Record the duration and failures of a backend method in metrics."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with persist_timer(self.name, operation):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class SqliteBackend(LinkBackend):
+    """Store links in SQLite with one row per page URL and link.
+
+    Each row holds the link's JSON exactly as it was saved, so the backend
+    round-trips the same values as the in-memory ones. The primary key on
+    ``(page_url, position)`` makes per-page lookups an index range scan, and
+    saving a page rewrites only that page's rows.
+    The ``pages`` table records the revision at which each page URL was last
+    written. Each thread gets its own connection; WAL mode lets readers
+    proceed while a write is in progress.
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS links (
+            page_url TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (page_url, position)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS pages (
+            page_url TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS pages_revision ON pages (revision);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO meta VALUES ('revision', 0);
+        INSERT OR IGNORE INTO meta VALUES ('epoch', random() & 281474976710655);
+        INSERT OR IGNORE INTO pages SELECT DISTINCT page_url, 0 FROM links;
+    """
+
+    # Databases written before links were stored as JSON kept only these
+    # three columns; they are converted on open.
+    UPGRADE_COLUMNS = """
+        BEGIN IMMEDIATE;
+        ALTER TABLE links RENAME TO links_columns;
+        CREATE TABLE links (
+            page_url TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (page_url, position)
+        ) WITHOUT ROWID;
+        INSERT INTO links
+            SELECT page_url, position, json_object('url', url, 'name', name,
+                                                   'description', description)
+            FROM links_columns;
+        DROP TABLE links_columns;
+        COMMIT;
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+        conn = self._connect()
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(links)')}
+        if columns and 'data' not in columns:
+            conn.executescript(self.UPGRADE_COLUMNS)
+        conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; writes open their transactions explicitly.
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _begin_write(self, conn: sqlite3.Connection) -> int:
+        """Start a write transaction and return the revision it will commit."""
+        # IMMEDIATE takes the write lock up front so two writers can never
+        # hand out the same revision.
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+        return conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    @staticmethod
+    def _rows(url: str, links: Links):
+        for position, link in enumerate(links):
+            yield url, position, json.dumps(link, separators=(',', ':'))
+
+    @_timed('read')
+    def get(self, url):
+        rows = self._connect().execute(
+            'SELECT data FROM links WHERE page_url = ? ORDER BY position', (url,))
+        return [json.loads(data) for data, in rows]
+
+    @_timed('read')
+    def get_many(self, urls):
+        store: Dict[str, Links] = {url: [] for url in urls}
+        conn = self._connect()
+        unique = list(store)
+        # Stay well below SQLite's limit on bound parameters per statement.
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                'SELECT page_url, data FROM links '
+                f'WHERE page_url IN ({placeholders}) ORDER BY page_url, position', chunk)
+            for page_url, data in rows:
+                store[page_url].append(json.loads(data))
+        return store
+
+    @_timed('read')
+    def all(self):
+        store: Dict[str, Links] = {}
+        rows = self._connect().execute(
+            'SELECT page_url, data FROM links ORDER BY page_url, position')
+        for page_url, data in rows:
+            store.setdefault(page_url, []).append(json.loads(data))
+        return store
+
+    def iter_items(self, page_size: int = 500):
+        # Page through the URLs instead of holding one cursor open: exports
+        # never load the whole table, and each page may be fetched from a
+        # different thread (as the asyncio server does).
+        last = ''
+        while True:
+            urls = [row[0] for row in self._connect().execute(
+                'SELECT page_url FROM pages WHERE page_url > ? ORDER BY page_url LIMIT ?',
+                (last, page_size))]
+            if not urls:
+                return
+            batch = self.get_many(urls)
+            for url in urls:
+                if batch[url]:
+                    yield url, batch[url]
+            last = urls[-1]
+
+    @_timed('write')
+    def set(self, url, links):
+        conn = self._connect()
+        with conn:
+            revision = self._begin_write(conn)
+            conn.execute('DELETE FROM links WHERE page_url = ?', (url,))
+            conn.executemany('INSERT INTO links VALUES (?, ?, ?)', self._rows(url, links))
+            conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?)', (url, revision))
+        return revision
+
+    @_timed('write')
+    def replace(self, store):
+        conn = self._connect()
+        with conn:
+            revision = self._begin_write(conn)
+            conn.execute('DELETE FROM links')
+            # Existing page rows are kept and re-stamped so removed URLs are
+            # reported as deletions by the change feed.
+            conn.execute('UPDATE pages SET revision = ?', (revision,))
+            for url, links in store.items():
+                conn.executemany('INSERT INTO links VALUES (?, ?, ?)', self._rows(url, links))
+                conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?)', (url, revision))
+        return revision
+
+    @_timed('write')
+    def merge(self, entries):
+        conn = self._connect()
+        with conn:
+            revision = self._begin_write(conn)
+            for url, links in entries.items():
+                conn.execute('DELETE FROM links WHERE page_url = ?', (url,))
+                conn.executemany('INSERT INTO links VALUES (?, ?, ?)', self._rows(url, links))
+                conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?)', (url, revision))
+        return revision
+
+    def revision(self):
+        return self._connect().execute(
+            "SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def epoch(self):
+        return self._connect().execute(
+            "SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+
+    def url_revision(self, url):
+        row = self._connect().execute(
+            'SELECT revision FROM pages WHERE page_url = ?', (url,)).fetchone()
+        return row[0] if row else 0
+
+    def changes(self, since):
+        revision = self.revision()
+        urls = [row[0] for row in self._connect().execute(
+            'SELECT page_url FROM pages WHERE revision > ?', (since,))]
+        return revision, self.get_many(urls)
+
+    def is_empty(self):
+        return self._connect().execute('SELECT 1 FROM links LIMIT 1').fetchone() is None
+
+    def stats(self):
+        entries = self._connect().execute(
+            'SELECT COUNT(DISTINCT page_url) FROM links').fetchone()[0]
+        wal = self.path.with_name(self.path.name + '-wal')
+        return {'entries': entries, 'bytes': file_size(self.path, wal)}
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def parse_store(raw) -> Tuple[int, Dict[str, int], Dict[str, Links], Optional[int]]:
+    """Split a loaded JSON store into ``(revision, revisions, links, epoch)``.
+
+    Accepts both the versioned layout written by ``JsonFileBackend`` and the
+    original flat ``{page_url: links}`` mapping. ``epoch`` is None for files
+    written before stores had one. Raises ``StoreError`` for anything else,
+    so that a foreign file is never mistaken for an empty store and then
+    overwritten.
+    """
+    if not isinstance(raw, dict):
+        raise StoreError(f"expected a JSON object, got {type(raw).__name__}")
+    if raw.get('version') == JSON_FORMAT_VERSION:
+        if not isinstance(raw.get('links', {}), dict) or not isinstance(raw.get('revisions', {}), dict):
+            raise StoreError("'links' and 'revisions' must be JSON objects")
+        return (raw.get('revision', 0), raw.get('revisions', {}), raw.get('links', {}),
+                raw.get('epoch'))
+    return 0, {url: 0 for url in raw}, raw, None
+
+
+def open_backend(kind: str = 'json', path: Optional[str] = None, **options) -> LinkBackend:
+    """Create the storage backend called ``kind``.
+
+    ``path`` defaults to the entry for ``kind`` in ``DEFAULT_PATHS``. Extra
+    keyword options are passed to the backend (for example the flush settings
+    of the JSON backend).
+    """
+    if kind not in DEFAULT_PATHS:
+        raise ValueError(f"Unknown storage backend: {kind}")
+    path = path or DEFAULT_PATHS[kind]
+    if kind == 'sqlite':
+        return SqliteBackend(path)
+    if kind == 'journal':
+        return JournalBackend(path, **options)
+    return JsonFileBackend(path, **options)
+
+
+def open_backend_from_env(environ=None) -> LinkBackend:
+    """Create the backend configured by ``STORAGE_*`` environment variables.
+
+    - ``STORAGE_BACKEND``: ``json`` (default), ``sqlite`` or ``journal``
+    - ``STORAGE_DATA_FILE``: data file, defaults to ``DEFAULT_PATHS``
+    - ``STORAGE_FLUSH_INTERVAL``: seconds between background flushes (json)
+    - ``STORAGE_FLUSH_THRESHOLD``: pending writes that force a flush (json)
+    - ``STORAGE_SHARED``: set when several processes share the file (json)
+    - ``STORAGE_COMPACT_INTERVAL``: seconds between compactions (journal)
+    - ``STORAGE_COMPACT_THRESHOLD``: journal bytes that force a compaction (journal)
+    - ``STORAGE_JOURNAL_FSYNC``: fsync the journal after every write (journal)
+    """
+    environ = os.environ if environ is None else environ
+    kind = environ.get('STORAGE_BACKEND', 'json')
+    path = environ.get('STORAGE_DATA_FILE')
+    if kind == 'journal':
+        return open_backend(
+            'journal', path,
+            compact_interval=float(environ.get('STORAGE_COMPACT_INTERVAL', '300')),
+            compact_threshold=int(environ.get('STORAGE_COMPACT_THRESHOLD', str(4 * 1024 * 1024))),
+            fsync=environ.get('STORAGE_JOURNAL_FSYNC', '') not in ('', '0', 'false'),
+        )
+    if kind != 'json':
+        return open_backend(kind, path)
+    return open_backend(
+        'json', path,
+        flush_interval=float(environ.get('STORAGE_FLUSH_INTERVAL', '5')),
+        flush_threshold=int(environ.get('STORAGE_FLUSH_THRESHOLD', '100')),
+        shared=environ.get('STORAGE_SHARED', '') not in ('', '0', 'false'),
+    )
+
+
+def migrate_json(json_path, backend: LinkBackend) -> int:
+    """Import an existing ``stored_links.json`` into ``backend``.
+
+    The migration is one-shot: it refuses to overwrite a backend that already
+    holds links. Returns the number of page URLs imported.
+    """
+    json_path = Path(json_path)
+    if not backend.is_empty():
+        raise ValueError("Target storage already contains links; refusing to migrate")
+    with json_path.open() as f:
+        raw = json.load(f)
+    try:
+        store = parse_store(raw)[2]
+    except StoreError as e:
+        raise StoreError(f"{json_path} is not a link store: {e}") from e
+    backend.replace(store)
+    return len(store)
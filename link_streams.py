@@ -0,0 +1,173 @@
+"""Streaming export and import helpers shared by both storage servers.
+
+Exports are produced as a sequence of byte chunks so the server never holds
+the whole serialized store in memory, optionally compressed with gzip or
+brotli (when the ``brotli`` package is installed). Imports are read as
+NDJSON, one ``{"url": ..., "links": [...]}`` object per line, and decoded
+incrementally as the request body arrives.
+"""
+import json
+import zlib
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_TYPE = 'application/json'
+NDJSON_TYPE = 'application/x-ndjson'
+
+# Size of the chunks handed to the HTTP server while streaming.
+CHUNK_SIZE = 64 * 1024
+# Number of imported entries merged into the store per backend call.
+IMPORT_BATCH_SIZE = 500
+
+
+def export_format(format_arg: Optional[str], accept: str) -> str:
+    """Return ``'ndjson'`` or ``'json'`` from ``?format=`` or the Accept header."""
+    if format_arg:
+        return 'ndjson' if format_arg == 'ndjson' else 'json'
+    return 'ndjson' if NDJSON_TYPE in accept else 'json'
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick ``'br'``, ``'gzip'`` or ``None`` from an Accept-Encoding header."""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        key, _, value = params.partition('=')
+        if key.strip() == 'q':
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def make_etag(epoch: int, revision: int, variant: str = '') -> str:
+    """Quoted ETag for a response built from ``revision`` of store ``epoch``."""
+    return f'"{epoch:x}-r{revision}{variant}"'
+
+
+def is_link_store(payload) -> bool:
+    """Whether ``payload`` is a ``{page_url: [links]}`` mapping."""
+    return isinstance(payload, dict) and all(isinstance(links, list) for links in payload.values())
+
+
+def _buffered(pieces: Iterable[str]) -> Iterator[bytes]:
+    buffer: List[str] = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def iter_json(items: Iterable[Tuple[str, list]]) -> Iterator[bytes]:
+    """Serialize ``(url, links)`` pairs as one JSON object, chunk by chunk."""
+    def pieces():
+        yield '{'
+        first = True
+        for url, links in items:
+            yield ('' if first else ',') + json.dumps(url) + ':' + json.dumps(links, separators=(',', ':'))
+            first = False
+        yield '}\n'
+    return _buffered(pieces())
+
+
+def iter_ndjson(items: Iterable[Tuple[str, list]]) -> Iterator[bytes]:
+    """Serialize ``(url, links)`` pairs as NDJSON, chunk by chunk."""
+    return _buffered(json.dumps({'url': url, 'links': links}, separators=(',', ':')) + '\n'
+                     for url, links in items)
+
+
+def iter_export(items: Iterable[Tuple[str, list]], fmt: str) -> Iterator[bytes]:
+    return iter_ndjson(items) if fmt == 'ndjson' else iter_json(items)
+
+
+def compress_chunks(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """Compress a chunk stream with ``encoding`` (``'gzip'``, ``'br'`` or None)."""
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == 'br':
+        compressor = brotli.Compressor()
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class NdjsonError(ValueError):
+    """Raised when an NDJSON import body cannot be decoded."""
+
+
+class NdjsonDecoder:
+    """Incrementally decode an NDJSON import body.
+
+    ``feed`` takes raw (optionally gzip-compressed) body bytes and returns the
+    ``(url, links)`` entries completed so far; ``finish`` returns whatever
+    remains once the body has ended. Raises ``NdjsonError`` on a malformed
+    body.
+    """
+
+    def __init__(self, content_encoding: Optional[str] = None):
+        encoding = (content_encoding or '').lower()
+        if encoding not in ('', 'identity', 'gzip'):
+            raise NdjsonError(f"Unsupported Content-Encoding: {content_encoding}")
+        self._decompressor = zlib.decompressobj(47) if encoding == 'gzip' else None
+        self._pending = b''
+        self.line_number = 0
+
+    def feed(self, data: bytes) -> List[Tuple[str, list]]:
+        if self._decompressor is not None:
+            data = self._decompress(self._decompressor.decompress, data)
+        lines = (self._pending + data).split(b'\n')
+        self._pending = lines.pop()
+        return [entry for entry in map(self._parse, lines) if entry is not None]
+
+    def finish(self) -> List[Tuple[str, list]]:
+        if self._decompressor is not None:
+            self._pending += self._decompress(self._decompressor.flush)
+            if not self._decompressor.eof:
+                raise NdjsonError("gzip body is truncated")
+        entry = self._parse(self._pending)
+        self._pending = b''
+        return [entry] if entry is not None else []
+
+    @staticmethod
+    def _decompress(method, *args) -> bytes:
+        try:
+            return method(*args)
+        except zlib.error as e:
+            raise NdjsonError(f"invalid gzip body: {e}") from None
+
+    def _parse(self, line: bytes) -> Optional[Tuple[str, list]]:
+        self.line_number += 1
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise NdjsonError(f"line {self.line_number}: {e}") from None
+        if (not isinstance(record, dict) or not isinstance(record.get('url'), str)
+                or not isinstance(record.get('links', []), list)):
+            raise NdjsonError(f'line {self.line_number}: expected {{"url": ..., "links": [...]}}')
+        return record['url'], record.get('links', [])
+
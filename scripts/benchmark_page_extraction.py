@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Page extraction micro-benchmark
+===============================
+
+Times the per-page work of turning saved HTML into the Selenium scraper's
+page fields, before and after single-pass extraction:
+
+- ``bs4``        BeautifulSoup with ``html.parser``, then the scraper's old
+                 ``extract_title``, ``extract_description``,
+                 ``extract_meta_description``, ``extract_breadcrumbs``,
+                 ``extract_h1`` and ``extract_h2_headings`` (kept below as
+                 the reference), each walking the tree on its own
+- ``single``     ``page_extract.extract_fields`` on lxml (when installed),
+                 which also collects the link hrefs and navigation text
+- ``single-std`` the same single pass on the standard library parser
+
+Each fixture is processed ``--repeat`` times and the median is reported.
+The fields of both paths are compared, and any difference is printed. The
+links and navigation text of the single pass are also checked against
+``page_extract``'s CSS selectors run through BeautifulSoup, which is what
+keeps its hand-written matching rules in step with the selectors.
+Fixtures are the ``*.html`` files in ``scripts/fixtures/pages``; point
+``--fixtures`` at a directory of pages saved from the live site (for
+example ``driver.page_source``) to measure those instead.
+
+Example:
+    python scripts/benchmark_page_extraction.py --repeat 50
+"""
+
+import argparse
+import json
+import re
+import statistics
+import time
+from pathlib import Path
+from typing import List
+
+from bs4 import BeautifulSoup
+
+import page_extract
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'pages'
+
+
+def median_ms(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+# The per-field BeautifulSoup extractors the Selenium scraper used before
+# single-pass extraction. They are the reference page_extract is checked
+# against, so change them only together with its rules.
+
+def extract_title(soup: BeautifulSoup) -> str:
+    """Extract page title"""
+    # Try page title first
+    title_tag = soup.find('title')
+    if title_tag:
+        title = title_tag.get_text().strip()
+        title = re.sub(r'\s*—\s*Dynatrace\s*Docs?\s*$', '', title)
+        if title and title != "Dynatrace Documentation":
+            return title
+
+    # Try h1 tag
+    h1_tag = soup.find('h1')
+    if h1_tag:
+        title = h1_tag.get_text().strip()
+        if title:
+            return title
+
+    # Try various other selectors
+    title_selectors = [
+        '.page-title',
+        '.title',
+        '[data-testid="title"]',
+        '.content h1',
+        'main h1',
+        'article h1'
+    ]
+
+    for selector in title_selectors:
+        element = soup.select_one(selector)
+        if element:
+            title = element.get_text().strip()
+            if title:
+                return title
+
+    return "Untitled Page"
+
+
+def extract_description(soup: BeautifulSoup) -> str:
+    """Extract page description"""
+    selectors = [
+        '.lead',
+        '.description',
+        '.page-description',
+        '.intro',
+        '.summary',
+        '.content > p:first-of-type',
+        'main > p:first-of-type',
+        'article > p:first-of-type',
+        '.markdown > p:first-of-type'
+    ]
+
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if element:
+            text = element.get_text().strip()
+            if len(text) > 10:
+                return text[:500]
+
+    return "No description available"
+
+
+def extract_meta_description(soup: BeautifulSoup) -> str:
+    """Extract meta description"""
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    if meta_desc:
+        return meta_desc.get('content', '').strip()
+    return ""
+
+
+def extract_breadcrumbs(soup: BeautifulSoup) -> List[str]:
+    """Extract breadcrumb navigation"""
+    breadcrumbs = []
+
+    selectors = [
+        '.breadcrumb a',
+        '.breadcrumbs a',
+        '[data-testid="breadcrumb"] a',
+        'nav[aria-label="breadcrumb"] a',
+        '.page-breadcrumbs a',
+        '[aria-label="Breadcrumb"] a'
+    ]
+
+    for selector in selectors:
+        elements = soup.select(selector)
+        if elements:
+            breadcrumbs = [el.get_text().strip() for el in elements]
+            break
+
+    return breadcrumbs
+
+
+def extract_h1(soup: BeautifulSoup) -> str:
+    """Extract main H1 heading"""
+    h1 = soup.find('h1')
+    return h1.get_text().strip() if h1 else ""
+
+
+def extract_h2_headings(soup: BeautifulSoup) -> List[str]:
+    """Extract all H2 headings"""
+    h2_tags = soup.find_all('h2')
+    return [h2.get_text().strip() for h2 in h2_tags]
+
+
+def extract_links(soup: BeautifulSoup) -> List[str]:
+    """Hrefs matched by the scraper's link selectors, in first-seen order"""
+    hrefs = [element['href'] for selector in page_extract.NAV_LINK_SELECTORS + page_extract.CONTENT_LINK_SELECTORS
+             for element in soup.select(selector)]
+    return list(dict.fromkeys(hrefs))
+
+
+def extract_nav_text(soup: BeautifulSoup) -> str:
+    """Text of the elements matched by the scraper's navigation text selector"""
+    nav_texts = [element.get_text(" ", strip=True) for element in soup.select(page_extract.NAV_TEXT_SELECTOR)]
+    return " | ".join(text for text in nav_texts if text)[:1000]
+
+
+def bs4_fields(soup: BeautifulSoup) -> dict:
+    return {
+        'title': extract_title(soup),
+        'description': extract_description(soup),
+        'meta_description': extract_meta_description(soup),
+        'breadcrumbs': extract_breadcrumbs(soup),
+        'h1_heading': extract_h1(soup),
+        'h2_headings': extract_h2_headings(soup),
+    }
+
+
+def mismatches(soup: BeautifulSoup, fields: page_extract.PageFields) -> List[str]:
+    """Names of the fields where ``fields`` differs from the reference extractors"""
+    expected = bs4_fields(soup)
+    # The static tier takes links and nav text from the single pass too, so
+    # check them against the selectors the browser tier runs
+    expected['links'] = extract_links(soup)
+    expected['nav_text'] = extract_nav_text(soup)
+    differ = [name for name, value in expected.items()
+              if name != 'links' and value != getattr(fields, name)]
+    # Selectors match in order per selector, the single pass in document
+    # order; the scraper only uses the set
+    if set(expected['links']) != set(fields.links):
+        differ.append('links')
+    return differ
+
+
+def single_pass(html: str, stdlib: bool = False):
+    # Swapping the module's parser is enough to force the fallback
+    saved = page_extract.etree
+    if stdlib:
+        page_extract.etree = None
+    try:
+        return page_extract.extract_fields(html)
+    finally:
+        page_extract.etree = saved
+
+
+def benchmark_page(path: Path, repeat: int) -> dict:
+    html = path.read_text(encoding='utf-8')
+    soup = BeautifulSoup(html, 'html.parser')
+    result = {
+        'kb': len(html.encode()) / 1024,
+        'bs4_parse_ms': median_ms(lambda: BeautifulSoup(html, 'html.parser'), repeat),
+        'bs4_extract_ms': median_ms(lambda: bs4_fields(soup), repeat),
+        'single_ms': median_ms(lambda: single_pass(html), repeat),
+        'single_std_ms': median_ms(lambda: single_pass(html, stdlib=True), repeat),
+    }
+    result['bs4_ms'] = result['bs4_parse_ms'] + result['bs4_extract_ms']
+
+    result['mismatches'] = mismatches(soup, single_pass(html))
+    result['mismatches_std'] = mismatches(soup, single_pass(html, stdlib=True))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark page field extraction on saved HTML')
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES,
+                        help='Directory of saved .html pages')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per page; the median is reported')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    pages = sorted(args.fixtures.glob('*.html'))
+    if not pages:
+        parser.error(f"no .html files in {args.fixtures}")
+
+    results = {path.name: benchmark_page(path, args.repeat) for path in pages}
+
+    single = 'single' if page_extract.etree is not None else 'single*'
+    print(f"\n{'page':<22} {'KB':>6} {'bs4 parse':>10} {'bs4 extr':>9} {'bs4 total':>10} "
+          f"{single:>8} {'single-std':>11} {'speedup':>8}")
+    for name, r in results.items():
+        print(f"{name:<22} {r['kb']:>6.0f} {r['bs4_parse_ms']:>10.2f} {r['bs4_extract_ms']:>9.2f} "
+              f"{r['bs4_ms']:>10.2f} {r['single_ms']:>8.2f} {r['single_std_ms']:>11.2f} "
+              f"{r['bs4_ms'] / r['single_ms']:>7.1f}x")
+    total_before = sum(r['bs4_ms'] for r in results.values())
+    total_after = sum(r['single_ms'] for r in results.values())
+    print(f"{'all pages':<22} {'':>6} {'':>10} {'':>9} {total_before:>10.2f} {total_after:>8.2f} "
+          f"{sum(r['single_std_ms'] for r in results.values()):>11.2f} {total_before / total_after:>7.1f}x")
+    print("\nTimes are median milliseconds per page.")
+    if page_extract.etree is None:
+        print("* lxml is not installed, so the single pass used html.parser in both columns.")
+
+    for name, r in results.items():
+        for parser_name, differ in ((page_extract.PARSER, r['mismatches']), ('html.parser', r['mismatches_std'])):
+            if differ:
+                print(f"{name}: {parser_name} fields differ from the BeautifulSoup extractors: {', '.join(differ)}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'parser': page_extract.PARSER, 'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
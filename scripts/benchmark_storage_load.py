@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Storage server load test
+========================
+
+Starts the storage server locally once per backend, seeds it with a
+synthetic store of ``--pages`` page URLs (anything from 1k to 500k), and
+drives it from concurrent keep-alive clients with a mix of:
+
+- ``get``     ``GET /links/<url>`` for a random page
+- ``post``    ``POST /links/<url>`` for a random page
+- ``export``  ``GET /links``, the whole store
+- ``import``  ``POST /links`` with an NDJSON body of ``--import-size`` pages
+
+For each backend it reports throughput, latency percentiles per request
+type, the time taken to seed the store, the store size from ``/metrics`` and
+the server's peak RSS (Linux only, read from ``/proc``). Results are written
+to a JSON file; pass an earlier results file with ``--compare`` to print the
+change in throughput and latency against it.
+
+Examples:
+    python scripts/benchmark_storage_load.py --pages 100000 --backends json sqlite journal
+    python scripts/benchmark_storage_load.py --mix get=50,post=40,import=10 --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from benchmark_storage_servers import (ROOT, SERVERS, HttpClient, free_port, page_url, run_load,
+                                       start_server, stop_server, summarize)
+
+DEFAULT_MIX = 'get=80,post=15,import=4,export=1'
+NDJSON_HEADERS = {'Content-Type': 'application/x-ndjson'}
+# Pages per NDJSON request while seeding.
+SEED_BATCH = 5000
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse ``get=80,post=15,...`` into cumulative thresholds in ``[0, 1]``."""
+    weights = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ('get', 'post', 'export', 'import'):
+            raise ValueError(f"unknown request type in mix: {name!r}")
+        try:
+            weights[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"bad weight for {name!r}: {weight!r}") from None
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("the mix needs at least one positive weight")
+    thresholds, running = {}, 0.0
+    for name, weight in weights.items():
+        running += weight / total
+        thresholds[name] = running
+    return thresholds
+
+
+def page_links(i: int, label: str = "Runbook") -> list:
+    return [{'url': f"https://intranet.example.com/wiki/{i}/{j}",
+             'name': f"{label} {i}.{j}",
+             'description': "Internal notes for this page"}
+            for j in range(3)]
+
+
+def ndjson_body(pages) -> bytes:
+    return ''.join(json.dumps({'url': page_url(i), 'links': page_links(i, "Imported")},
+                              separators=(',', ':')) + '\n' for i in pages).encode()
+
+
+def load_request(rng, thresholds: Dict[str, float], pages: int, import_size: int):
+    """Pick one request of the configured mix: (label, method, path, body, headers)."""
+    roll = rng.random()
+    kind = next((name for name, limit in thresholds.items() if roll < limit), 'get')
+    if kind == 'get':
+        url = quote(page_url(rng.randrange(pages)), safe='')
+        return 'get', 'GET', f"/links/{url}", b'', {}
+    if kind == 'post':
+        i = rng.randrange(pages)
+        body = json.dumps(page_links(i, "Edited")).encode()
+        return 'post', 'POST', f"/links/{quote(page_url(i), safe='')}", body, {}
+    if kind == 'export':
+        return 'export', 'GET', "/links", b'', {}
+    start = rng.randrange(max(1, pages - import_size))
+    return 'import', 'POST', "/links", ndjson_body(range(start, start + import_size)), NDJSON_HEADERS
+
+
+def seed(port: int, pages: int) -> float:
+    """Fill the store through NDJSON imports and return the seconds taken."""
+    async def run():
+        client = HttpClient(port)
+        try:
+            for start in range(0, pages, SEED_BATCH):
+                body = ndjson_body(range(start, min(pages, start + SEED_BATCH)))
+                status, _, data = await client.request('POST', '/links', body, NDJSON_HEADERS)
+                if status != 200:
+                    raise RuntimeError(f"Seeding failed with HTTP {status}: {data[:200]!r}")
+        finally:
+            await client.close()
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+def store_stats(port: int) -> dict:
+    """Read the store gauges from ``/metrics``."""
+    async def fetch():
+        client = HttpClient(port)
+        try:
+            return await client.request('GET', '/metrics')
+        finally:
+            await client.close()
+    status, _, data = asyncio.run(fetch())
+    stats = {}
+    if status == 200:
+        for line in data.decode().splitlines():
+            name, _, value = line.partition(' ')
+            if name in ('link_store_entries', 'link_store_bytes'):
+                stats[name[len('link_store_'):]] = int(float(value))
+    return stats
+
+
+def peak_rss(pid: int) -> Optional[int]:
+    """Peak resident set size of ``pid`` in bytes, or None off Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_backend(args, backend: str, thresholds: Dict[str, float]) -> dict:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = {'STORAGE_BACKEND': backend,
+               'STORAGE_DATA_FILE': str(Path(tmpdir) / f"links.{backend}")}
+        port = free_port()
+        proc = start_server(SERVERS[args.server], port, env)
+        try:
+            seed_seconds = seed(port, args.pages)
+            print(f"{backend}: seeded {args.pages} pages in {seed_seconds:.1f}s", flush=True)
+            latencies, errors = asyncio.run(run_load(
+                port, args.clients, args.duration,
+                lambda rng: load_request(rng, thresholds, args.pages, args.import_size),
+                seed=args.seed))
+            stats = store_stats(port)
+            rss = peak_rss(proc.pid)
+        finally:
+            stop_server(proc)
+    summary = summarize(latencies, errors, args.duration)
+    summary.update({
+        'seed_seconds': seed_seconds,
+        'store_entries': stats.get('entries'),
+        'store_bytes': stats.get('bytes'),
+        'peak_rss_bytes': rss,
+    })
+    return summary
+
+
+def print_results(results: dict) -> None:
+    print(f"\n{'backend':<8} {'type':<7} {'requests':>9} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for backend, summary in results.items():
+        for label, route in summary['routes'].items():
+            print(f"{backend:<8} {label:<7} {route['requests']:>9} {route['p50_ms']:>9.2f} "
+                  f"{route['p90_ms']:>9.2f} {route['p99_ms']:>9.2f} {route['max_ms']:>9.2f}")
+    print(f"\n{'backend':<8} {'req/s':>9} {'errors':>7} {'seed s':>8} {'store MB':>9} {'peak RSS MB':>12}")
+    for backend, summary in results.items():
+        store_mb = (summary['store_bytes'] or 0) / 2**20
+        rss = summary['peak_rss_bytes']
+        rss_text = f"{rss / 2**20:.1f}" if rss is not None else 'n/a'
+        print(f"{backend:<8} {summary['requests_per_sec']:>9.0f} {summary['errors']:>7} "
+              f"{summary['seed_seconds']:>8.1f} {store_mb:>9.1f} {rss_text:>12}")
+
+
+def print_comparison(results: dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+
+    print(f"\nChange against {baseline_path}:")
+    print(f"{'backend':<8} {'req/s':>9} {'p50':>9} {'p99':>9} {'peak RSS':>9}")
+    for backend, summary in results.items():
+        old = baseline.get(backend)
+        if old is None:
+            continue
+        rss = (change(summary['peak_rss_bytes'], old['peak_rss_bytes'])
+               if summary['peak_rss_bytes'] and old.get('peak_rss_bytes') else 'n/a')
+        print(f"{backend:<8} {change(summary['requests_per_sec'], old['requests_per_sec']):>9} "
+              f"{change(summary['p50_ms'], old['p50_ms']):>9} "
+              f"{change(summary['p99_ms'], old['p99_ms']):>9} {rss:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the link storage server')
+    parser.add_argument('--server', choices=sorted(SERVERS), default='flask')
+    parser.add_argument('--backends', nargs='+', choices=['json', 'sqlite', 'journal'],
+                        default=['json', 'sqlite'])
+    parser.add_argument('--pages', type=int, default=1000, help='Page URLs in the seeded store')
+    parser.add_argument('--clients', type=int, default=20, help='Concurrent client connections')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of load per backend')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f'Request weights by type (default {DEFAULT_MIX})')
+    parser.add_argument('--import-size', type=int, default=100, help='Pages per import request')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the request sequence')
+    parser.add_argument('--output', default='storage_load_results.json',
+                        help='JSON file to write the results to')
+    parser.add_argument('--compare', metavar='RESULTS_JSON',
+                        help='Earlier results file to compare against')
+    args = parser.parse_args()
+    try:
+        thresholds = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    results = {backend: benchmark_backend(args, backend, thresholds) for backend in args.backends}
+    print_results(results)
+    if args.compare:
+        print_comparison(results, args.compare)
+
+    report = {
+        'started': started,
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {'server': args.server, 'pages': args.pages, 'clients': args.clients,
+                   'duration': args.duration, 'mix': args.mix, 'import_size': args.import_size,
+                   'seed': args.seed},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
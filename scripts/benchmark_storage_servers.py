@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Storage server benchmark: Flask vs asyncio
+==========================================
+
+Starts ``storage_server.py`` (Flask) and ``async_storage_server.py`` (ASGI,
+served by uvicorn) one after the other on the same seeded data, drives both
+with the same number of concurrent keep-alive clients, and prints
+requests/sec and latency percentiles for each.
+
+The load mix is 70% ``GET /links/<url>``, 20% ``POST /links/<url>`` and 10%
+``POST /links/batch`` for 50 URLs. Only the standard library is needed to
+drive the load; uvicorn must be installed to start the asyncio server.
+
+Example:
+    python scripts/benchmark_storage_servers.py --clients 100 --duration 15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SERVERS = {
+    'flask': [sys.executable, str(ROOT / 'storage_server.py'), '--port', '{port}'],
+    'asyncio': [sys.executable, str(ROOT / 'async_storage_server.py'), '--port', '{port}'],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(command: list, port: int, env: dict) -> subprocess.Popen:
+    """Start a server process and wait until ``/ping`` answers."""
+    proc = subprocess.Popen([part.format(port=port) for part in command], cwd=ROOT,
+                            env={**os.environ, **env},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}: {' '.join(command)}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as s:
+                s.sendall(b'GET /ping HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+                if b'pong' in s.recv(4096):
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"Server did not start: {' '.join(command)}")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def page_url(i: int) -> str:
+    return f"https://docs.dynatrace.com/docs/bench/page-{i}"
+
+
+def synthetic_store(pages: int, links_per_page: int = 3) -> dict:
+    return {
+        page_url(i): [{'url': f"https://intranet.example.com/wiki/{i}/{j}",
+                       'name': f"Runbook {i}.{j}",
+                       'description': "Internal notes for this page"}
+                      for j in range(links_per_page)]
+        for i in range(pages)
+    }
+
+
+class HttpClient:
+    """Minimal HTTP/1.1 keep-alive client on asyncio streams."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b'', headers: dict = None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        headers = dict(headers or {})
+        if body:
+            headers.setdefault('Content-Type', 'application/json')
+        lines = [f"{method} {path} HTTP/1.1", "Host: localhost",
+                 f"Content-Length: {len(body)}"]
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            await self.close()
+            raise ConnectionError("connection closed by server")
+        version, status = status_line.split()[:2]
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        if 'content-length' in response_headers:
+            data = await self.reader.readexactly(int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding') == 'chunked':
+            data = await self._read_chunked()
+        else:
+            data = await self.reader.read()
+        if version == b'HTTP/1.0' or response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return int(status), response_headers, data
+
+    async def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+def mixed_request(rng: random.Random, pages: int):
+    """Pick one request of the default load mix: (label, method, path, body, headers)."""
+    roll = rng.random()
+    url = quote(page_url(rng.randrange(pages)), safe='')
+    if roll < 0.7:
+        return 'get', 'GET', f"/links/{url}", b'', {}
+    if roll < 0.9:
+        links = [{'url': "https://intranet.example.com/wiki/edited",
+                  'name': "Edited", 'description': ""}]
+        return 'post', 'POST', f"/links/{url}", json.dumps(links).encode(), {}
+    urls = [page_url(rng.randrange(pages)) for _ in range(50)]
+    return 'batch', 'POST', "/links/batch", json.dumps({'urls': urls}).encode(), {}
+
+
+async def run_load(port: int, clients: int, duration: float, pick_request, seed: int = 0):
+    """Drive the server with ``clients`` concurrent connections for ``duration`` seconds.
+
+    ``pick_request(rng)`` returns ``(label, method, path, body, headers)``.
+    Returns ``(latencies, errors)``: a dict mapping each label to its list of
+    latencies in seconds, and the number of failed requests.
+    """
+    latencies = {}
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(n: int):
+        nonlocal errors
+        rng = random.Random(seed * 10007 + n)
+        client = HttpClient(port)
+        try:
+            while time.perf_counter() < deadline:
+                label, method, path, body, headers = pick_request(rng)
+                start = time.perf_counter()
+                try:
+                    status, _, _ = await client.request(method, path, body, headers)
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+                    errors += 1
+                    await client.close()
+                    continue
+                if status >= 400:
+                    errors += 1
+                    continue
+                latencies.setdefault(label, []).append(time.perf_counter() - start)
+        finally:
+            await client.close()
+
+    await asyncio.gather(*(worker(n) for n in range(clients)))
+    return latencies, errors
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: dict, errors: int, duration: float) -> dict:
+    everything = [v for values in latencies.values() for v in values]
+    summary = {
+        'requests': len(everything),
+        'errors': errors,
+        'requests_per_sec': len(everything) / duration,
+        'p50_ms': percentile(everything, 50) * 1000,
+        'p90_ms': percentile(everything, 90) * 1000,
+        'p99_ms': percentile(everything, 99) * 1000,
+        'max_ms': max(everything, default=0.0) * 1000,
+        'routes': {},
+    }
+    for label, values in sorted(latencies.items()):
+        summary['routes'][label] = {
+            'requests': len(values),
+            'p50_ms': percentile(values, 50) * 1000,
+            'p90_ms': percentile(values, 90) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'max_ms': max(values) * 1000,
+        }
+    return summary
+
+
+def seed_store(port: int, pages: int) -> None:
+    async def seed():
+        client = HttpClient(port)
+        status, _, _ = await client.request('POST', '/links', json.dumps(synthetic_store(pages)).encode())
+        await client.close()
+        if status != 200:
+            raise RuntimeError(f"Seeding failed with HTTP {status}")
+    asyncio.run(seed())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the Flask and asyncio storage servers')
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['flask', 'asyncio'])
+    parser.add_argument('--backend', choices=['json', 'sqlite', 'journal'], default='json')
+    parser.add_argument('--pages', type=int, default=1000, help='Page URLs in the seeded store')
+    parser.add_argument('--clients', type=int, default=50, help='Concurrent client connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per server')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.servers:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = {'STORAGE_BACKEND': args.backend,
+                   'STORAGE_DATA_FILE': str(Path(tmpdir) / f"links.{args.backend}")}
+            port = free_port()
+            proc = start_server(SERVERS[name], port, env)
+            try:
+                seed_store(port, args.pages)
+                latencies, errors = asyncio.run(run_load(
+                    port, args.clients, args.duration,
+                    lambda rng: mixed_request(rng, args.pages)))
+            finally:
+                stop_server(proc)
+        results[name] = summarize(latencies, errors, args.duration)
+
+    print(f"\n{args.clients} clients, {args.duration:.0f}s, {args.pages} pages, {args.backend} backend")
+    print(f"{'server':<10} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for name, summary in results.items():
+        print(f"{name:<10} {summary['requests_per_sec']:>10.0f} {summary['p50_ms']:>10.2f} "
+              f"{summary['p99_ms']:>10.2f} {summary['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Local docs fixture server
+=========================
+
+Serves a small synthetic docs site under ``/docs`` so the scrapers can be
+run without touching docs.dynatrace.com. The site has the sections the
+strategic scraper knows about, ``--subsections`` subsections in each and
+``--pages`` pages in every subsection. Every page has a title, a meta
+description, an h1, h2 headings and a ``<nav>`` with links to the sections
+and its own children.
+
+About ``--js-percent`` percent of the pages are client-rendered: their HTML
+is an empty shell that a script fills in, like a single-page app. The
+static fetch tier has to hand those to the browser, so a crawl reports
+roughly that share of pages under the browser tier. Every request is
+counted per path; ``GET /__stats`` returns the counts as JSON.
+
+Examples:
+    python scripts/docs_fixture_server.py --port 8765
+    python scripts/selenium_dynatrace_scraper.py --base-url http://127.0.0.1:8765/docs --rate 0
+    python scripts/fast_strategic_scraper.py --base-url http://127.0.0.1:8765/docs
+"""
+
+import argparse
+import html
+import json
+import threading
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+SECTIONS = ['observe', 'analyze-explore-automate', 'manage', 'ingest-from',
+            'secure', 'whats-new', 'deliver']
+
+
+class DocsSite:
+    """The page tree of the fixture site."""
+
+    def __init__(self, subsections: int = 3, pages: int = 5, js_percent: int = 20):
+        self.subsections = subsections
+        self.pages = pages
+        self.js_percent = js_percent
+
+    def children(self, path: str) -> Optional[List[str]]:
+        """Child paths of ``path``, or None if there is no such page."""
+        parts = path.strip('/').split('/')
+        if parts[0] != 'docs':
+            return None
+        parts = parts[1:]
+        if not parts:
+            return [f"/docs/{section}" for section in SECTIONS]
+        if parts[0] not in SECTIONS or len(parts) > 3:
+            return None
+        if len(parts) == 1:
+            return [f"{path}/topic-{i}" for i in range(self.subsections)]
+        if not self._index(parts[1], 'topic-', self.subsections):
+            return None
+        if len(parts) == 2:
+            return [f"{path}/page-{i}" for i in range(self.pages)]
+        return [] if self._index(parts[2], 'page-', self.pages) else None
+
+    @staticmethod
+    def _index(name: str, prefix: str, count: int) -> bool:
+        suffix = name[len(prefix):]
+        return name.startswith(prefix) and suffix.isdigit() and int(suffix) < count
+
+    def client_rendered(self, path: str) -> bool:
+        # The root page is always server-rendered so every crawl can start.
+        return path != '/docs' and zlib.crc32(path.encode()) % 100 < self.js_percent
+
+    def render(self, path: str) -> Optional[str]:
+        children = self.children(path)
+        if children is None:
+            return None
+        name = path.rstrip('/').rsplit('/', 1)[-1].replace('-', ' ').title()
+        nav = ''.join(f'<li><a href="/docs/{section}">{section.replace("-", " ").title()}</a></li>'
+                      for section in SECTIONS)
+        links = ''.join(f'<li><a href="{child}">{html.escape(child.rsplit("/", 1)[-1])}</a></li>'
+                        for child in children)
+        body = (f'<nav class="sidebar"><ul>{nav}</ul></nav>'
+                f'<main><h1>{html.escape(name)}</h1>'
+                f'<p class="lead">Fixture page for {html.escape(path)}.</p>'
+                f'<h2>Overview</h2><h2>Details</h2><ul>{links}</ul></main>')
+        if self.client_rendered(path):
+            return ('<!DOCTYPE html><html><head><title>Dynatrace Documentation</title></head>'
+                    f'<body><div id="root"></div><script>document.title = {json.dumps(name + " — Dynatrace Docs")};'
+                    f'document.getElementById("root").innerHTML = {json.dumps(body)};</script></body></html>')
+        return (f'<!DOCTYPE html><html><head><title>{html.escape(name)} — Dynatrace Docs</title>'
+                f'<meta name="description" content="About {html.escape(name)}."></head>'
+                f'<body>{body}</body></html>')
+
+
+def make_handler(site: DocsSite, hits: Counter, lock: threading.Lock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; without this, delayed
+        # ACKs add 40 ms to every keep-alive request.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0].split('#', 1)[0]
+            if path == '/__stats':
+                with lock:
+                    self.reply(200, 'application/json', json.dumps(dict(hits)))
+                return
+            with lock:
+                hits[path] += 1
+            page = site.render(path.rstrip('/') or '/')
+            if page is None:
+                self.reply(404, 'text/html; charset=utf-8', '<h1>Not found</h1>')
+            else:
+                self.reply(200, 'text/html; charset=utf-8', page)
+
+        def reply(self, status: int, content_type: str, body: str):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(site: DocsSite, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Start the fixture server in a background thread and return it.
+
+    ``server.server_address`` has the bound port; call ``server.shutdown()``
+    to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(site, Counter(), threading.Lock()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic docs site for the scrapers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--subsections', type=int, default=3, help='Subsections per section')
+    parser.add_argument('--pages', type=int, default=5, help='Pages per subsection')
+    parser.add_argument('--js-percent', type=int, default=20,
+                        help='Share of pages that are only rendered by JavaScript')
+    args = parser.parse_args()
+
+    site = DocsSite(args.subsections, args.pages, args.js_percent)
+    total = 1 + len(SECTIONS) * (1 + args.subsections * (1 + args.pages))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(site, Counter(), threading.Lock()))
+    print(f"Serving {total} fixture pages at http://{args.host}:{args.port}/docs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,23 +8,26 @@ This approach focuses on getting a good taxonomy structure FAST by:
 2. Using breadth-first approach (wide coverage, limited depth)
 3. Smart stopping when we have good coverage
 4. Parallel processing where possible
+5. Plain HTTP first: the browser is only started for pages whose
+   server-rendered HTML lacks content or links (--no-static to disable)
 """
 
 from selenium import webdriver
-from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.support.ui import WebDriverWait
 from bs4 import BeautifulSoup
 import json
 import time
 import logging
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 from dataclasses import dataclass, asdict
 from collections import deque
 import argparse
 from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
 
+from static_fetch import StaticFetcher, TierStats
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -52,13 +55,23 @@ class FastStrategicScraper:
         'deliver'
     ]
     
-    def __init__(self, base_url: str = "https://docs.dynatrace.com/docs", max_depth: int = 15):
+    def __init__(self, base_url: str = "https://docs.dynatrace.com/docs", max_depth: int = 15,
+                 static: bool = True):
         self.base_url = base_url
         self.max_depth = max_depth
         self.pages: Dict[str, FastPage] = {}
         self.visited: Set[str] = set()
         self.driver = None
         
+        # Plain-HTTP tier tried before the browser
+        self.tier_stats = TierStats()
+        self.static_fetcher = None
+        if static:
+            try:
+                self.static_fetcher = StaticFetcher()
+            except RuntimeError as e:
+                logger.warning(f"{e}; loading every page in the browser")
+        
     def setup_driver(self):
         """Setup optimized Chrome driver"""
         chrome_options = ChromeOptions()
@@ -75,49 +88,81 @@ class FastStrategicScraper:
         self.driver.set_page_load_timeout(15)
         logger.info("Optimized Chrome driver initialized")
     
+    def ensure_driver(self):
+        """Start the browser the first time a page needs it"""
+        if self.driver is None:
+            self.setup_driver()
+    
     def cleanup_driver(self):
         """Clean up driver"""
         if self.driver:
             self.driver.quit()
+            self.driver = None
+        if self.static_fetcher:
+            self.static_fetcher.close()
+    
+    def fetch_static_soup(self, url: str) -> Optional[BeautifulSoup]:
+        """Parse the server-rendered HTML of a page, or None if it cannot be fetched"""
+        if not self.static_fetcher:
+            return None
+        result = self.static_fetcher.fetch(url)
+        if result is None:
+            self.tier_stats.escalated("fetch-failed")
+            return None
+        return BeautifulSoup(result[1], 'html.parser')
+    
+    def page_from_soup(self, soup: BeautifulSoup, url: str, depth: int) -> FastPage:
+        """Build a page record from parsed HTML"""
+        # Quick title extraction
+        title_tag = soup.find('title')
+        title = title_tag.get_text().strip() if title_tag else "Untitled"
+        title = title.replace(' — Dynatrace Docs', '').replace(' - Dynatrace Docs', '')
+        
+        # Quick description from meta or first paragraph
+        description = ""
+        meta_desc = soup.find('meta', attrs={'name': 'description'})
+        if meta_desc:
+            description = meta_desc.get('content', '').strip()
+        else:
+            # Try first paragraph
+            p_tag = soup.find('p')
+            if p_tag:
+                description = p_tag.get_text().strip()[:200]
+        
+        # Determine section/subsection from URL
+        path_parts = url.replace(self.base_url, '').strip('/').split('/')
+        section = path_parts[0] if path_parts and path_parts[0] else 'root'
+        subsection = path_parts[1] if len(path_parts) > 1 and path_parts[1] else ''
+        
+        return FastPage(
+            url=url,
+            title=title,
+            description=description or "No description available",
+            section=section,
+            subsection=subsection,
+            depth=depth
+        )
     
     def extract_fast_page_info(self, url: str, depth: int) -> FastPage:
         """Fast extraction of essential page info"""
+        soup = self.fetch_static_soup(url)
+        if soup is not None:
+            page = self.page_from_soup(soup, url, depth)
+            # A client-rendered shell has no title or description of its own
+            if page.title != "Untitled" and page.description != "No description available":
+                self.tier_stats.served("static")
+                return page
+            self.tier_stats.escalated("no-content")
+        
         try:
+            self.ensure_driver()
             self.driver.get(url)
             time.sleep(1)  # Minimal wait
             
             page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # Quick title extraction
-            title_tag = soup.find('title')
-            title = title_tag.get_text().strip() if title_tag else "Untitled"
-            title = title.replace(' — Dynatrace Docs', '').replace(' - Dynatrace Docs', '')
-            
-            # Quick description from meta or first paragraph
-            description = ""
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc:
-                description = meta_desc.get('content', '').strip()
-            else:
-                # Try first paragraph
-                p_tag = soup.find('p')
-                if p_tag:
-                    description = p_tag.get_text().strip()[:200]
-            
-            # Determine section/subsection from URL
-            path_parts = url.replace(self.base_url, '').strip('/').split('/')
-            section = path_parts[0] if path_parts and path_parts[0] else 'root'
-            subsection = path_parts[1] if len(path_parts) > 1 and path_parts[1] else ''
-            
-            return FastPage(
-                url=url,
-                title=title,
-                description=description or "No description available",
-                section=section,
-                subsection=subsection,
-                depth=depth
-            )
+            page = self.page_from_soup(BeautifulSoup(page_source, 'html.parser'), url, depth)
+            self.tier_stats.served("browser")
+            return page
             
         except Exception as e:
             logger.error(f"Error processing {url}: {e}")
@@ -138,15 +183,27 @@ class FastStrategicScraper:
         section_url = f"{self.base_url}/{section}"
         links = []
         
+        soup = self.fetch_static_soup(section_url)
+        if soup is not None:
+            for link in soup.select('a[href^="/docs"]'):
+                href = urljoin(section_url, link['href'])
+                if section in href:
+                    links.append(href)
+            if links:
+                logger.info(f"Found {len(links)} links in section: {section}")
+                return list(set(links))
+            self.tier_stats.escalated("no-links")
+        
         try:
+            self.ensure_driver()
             self.driver.get(section_url)
             time.sleep(2)
             
-            # Look for navigation links in this section
-            nav_links = self.driver.find_elements(By.CSS_SELECTOR, 'a[href^="/docs"]')
+            # Look for navigation links in this section, in one driver call
+            hrefs = self.driver.execute_script(
+                'return Array.from(document.querySelectorAll(\'a[href^="/docs"]\'), a => a.href);')
             
-            for link in nav_links:
-                href = link.get_attribute('href')
+            for href in hrefs or []:
                 if href and section in href:
                     links.append(href)
             
@@ -160,7 +217,6 @@ class FastStrategicScraper:
     def strategic_crawl(self) -> Dict[str, FastPage]:
         """Strategic crawl focusing on main sections"""
         logger.info("Starting strategic crawl...")
-        self.setup_driver()
         
         try:
             # 1. Get main page
@@ -204,6 +260,7 @@ class FastStrategicScraper:
                 logger.info(f"Completed section {section}: {len([p for p in self.pages.values() if p.section == section])} pages")
             
             logger.info(f"Strategic crawl completed: {len(self.pages)} total pages")
+            logger.info(f"Pages per fetch tier:\n{self.tier_stats.report()}")
             return self.pages
             
         finally:
@@ -273,12 +330,15 @@ def main():
     parser.add_argument('--base-url', default='https://docs.dynatrace.com/docs')
     parser.add_argument('--max-depth', type=int, default=15)
     parser.add_argument('--output', default='dynatrace_fast_taxonomy.json')
+    parser.add_argument('--no-static', action='store_true',
+                        help='Load every page in the browser instead of trying plain HTTP first')
     
     args = parser.parse_args()
     
     scraper = FastStrategicScraper(
         base_url=args.base_url,
-        max_depth=args.max_depth
+        max_depth=args.max_depth,
+        static=not args.no_static
     )
     
     try:
@@ -290,6 +350,7 @@ def main():
         print(f"\n🚀 FAST STRATEGIC CRAWL COMPLETED!")
         print(f"⏱️  Time taken: {elapsed:.1f} seconds ({elapsed/60:.1f} minutes)")
         print(f"📄 Pages discovered: {len(pages)}")
+        print(f"🌐 Pages per fetch tier:\n{scraper.tier_stats.report()}")
         print(f"💾 Saved to: {filename}")
         
         # Show sections
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Single-pass page field extraction
+=================================
+
+``extract_fields`` pulls everything the Selenium scraper records about a
+page out of its HTML in one pass: title, description, meta description,
+breadcrumbs, h1, h2 headings, candidate link hrefs and navigation text.
+No document tree is built. The parser streams start tag, end tag and text
+events into a collector that keeps a stack of the open elements and the
+text of the ones it needs.
+
+The parser is lxml's libxml2 HTML parser when lxml is installed and the
+standard library's ``html.parser`` otherwise. The rules below mirror the
+BeautifulSoup extractors in ``benchmark_page_extraction.py`` and the link
+and navigation text selectors defined here, which the Selenium scraper
+also runs in the browser. The class-name scopes are derived from those
+selectors; the other rules are written out by hand, and the benchmark
+checks that they still agree with the selectors.
+"""
+
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+PARSER = 'lxml' if etree is not None else 'html.parser'
+
+# Elements without an end tag; html.parser does not close them for us
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+                 'meta', 'param', 'source', 'track', 'wbr'}
+# BeautifulSoup's get_text() leaves out the text of these
+SKIPPED_TEXT = {'script', 'style', 'template'}
+
+# Element rules in selector priority order, as in extract_title and extract_description
+TITLE_RULES = ['page-title', 'title', 'testid-title', 'content-h1', 'main-h1', 'article-h1']
+DESCRIPTION_RULES = ['lead', 'description', 'page-description', 'intro', 'summary',
+                     'content-p', 'main-p', 'article-p', 'markdown-p']
+# Ancestor scopes whose links count as breadcrumbs, in extract_breadcrumbs order
+BREADCRUMB_SCOPES = ['breadcrumb', 'breadcrumbs', 'testid-breadcrumb', 'nav-breadcrumb',
+                     'page-breadcrumbs', 'aria-breadcrumb']
+# Common selectors for documentation navigation
+NAV_LINK_SELECTORS = [
+    'nav a[href]',
+    '.navigation a[href]',
+    '.nav a[href]',
+    '.sidebar a[href]',
+    '.menu a[href]',
+    '.nav-item a[href]',
+    '.nav-link[href]',
+    '[role="navigation"] a[href]',
+    '.docs-nav a[href]',
+    '.toc a[href]',
+    '.table-of-contents a[href]',
+    '.side-nav a[href]',
+    '.main-nav a[href]',
+    # Modern React/Vue selectors
+    '[data-testid*="nav"] a[href]',
+    '[data-testid*="menu"] a[href]',
+    '[class*="nav"] a[href]',
+    '[class*="menu"] a[href]',
+    # Dynatrace specific selectors (from investigation)
+    '.dock a[href]',
+    '.app-header a[href]',
+    '[data-testid="dock"] a[href]'
+]
+
+# Content links within main content areas
+CONTENT_LINK_SELECTORS = [
+    'main a[href^="/docs"]',
+    '.content a[href^="/docs"]',
+    '.page-content a[href^="/docs"]',
+    'article a[href^="/docs"]',
+    '.markdown a[href^="/docs"]',
+    '.prose a[href^="/docs"]'
+]
+
+NAV_TEXT_SELECTOR = 'nav, .navigation, .nav, .sidebar'
+
+
+def selector_classes(selectors: List[str]) -> set:
+    """Class names of the ``.name`` and ``.name <descendant>`` selectors in ``selectors``"""
+    matches = (re.match(r'\.([\w-]+)(?:\s|$)', selector.strip()) for selector in selectors)
+    return {match.group(1) for match in matches if match}
+
+
+# Class names that make an element a navigation scope
+NAV_CLASSES = selector_classes(NAV_LINK_SELECTORS)
+# Class names that make an element a content scope
+CONTENT_CLASSES = selector_classes(CONTENT_LINK_SELECTORS)
+# Elements whose text makes up the navigation text
+NAV_TEXT_CLASSES = selector_classes(NAV_TEXT_SELECTOR.split(','))
+
+
+@dataclass
+class PageFields:
+    """Everything ``extract_fields`` found on a page"""
+    title: str = "Untitled Page"
+    description: str = "No description available"
+    meta_description: str = ""
+    breadcrumbs: List[str] = field(default_factory=list)
+    h1_heading: str = ""
+    h2_headings: List[str] = field(default_factory=list)
+    links: List[str] = field(default_factory=list)
+    nav_text: str = ""
+
+
+class _Element:
+    __slots__ = ('tag', 'classes', 'scopes', 'seen_p', 'texts')
+
+    def __init__(self, tag: str, classes: set, scopes: frozenset):
+        self.tag = tag
+        self.classes = classes
+        # Names of the selector scopes this element is inside of
+        self.scopes = scopes
+        # Whether a <p> child has been seen, for p:first-of-type
+        self.seen_p = False
+        # Text pieces, for elements whose text is needed
+        self.texts: Optional[List[str]] = None
+
+
+class FieldCollector:
+    """Parser target that gathers the page fields from start/end/data events"""
+
+    def __init__(self):
+        self.stack: List[_Element] = []
+        self.capturing: List[List[str]] = []
+        self.skip_depth = 0
+        self.document_title: Optional[List[str]] = None
+        self.h1s: List[List[str]] = []
+        self.h2s: List[List[str]] = []
+        self.first: Dict[str, List[str]] = {}
+        self.breadcrumbs: Dict[str, List[List[str]]] = {}
+        self.nav_texts: List[List[str]] = []
+        self.meta_description: Optional[str] = None
+        self.links: List[str] = []
+
+    def _capture(self, element: _Element) -> List[str]:
+        if element.texts is None:
+            element.texts = []
+            self.capturing.append(element.texts)
+        return element.texts
+
+    def start(self, tag: str, attrib) -> None:
+        tag = tag.lower()
+        parent = self.stack[-1] if self.stack else None
+        scopes = parent.scopes if parent else frozenset()
+        class_attr = attrib.get('class') or ''
+        classes = set(class_attr.split())
+        testid = attrib.get('data-testid') or ''
+        aria_label = attrib.get('aria-label')
+        href = attrib.get('href')
+        element = _Element(tag, classes, scopes)
+        self.stack.append(element)
+        if tag in SKIPPED_TEXT:
+            self.skip_depth += 1
+
+        if tag == 'meta':
+            if self.meta_description is None and attrib.get('name') == 'description':
+                self.meta_description = (attrib.get('content') or '').strip()
+
+        # Scopes this element opens for its descendants
+        own = set()
+        if (tag == 'nav' or classes & NAV_CLASSES or attrib.get('role') == 'navigation'
+                or 'nav' in testid or 'menu' in testid or testid == 'dock'
+                or 'nav' in class_attr or 'menu' in class_attr):
+            own.add('nav')
+        if tag in ('main', 'article') or classes & CONTENT_CLASSES:
+            own.add('content')
+        if 'content' in classes:
+            own.add('content-class')
+        if tag in ('main', 'article'):
+            own.add(tag)
+        if 'breadcrumb' in classes:
+            own.add('breadcrumb')
+        if 'breadcrumbs' in classes:
+            own.add('breadcrumbs')
+        if testid == 'breadcrumb':
+            own.add('testid-breadcrumb')
+        if tag == 'nav' and aria_label == 'breadcrumb':
+            own.add('nav-breadcrumb')
+        if 'page-breadcrumbs' in classes:
+            own.add('page-breadcrumbs')
+        if aria_label == 'Breadcrumb':
+            own.add('aria-breadcrumb')
+        if own:
+            element.scopes = scopes | own
+
+        # Candidate links, as matched by NAV_LINK_SELECTORS + CONTENT_LINK_SELECTORS
+        if href is not None:
+            if ((tag == 'a' and 'nav' in scopes) or 'nav-link' in classes
+                    or (tag == 'a' and 'content' in scopes and href.startswith('/docs'))):
+                self.links.append(href)
+
+        if tag == 'a':
+            for scope in BREADCRUMB_SCOPES:
+                if scope in scopes:
+                    self.breadcrumbs.setdefault(scope, []).append(self._capture(element))
+        elif tag == 'title':
+            if self.document_title is None:
+                self.document_title = self._capture(element)
+        elif tag == 'h1':
+            self.h1s.append(self._capture(element))
+        elif tag == 'h2':
+            self.h2s.append(self._capture(element))
+
+        # First element matching each title and description rule
+        matched = []
+        if 'page-title' in classes:
+            matched.append('page-title')
+        if 'title' in classes:
+            matched.append('title')
+        if testid == 'title':
+            matched.append('testid-title')
+        if tag == 'h1':
+            if 'content-class' in scopes:
+                matched.append('content-h1')
+            if 'main' in scopes:
+                matched.append('main-h1')
+            if 'article' in scopes:
+                matched.append('article-h1')
+        for rule in ('lead', 'description', 'page-description', 'intro', 'summary'):
+            if rule in classes:
+                matched.append(rule)
+        if tag == 'p' and parent is not None and not parent.seen_p:
+            parent.seen_p = True
+            if 'content' in parent.classes:
+                matched.append('content-p')
+            if parent.tag == 'main':
+                matched.append('main-p')
+            if parent.tag == 'article':
+                matched.append('article-p')
+            if 'markdown' in parent.classes:
+                matched.append('markdown-p')
+        for rule in matched:
+            if rule not in self.first:
+                self.first[rule] = self._capture(element)
+
+        if tag == 'nav' or classes & NAV_TEXT_CLASSES:
+            self.nav_texts.append(self._capture(element))
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower()
+        # Close any elements left open inside this one
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].tag == tag:
+                break
+        else:
+            return
+        while len(self.stack) > index:
+            element = self.stack.pop()
+            if element.tag in SKIPPED_TEXT:
+                self.skip_depth -= 1
+            if element.texts is not None:
+                # Captures start with their element, so they end in stack order
+                self.capturing.pop()
+
+    def data(self, text: str) -> None:
+        if self.skip_depth:
+            return
+        for texts in self.capturing:
+            texts.append(text)
+
+    def close(self) -> PageFields:
+        fields = PageFields()
+        if self.meta_description is not None:
+            fields.meta_description = self.meta_description
+        fields.h1_heading = text_of(self.h1s[0]) if self.h1s else ""
+        fields.h2_headings = [text_of(texts) for texts in self.h2s]
+        fields.title = self._title()
+        for rule in DESCRIPTION_RULES:
+            if rule in self.first:
+                text = text_of(self.first[rule])
+                if len(text) > 10:
+                    fields.description = text[:500]
+                    break
+        for scope in BREADCRUMB_SCOPES:
+            if scope in self.breadcrumbs:
+                fields.breadcrumbs = [text_of(texts) for texts in self.breadcrumbs[scope]]
+                break
+        fields.links = list(dict.fromkeys(self.links))
+        nav_texts = [' '.join(s.strip() for s in texts if s.strip()) for texts in self.nav_texts]
+        fields.nav_text = " | ".join(text for text in nav_texts if text)[:1000]
+        return fields
+
+    def _title(self) -> str:
+        if self.document_title is not None:
+            title = text_of(self.document_title)
+            title = re.sub(r'\s*—\s*Dynatrace\s*Docs?\s*$', '', title)
+            if title and title != "Dynatrace Documentation":
+                return title
+        if self.h1s:
+            title = text_of(self.h1s[0])
+            if title:
+                return title
+        for rule in TITLE_RULES:
+            if rule in self.first:
+                title = text_of(self.first[rule])
+                if title:
+                    return title
+        return "Untitled Page"
+
+
+def text_of(texts: List[str]) -> str:
+    return ''.join(texts).strip()
+
+
+class _StdlibParser(HTMLParser):
+    """Feeds ``html.parser`` events into a ``FieldCollector``"""
+
+    def __init__(self, target: FieldCollector):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        # The first of repeated attributes wins, as in browsers
+        attrib = {}
+        for name, value in attrs:
+            attrib.setdefault(name, value or '')
+        self.target.start(tag, attrib)
+        if tag in VOID_ELEMENTS:
+            self.target.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def extract_fields(html: str) -> PageFields:
+    """Extract all page fields from ``html`` in a single pass"""
+    collector = FieldCollector()
+    if etree is not None:
+        parser = etree.HTMLParser(target=collector)
+        parser.feed(html)
+        return parser.close()
+    parser = _StdlibParser(collector)
+    parser.feed(html)
+    parser.close()
+    return collector.close()
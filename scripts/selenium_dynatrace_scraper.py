@@ -12,19 +12,23 @@ Features:
 - Enhanced link detection for SPA (Single Page Applications)
 - Better navigation element detection
 - Improved content extraction for modern docs sites
+- A pool of browser workers sharing one crawl frontier and one global
+  request rate budget (--workers, --rate)
+- A plain-HTTP fast path: pages whose server-rendered HTML already has
+  content and navigation links never start a browser (--no-static to disable)
+- An asyncio crawl engine for mostly static sites (--engine async): many
+  concurrent HTTP fetches on one thread, with browsers only for escalations
+- Single-pass field extraction (page_extract.py), on lxml when installed
 """
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
 import json
 import time
-import re
 from urllib.parse import urljoin, urlparse, urlunparse
 import logging
 from typing import Dict, List, Set, Optional
@@ -32,7 +36,14 @@ from dataclasses import dataclass, asdict
 import sys
 from collections import deque
 import argparse
+import asyncio
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import page_extract
+from page_extract import PageFields, extract_fields
+from static_fetch import AsyncStaticFetcher, StaticFetcher, TierStats
 
 # Configure logging
 logging.basicConfig(
@@ -63,21 +74,203 @@ class DocumentationPage:
     last_updated: Optional[str]
     nav_text: str
 
+# Runs in the browser with execute_async_script. Arguments: link selectors,
+# expander selector, maximum expanders to click, milliseconds to wait after
+# clicking. Returns the deduplicated hrefs of every matching link, plus every
+# link on the page after the expanders were clicked.
+HARVEST_LINKS_JS = """
+const [selectors, expanderSelector, maxClicks, waitMs, done] = arguments;
+const hrefs = new Set();
+function collect(selectorList) {
+  for (const selector of selectorList) {
+    let elements;
+    try {
+      elements = document.querySelectorAll(selector);
+    } catch (e) {
+      continue;  // Selector not supported by this browser
+    }
+    for (const element of elements) {
+      // SVG links expose href as an object; fall back to the raw attribute
+      const href = typeof element.href === 'string' ? element.href : element.getAttribute('href');
+      if (href) hrefs.add(href);
+    }
+  }
+}
+collect(selectors);
+let clicked = 0;
+for (const button of Array.from(document.querySelectorAll(expanderSelector)).slice(0, maxClicks)) {
+  const visible = button.offsetWidth || button.offsetHeight || button.getClientRects().length;
+  if (visible && !button.disabled) {
+    try {
+      button.click();
+      clicked++;
+    } catch (e) {}
+  }
+}
+if (!clicked) {
+  done(Array.from(hrefs));
+} else {
+  setTimeout(() => {
+    collect(['a[href]']);
+    done(Array.from(hrefs));
+  }, waitMs);
+}
+"""
+
+class RateLimiter:
+    """Global politeness budget shared by all workers.
+
+    Hands out request slots at most ``rate`` per second in total, no matter
+    how many workers ask for them. A rate of 0 or less means no limit.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim the next slot and return the seconds to wait for it."""
+        if not self.interval:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        return slot - now
+
+    def wait(self):
+        """Block until the caller may send its next request."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        """Like ``wait``, without blocking the event loop."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class CrawlFrontier:
+    """Thread-safe queue of (url, depth, parent_url) items with deduplication.
+
+    A URL is accepted once, however many pages link to it. ``get`` blocks
+    while the queue is empty but other workers may still add links, and
+    returns None once the crawl is finished or stopped.
+    """
+
+    def __init__(self, max_depth: int):
+        self.max_depth = max_depth
+        self.queue: deque = deque()
+        self.seen: Set[str] = set()
+        self.in_flight: Dict[str, tuple] = {}
+        self.stopped = False
+        self.condition = threading.Condition()
+
+    def put(self, url: str, depth: int, parent_url: Optional[str]) -> bool:
+        """Queue a URL unless it was seen before or is too deep."""
+        with self.condition:
+            if url in self.seen or depth > self.max_depth:
+                return False
+            self.seen.add(url)
+            self.queue.append((url, depth, parent_url))
+            self.condition.notify()
+            return True
+
+    def get(self, block: bool = True) -> Optional[tuple]:
+        """Take the next item, waiting for one if pages are still being crawled.
+
+        With ``block=False`` it returns None right away when the queue is empty.
+        """
+        with self.condition:
+            while block and not self.queue and self.in_flight and not self.stopped:
+                self.condition.wait()
+            if self.stopped or not self.queue:
+                return None
+            item = self.queue.popleft()
+            self.in_flight[item[0]] = item
+            return item
+
+    def task_done(self, url: str):
+        """Mark an item from ``get`` as fully processed; repeated calls are ignored."""
+        with self.condition:
+            if self.in_flight.pop(url, None) is None:
+                return
+            if not self.in_flight:
+                self.condition.notify_all()
+
+    def stop(self):
+        """Make every current and future ``get`` return None."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def snapshot(self):
+        """Return (visited URLs, items still to crawl) for a checkpoint.
+
+        Pages that are being crawled right now count as still to crawl, so
+        resuming from the checkpoint does not lose them.
+        """
+        with self.condition:
+            pending = list(self.in_flight.values()) + list(self.queue)
+            queued = {item[0] for item in pending}
+            return [url for url in self.seen if url not in queued], pending
+
+    def __len__(self):
+        with self.condition:
+            return len(self.queue)
+
 class DynatraceSeleniumScraper:
     """Enhanced scraper using Selenium for JavaScript-rendered content"""
     
+    # Link and navigation text selectors, shared with the static extraction
+    # in page_extract so the two tiers find the same links
+    NAV_LINK_SELECTORS = page_extract.NAV_LINK_SELECTORS
+    CONTENT_LINK_SELECTORS = page_extract.CONTENT_LINK_SELECTORS
+    NAV_TEXT_SELECTOR = page_extract.NAV_TEXT_SELECTOR
+    
+    # Collapsed navigation that is clicked open to reveal more links (for SPAs)
+    EXPANDER_SELECTOR = 'button[aria-expanded="false"], .nav-toggle, .menu-toggle, [role="button"]'
+    MAX_EXPANDER_CLICKS = 3  # Limit to avoid too many clicks
+    EXPANDER_WAIT_MS = 1000
+    
+    # Longest wait for a rendered page's links to stop changing
+    SETTLE_TIMEOUT = 5
+    # A page that still has no links after this long is taken as link-less
+    EMPTY_SETTLE_TIME = 1.5
+    
     def __init__(self, base_url: str = "https://docs.dynatrace.com/docs", 
-                 max_depth: int = 50, delay: float = 2.0, browser: str = "chrome"):
+                 max_depth: int = 50, delay: float = 2.0, browser: str = "chrome",
+                 workers: int = 1, rate: Optional[float] = None, static: bool = True,
+                 settle_interval: float = 0.5):
         self.base_url = base_url
         self.base_domain = urlparse(base_url).netloc
         self.max_depth = max_depth
         self.delay = delay
         self.browser = browser.lower()
+        self.workers = max(1, workers)
+        # Seconds between link counts while a browser page settles; 0 skips it
+        self.settle_interval = settle_interval
+        
+        # Requests per second across all workers; defaults to one per delay
+        if rate is None:
+            rate = 1.0 / delay if delay > 0 else 0.0
+        self.rate_limiter = RateLimiter(rate)
+        
+        # Plain-HTTP tier tried before the browser
+        self.tier_stats = TierStats()
+        self.static_fetcher = None
+        if static:
+            try:
+                self.static_fetcher = StaticFetcher(pool_size=self.workers)
+            except RuntimeError as e:
+                logger.warning(f"{e}; loading every page in the browser")
         
-        # Data storage
-        self.visited_urls: Set[str] = set()
+        # Data storage, shared by the workers and guarded by self.lock
+        self.frontier = CrawlFrontier(max_depth)
         self.pages: Dict[str, DocumentationPage] = {}
-        self.queue: deque = deque()
+        self.lock = threading.Lock()
+        self.checkpoint_lock = threading.Lock()
         
         # Statistics
         self.total_pages = 0
@@ -88,11 +281,21 @@ class DynatraceSeleniumScraper:
         self.checkpoint_interval = 50
         self.resume_file = "selenium_crawl_checkpoint.json"
         
-        # Selenium driver
-        self.driver = None
+        # Selenium driver, one per worker thread
+        self._local = threading.local()
+        self.open_drivers = set()
         
+    @property
+    def driver(self):
+        """The calling worker's WebDriver"""
+        return getattr(self._local, 'driver', None)
+    
+    @driver.setter
+    def driver(self, driver):
+        self._local.driver = driver
+    
     def setup_driver(self) -> bool:
-        """Initialize Selenium WebDriver"""
+        """Initialize a Selenium WebDriver for the calling thread"""
         try:
             if self.browser == "chrome":
                 chrome_options = ChromeOptions()
@@ -120,6 +323,9 @@ class DynatraceSeleniumScraper:
             # Set timeouts
             self.driver.implicitly_wait(10)
             self.driver.set_page_load_timeout(30)
+            self.driver.set_script_timeout(30)
+            with self.lock:
+                self.open_drivers.add(self.driver)
             
             logger.info(f"Selenium {self.browser} driver initialized successfully")
             return True
@@ -137,6 +343,9 @@ class DynatraceSeleniumScraper:
                 logger.info("Selenium driver closed")
             except Exception as e:
                 logger.error(f"Error closing driver: {e}")
+            with self.lock:
+                self.open_drivers.discard(self.driver)
+            self.driver = None
     
     def normalize_url(self, url: str) -> str:
         """Normalize URL by removing fragments and query params"""
@@ -176,109 +385,48 @@ class DynatraceSeleniumScraper:
             WebDriverWait(self.driver, timeout).until(
                 lambda driver: driver.execute_script("return document.readyState") == "complete"
             )
-            
-            # Additional wait for dynamic content
-            time.sleep(2)
-            
-            return True
         except TimeoutException:
             logger.warning("Page load timeout")
             return False
+        
+        # Client-rendered navigation keeps arriving after the load event
+        if self.settle_interval > 0:
+            self.wait_for_links_to_settle(min(timeout, self.SETTLE_TIMEOUT))
+        return True
+    
+    def wait_for_links_to_settle(self, timeout: float):
+        """Wait until the page's link count stops changing
+
+        A count of zero only counts as settled after EMPTY_SETTLE_TIME, so
+        navigation that renders late is not missed but link-less pages do
+        not wait out the whole timeout.
+        """
+        counts = []
+        started = time.monotonic()
+        
+        def settled(driver):
+            counts.append(driver.execute_script("return document.links.length"))
+            if len(counts) < 2 or counts[-1] != counts[-2]:
+                return False
+            return counts[-1] > 0 or time.monotonic() - started >= self.EMPTY_SETTLE_TIME
+        
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=self.settle_interval).until(settled)
+        except TimeoutException:
+            # A page without links is still a page; extract what is there
+            logger.debug(f"Links did not settle within {timeout}s ({counts[-1] if counts else 0} links)")
     
     def extract_navigation_links(self, current_url: str) -> List[str]:
         """Extract navigation links from JavaScript-rendered page"""
-        links = set()
-        
         try:
-            # Common selectors for documentation navigation
-            nav_selectors = [
-                'nav a[href]',
-                '.navigation a[href]',
-                '.nav a[href]',
-                '.sidebar a[href]',
-                '.menu a[href]',
-                '.nav-item a[href]',
-                '.nav-link[href]',
-                '[role="navigation"] a[href]',
-                '.docs-nav a[href]',
-                '.toc a[href]',
-                '.table-of-contents a[href]',
-                '.side-nav a[href]',
-                '.main-nav a[href]',
-                # Modern React/Vue selectors
-                '[data-testid*="nav"] a[href]',
-                '[data-testid*="menu"] a[href]',
-                '[class*="nav"] a[href]',
-                '[class*="menu"] a[href]',
-                # Dynatrace specific selectors (from investigation)
-                '.dock a[href]',
-                '.app-header a[href]',
-                '[data-testid="dock"] a[href]'
-            ]
-            
-            for selector in nav_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        href = element.get_attribute('href')
-                        if href:
-                            absolute_url = urljoin(current_url, href)
-                            normalized_url = self.normalize_url(absolute_url)
-                            if self.is_docs_url(normalized_url):
-                                links.add(normalized_url)
-                except Exception as e:
-                    continue
-            
-            # Also look for content links within main content areas
-            content_selectors = [
-                'main a[href^="/docs"]',
-                '.content a[href^="/docs"]',
-                '.page-content a[href^="/docs"]',
-                'article a[href^="/docs"]',
-                '.markdown a[href^="/docs"]',
-                '.prose a[href^="/docs"]'
-            ]
-            
-            for selector in content_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        href = element.get_attribute('href')
-                        if href:
-                            absolute_url = urljoin(current_url, href)
-                            normalized_url = self.normalize_url(absolute_url)
-                            if self.is_docs_url(normalized_url):
-                                links.add(normalized_url)
-                except Exception as e:
-                    continue
-            
-            # Try to click navigation elements to reveal more links (for SPAs)
-            try:
-                nav_buttons = self.driver.find_elements(By.CSS_SELECTOR, 
-                    'button[aria-expanded="false"], .nav-toggle, .menu-toggle, [role="button"]')
-                
-                for button in nav_buttons[:3]:  # Limit to avoid too many clicks
-                    try:
-                        if button.is_displayed() and button.is_enabled():
-                            self.driver.execute_script("arguments[0].click();", button)
-                            time.sleep(1)
-                            
-                            # Re-scan for new links
-                            new_elements = self.driver.find_elements(By.CSS_SELECTOR, 'a[href]')
-                            for element in new_elements:
-                                href = element.get_attribute('href')
-                                if href:
-                                    absolute_url = urljoin(current_url, href)
-                                    normalized_url = self.normalize_url(absolute_url)
-                                    if self.is_docs_url(normalized_url):
-                                        links.add(normalized_url)
-                    except Exception:
-                        continue
-            except Exception:
-                pass
-            
+            # One script run collects every candidate href, clicks the
+            # expanders and collects again, instead of a driver call per element
+            hrefs = self.driver.execute_async_script(
+                HARVEST_LINKS_JS, self.NAV_LINK_SELECTORS + self.CONTENT_LINK_SELECTORS,
+                self.EXPANDER_SELECTOR, self.MAX_EXPANDER_CLICKS, self.EXPANDER_WAIT_MS)
+            links = self.filter_links(hrefs or [], current_url)
             logger.info(f"Found {len(links)} navigation links")
-            return list(links)
+            return links
             
         except Exception as e:
             logger.error(f"Error extracting navigation links: {e}")
@@ -288,144 +436,43 @@ class DynatraceSeleniumScraper:
         """Extract comprehensive page information"""
         
         # Get page source after JavaScript rendering
-        page_source = self.driver.page_source
-        soup = BeautifulSoup(page_source, 'html.parser')
-        
-        # Extract basic information
-        title = self.extract_title(soup)
-        description = self.extract_description(soup)
-        meta_description = self.extract_meta_description(soup)
-        breadcrumbs = self.extract_breadcrumbs(soup)
-        h1_heading = self.extract_h1(soup)
-        h2_headings = self.extract_h2_headings(soup)
+        fields = extract_fields(self.driver.page_source)
+        
+        # Visible navigation text and links come from the live page
         nav_text = self.extract_nav_text()
+        children = self.extract_navigation_links(url)
         
+        return self.page_from_fields(fields, url, depth, parent_url, children, nav_text)
+    
+    def page_from_fields(self, fields: PageFields, url: str, depth: int, parent_url: Optional[str],
+                         children: List[str], nav_text: str) -> DocumentationPage:
+        """Build a page record from extracted fields and links"""
         # Determine section and subsection
         path_parts = url.replace(self.base_url, '').strip('/').split('/')
         section = path_parts[0] if path_parts and path_parts[0] else 'root'
         subsection = path_parts[1] if len(path_parts) > 1 and path_parts[1] else ''
         
-        # Extract child links
-        children = self.extract_navigation_links(url)
-        
         return DocumentationPage(
             url=url,
-            title=title,
-            description=description,
-            breadcrumbs=breadcrumbs,
+            title=fields.title,
+            description=fields.description,
+            breadcrumbs=fields.breadcrumbs,
             section=section,
             subsection=subsection,
             depth=depth,
             parent_url=parent_url,
             children=children,
-            meta_description=meta_description,
-            h1_heading=h1_heading,
-            h2_headings=h2_headings,
+            meta_description=fields.meta_description,
+            h1_heading=fields.h1_heading,
+            h2_headings=fields.h2_headings,
             last_updated=None,
             nav_text=nav_text
         )
     
-    def extract_title(self, soup: BeautifulSoup) -> str:
-        """Extract page title"""
-        # Try page title first
-        title_tag = soup.find('title')
-        if title_tag:
-            title = title_tag.get_text().strip()
-            title = re.sub(r'\s*—\s*Dynatrace\s*Docs?\s*$', '', title)
-            if title and title != "Dynatrace Documentation":
-                return title
-        
-        # Try h1 tag
-        h1_tag = soup.find('h1')
-        if h1_tag:
-            title = h1_tag.get_text().strip()
-            if title:
-                return title
-        
-        # Try various other selectors
-        title_selectors = [
-            '.page-title',
-            '.title',
-            '[data-testid="title"]',
-            '.content h1',
-            'main h1',
-            'article h1'
-        ]
-        
-        for selector in title_selectors:
-            element = soup.select_one(selector)
-            if element:
-                title = element.get_text().strip()
-                if title:
-                    return title
-        
-        return "Untitled Page"
-    
-    def extract_description(self, soup: BeautifulSoup) -> str:
-        """Extract page description"""
-        selectors = [
-            '.lead',
-            '.description',
-            '.page-description',
-            '.intro',
-            '.summary',
-            '.content > p:first-of-type',
-            'main > p:first-of-type',
-            'article > p:first-of-type',
-            '.markdown > p:first-of-type'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text().strip()
-                if len(text) > 10:
-                    return text[:500]
-        
-        return "No description available"
-    
-    def extract_meta_description(self, soup: BeautifulSoup) -> str:
-        """Extract meta description"""
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc:
-            return meta_desc.get('content', '').strip()
-        return ""
-    
-    def extract_breadcrumbs(self, soup: BeautifulSoup) -> List[str]:
-        """Extract breadcrumb navigation"""
-        breadcrumbs = []
-        
-        selectors = [
-            '.breadcrumb a',
-            '.breadcrumbs a',
-            '[data-testid="breadcrumb"] a',
-            'nav[aria-label="breadcrumb"] a',
-            '.page-breadcrumbs a',
-            '[aria-label="Breadcrumb"] a'
-        ]
-        
-        for selector in selectors:
-            elements = soup.select(selector)
-            if elements:
-                breadcrumbs = [el.get_text().strip() for el in elements]
-                break
-        
-        return breadcrumbs
-    
-    def extract_h1(self, soup: BeautifulSoup) -> str:
-        """Extract main H1 heading"""
-        h1 = soup.find('h1')
-        return h1.get_text().strip() if h1 else ""
-    
-    def extract_h2_headings(self, soup: BeautifulSoup) -> List[str]:
-        """Extract all H2 headings"""
-        h2_tags = soup.find_all('h2')
-        return [h2.get_text().strip() for h2 in h2_tags]
-    
     def extract_nav_text(self) -> str:
         """Extract visible navigation text from current page"""
         try:
-            nav_elements = self.driver.find_elements(By.CSS_SELECTOR, 'nav, .navigation, .nav, .sidebar')
+            nav_elements = self.driver.find_elements(By.CSS_SELECTOR, self.NAV_TEXT_SELECTOR)
             nav_texts = []
             for element in nav_elements:
                 if element.is_displayed():
@@ -436,9 +483,60 @@ class DynatraceSeleniumScraper:
         except Exception:
             return ""
     
+    def filter_links(self, hrefs: List[str], current_url: str) -> List[str]:
+        """Resolve, normalize and deduplicate hrefs, keeping docs pages only"""
+        links = set()
+        for href in set(hrefs):
+            if href:
+                normalized_url = self.normalize_url(urljoin(current_url, href))
+                if self.is_docs_url(normalized_url):
+                    links.add(normalized_url)
+        return list(links)
+    
+    def static_shortfall(self, page: DocumentationPage) -> Optional[str]:
+        """Why a page from the static tier needs the browser, or None if it does not"""
+        if not page.children:
+            return "no-links"
+        if page.title == "Untitled Page" or (not page.h1_heading and
+                                              page.description == "No description available"):
+            return "no-content"
+        return None
+    
+    def fetch_static(self, url: str, depth: int, parent_url: Optional[str]) -> Optional[DocumentationPage]:
+        """Try to build the page from a plain HTTP GET without a browser"""
+        self.rate_limiter.wait()
+        return self.static_page(url, depth, parent_url, self.static_fetcher.fetch(url))
+    
+    def static_page(self, url: str, depth: int, parent_url: Optional[str],
+                    result: Optional[tuple]) -> Optional[DocumentationPage]:
+        """Build the page from a static fetch result, or None if it needs the browser"""
+        if result is None:
+            self.tier_stats.escalated("fetch-failed")
+            return None
+        final_url, html = result
+        if "error" in final_url.lower() or "404" in final_url:
+            self.tier_stats.escalated("error-page")
+            return None
+        
+        fields = extract_fields(html)
+        page_info = self.page_from_fields(fields, url, depth, parent_url,
+                                          self.filter_links(fields.links, url), fields.nav_text)
+        reason = self.static_shortfall(page_info)
+        if reason:
+            logger.debug(f"Escalating {url} to the browser: {reason}")
+            self.tier_stats.escalated(reason)
+            return None
+        return page_info
+    
     def fetch_page(self, url: str) -> bool:
         """Fetch and load a page using Selenium"""
+        # Browsers are only started once a page needs one
+        if self.driver is None and not self.setup_driver():
+            self.record_failure()
+            return False
+        
         try:
+            self.rate_limiter.wait()
             logger.info(f"Loading page: {url}")
             self.driver.get(url)
             
@@ -457,95 +555,230 @@ class DynatraceSeleniumScraper:
             
         except Exception as e:
             logger.error(f"Failed to fetch {url}: {e}")
-            self.failed_pages += 1
+            self.record_failure()
             return False
     
+    def record_failure(self):
+        with self.lock:
+            self.failed_pages += 1
+    
     def save_checkpoint(self):
         """Save crawl progress"""
-        checkpoint_data = {
-            'visited_urls': list(self.visited_urls),
-            'queue': list(self.queue),
-            'total_pages': self.total_pages,
-            'failed_pages': self.failed_pages,
-            'timestamp': time.time()
-        }
+        # Counts and frontier are captured together so they agree
+        with self.lock:
+            visited_urls, queue = self.frontier.snapshot()
+            checkpoint_data = {
+                'visited_urls': visited_urls,
+                'queue': queue,
+                'total_pages': self.total_pages,
+                'failed_pages': self.failed_pages,
+                'timestamp': time.time()
+            }
         
         try:
-            with open(self.resume_file, 'w') as f:
-                json.dump(checkpoint_data, f)
-            logger.info(f"Checkpoint saved at {self.total_pages} pages")
+            with self.checkpoint_lock:
+                temp_file = f"{self.resume_file}.tmp"
+                with open(temp_file, 'w') as f:
+                    json.dump(checkpoint_data, f)
+                os.replace(temp_file, self.resume_file)
+            logger.info(f"Checkpoint saved at {checkpoint_data['total_pages']} pages")
         except Exception as e:
             logger.error(f"Failed to save checkpoint: {e}")
     
+    def crawl_page(self, current_url: str, depth: int, parent_url: Optional[str]):
+        """Fetch one page, statically if possible, and record it"""
+        page_info = None
+        tier = "static"
+        if self.static_fetcher:
+            page_info = self.fetch_static(current_url, depth, parent_url)
+        
+        if page_info is None:
+            tier = "browser"
+            page_info = self.browser_page(current_url, depth, parent_url)
+            if page_info is None:
+                return
+        
+        self.record_page(current_url, depth, page_info, tier)
+    
+    def browser_page(self, url: str, depth: int, parent_url: Optional[str]) -> Optional[DocumentationPage]:
+        """Load a page in the calling thread's browser and extract it"""
+        if not self.fetch_page(url):
+            return None
+        
+        try:
+            return self.extract_page_content(url, depth, parent_url)
+        except Exception as e:
+            logger.error(f"Error extracting content from {url}: {e}")
+            self.record_failure()
+            return None
+    
+    def record_page(self, current_url: str, depth: int, page_info: DocumentationPage, tier: str):
+        """Store a crawled page and queue its children"""
+        with self.lock:
+            # Pages still in flight when the limit was reached are dropped
+            if self.total_pages >= self.max_pages:
+                return
+            self.pages[current_url] = page_info
+            self.total_pages += 1
+            total_pages = self.total_pages
+            
+            # Add children to the shared frontier
+            for child_url in page_info.children:
+                self.frontier.put(child_url, depth + 1, current_url)
+            self.frontier.task_done(current_url)
+            
+            if total_pages >= self.max_pages:
+                self.frontier.stop()
+        self.tier_stats.served(tier)
+        
+        logger.info(f"[Depth {depth}] Page {total_pages} ({tier}): {page_info.title}")
+        logger.info(f"Found {len(page_info.children)} child links")
+        
+        # Progress updates
+        if total_pages % 10 == 0:
+            elapsed = time.time() - self.start_time
+            rate = total_pages / elapsed * 60 if elapsed > 0 else 0
+            logger.info(f"Progress: {total_pages} pages ({rate:.1f}/min), "
+                       f"{len(self.frontier)} queued, {self.failed_pages} failed")
+        
+        # Checkpoint
+        if total_pages % self.checkpoint_interval == 0:
+            self.save_checkpoint()
+    
+    def worker(self):
+        """Crawl pages from the frontier until it is exhausted or stopped"""
+        try:
+            while True:
+                item = self.frontier.get()
+                if item is None:
+                    break
+                try:
+                    self.crawl_page(*item)
+                except Exception as e:
+                    logger.error(f"Worker failed on {item[0]}: {e}")
+                    self.record_failure()
+                finally:
+                    self.frontier.task_done(item[0])
+        finally:
+            self.cleanup_driver()
+    
     def crawl(self, resume: bool = False) -> Dict[str, DocumentationPage]:
         """Main crawling method"""
         logger.info(f"Starting Selenium crawl of {self.base_url}")
         logger.info(f"Browser: {self.browser}, Max depth: {self.max_depth}, Max pages: {self.max_pages}")
+        rate = f"{1 / self.rate_limiter.interval:.2f} req/s" if self.rate_limiter.interval else "unlimited"
+        logger.info(f"Workers: {self.workers}, Rate limit: {rate}")
+        
+        # Initialize queue
+        if resume:
+            # TODO: Implement resume functionality
+            pass
+        
+        self.frontier.put(self.base_url, 0, None)
+        self.start_time = time.time()
         
-        # Setup Selenium driver
-        if not self.setup_driver():
-            logger.error("Failed to setup Selenium driver")
-            return {}
+        # Each worker starts its own browser when needed and pulls from the shared frontier
+        threads = [threading.Thread(target=self.worker, name=f"crawler-{n}")
+                   for n in range(self.workers)]
+        for thread in threads:
+            thread.start()
         
         try:
-            # Initialize queue
-            if resume:
-                # TODO: Implement resume functionality
-                pass
-            
-            self.queue.append((self.base_url, 0, None))
-            start_time = time.time()
-            
-            while self.queue and self.total_pages < self.max_pages:
-                current_url, depth, parent_url = self.queue.popleft()
-                
-                # Skip if already visited or too deep
-                if current_url in self.visited_urls or depth > self.max_depth:
-                    continue
-                
-                self.visited_urls.add(current_url)
-                
-                # Fetch page
-                if not self.fetch_page(current_url):
+            # Join with a timeout so Ctrl+C reaches the main thread
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            logger.info("Stopping workers after their current page")
+            self.frontier.stop()
+            for thread in threads:
+                thread.join()
+            raise
+        finally:
+            if self.static_fetcher:
+                self.static_fetcher.close()
+        
+        logger.info(f"Crawl completed. Pages: {self.total_pages}, Failed: {self.failed_pages}")
+        logger.info(f"Pages per fetch tier:\n{self.tier_stats.report()}")
+        return self.pages
+    
+    async def crawl_async(self, concurrency: int = 20) -> Dict[str, DocumentationPage]:
+        """Crawl with asyncio: up to ``concurrency`` pages in flight on one thread
+        
+        Produces the same page records as ``crawl``. Pages go through the
+        static tier first; those that need a browser are handed to a pool of
+        ``self.workers`` browser threads.
+        """
+        logger.info(f"Starting async crawl of {self.base_url}")
+        logger.info(f"Concurrency: {concurrency}, Max depth: {self.max_depth}, Max pages: {self.max_pages}")
+        
+        fetcher = None
+        if self.static_fetcher:
+            fetcher = AsyncStaticFetcher(pool_size=concurrency)
+        browsers = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="browser")
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.BoundedSemaphore(concurrency)
+        tasks = set()
+        
+        async def crawl_one(current_url: str, depth: int, parent_url: Optional[str]):
+            try:
+                page_info = None
+                tier = "static"
+                if fetcher:
+                    await self.rate_limiter.wait_async()
+                    result = await fetcher.fetch(current_url)
+                    # Parse off the event loop so other fetches keep going
+                    page_info = await asyncio.to_thread(self.static_page, current_url, depth,
+                                                        parent_url, result)
+                if page_info is None:
+                    tier = "browser"
+                    page_info = await loop.run_in_executor(browsers, self.browser_page,
+                                                           current_url, depth, parent_url)
+                if page_info is not None:
+                    self.record_page(current_url, depth, page_info, tier)
+            except Exception as e:
+                logger.error(f"Failed on {current_url}: {e}")
+                self.record_failure()
+            finally:
+                self.frontier.task_done(current_url)
+                semaphore.release()
+        
+        self.frontier.put(self.base_url, 0, None)
+        self.start_time = time.time()
+        try:
+            while True:
+                await semaphore.acquire()
+                item = self.frontier.get(block=False)
+                if item is None:
+                    semaphore.release()
+                    if not tasks:
+                        break
+                    # Wait for a running page to add links or finish the crawl
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
                     continue
-                
-                # Extract page information
+                task = asyncio.create_task(crawl_one(*item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            self.frontier.stop()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            if fetcher:
+                await fetcher.close()
+            browsers.shutdown(wait=True)
+            # Browser threads are gone, so their drivers are closed from here
+            for driver in list(self.open_drivers):
                 try:
-                    page_info = self.extract_page_content(current_url, depth, parent_url)
-                    self.pages[current_url] = page_info
-                    self.total_pages += 1
-                    
-                    logger.info(f"[Depth {depth}] Page {self.total_pages}: {page_info.title}")
-                    logger.info(f"Found {len(page_info.children)} child links")
-                    
-                    # Add children to queue
-                    for child_url in page_info.children:
-                        if child_url not in self.visited_urls:
-                            self.queue.append((child_url, depth + 1, current_url))
-                    
+                    driver.quit()
                 except Exception as e:
-                    logger.error(f"Error extracting content from {current_url}: {e}")
-                    self.failed_pages += 1
-                
-                # Rate limiting
-                time.sleep(self.delay)
-                
-                # Progress updates
-                if self.total_pages % 10 == 0:
-                    elapsed = time.time() - start_time
-                    rate = self.total_pages / elapsed if elapsed > 0 else 0
-                    logger.info(f"Progress: {self.total_pages} pages ({rate:.1f}/min), "
-                               f"{len(self.queue)} queued, {self.failed_pages} failed")
-                
-                # Checkpoint
-                if self.total_pages % self.checkpoint_interval == 0:
-                    self.save_checkpoint()
-            
-            logger.info(f"Crawl completed. Pages: {self.total_pages}, Failed: {self.failed_pages}")
-            return self.pages
-            
-        finally:
-            self.cleanup_driver()
+                    logger.error(f"Error closing driver: {e}")
+            self.open_drivers.clear()
+            if self.static_fetcher:
+                self.static_fetcher.close()
+        
+        logger.info(f"Crawl completed. Pages: {self.total_pages}, Failed: {self.failed_pages}")
+        logger.info(f"Pages per fetch tier:\n{self.tier_stats.report()}")
+        return self.pages
     
     def generate_taxonomy(self) -> Dict:
         """Generate taxonomy from crawled pages"""
@@ -636,7 +869,21 @@ def main():
     parser.add_argument('--base-url', default='https://docs.dynatrace.com/docs')
     parser.add_argument('--max-depth', type=int, default=50)
     parser.add_argument('--max-pages', type=int, default=5000)
-    parser.add_argument('--delay', type=float, default=2.0)
+    parser.add_argument('--delay', type=float, default=2.0,
+                       help='Seconds between requests across all workers (ignored with --rate)')
+    parser.add_argument('--rate', type=float,
+                       help='Requests per second across all workers (default 1/--delay)')
+    parser.add_argument('--workers', type=int, default=4,
+                       help='Number of parallel browser workers')
+    parser.add_argument('--settle-interval', type=float, default=0.5,
+                       help='Seconds between link counts while a browser page renders; '
+                            'a page is done once two counts agree (0 to skip)')
+    parser.add_argument('--no-static', action='store_true',
+                       help='Load every page in the browser instead of trying plain HTTP first')
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                       help='Crawl with browser worker threads or with asyncio (best for static pages)')
+    parser.add_argument('--concurrency', type=int, default=20,
+                       help='Pages in flight at once with --engine async')
     parser.add_argument('--browser', choices=['chrome', 'firefox'], default='chrome')
     parser.add_argument('--output', default='dynatrace_selenium_taxonomy.json')
     parser.add_argument('--checkpoint-interval', type=int, default=50)
@@ -649,20 +896,28 @@ def main():
         base_url=args.base_url,
         max_depth=args.max_depth,
         delay=args.delay,
-        browser=args.browser
+        browser=args.browser,
+        workers=args.workers,
+        rate=args.rate,
+        settle_interval=args.settle_interval,
+        static=not args.no_static
     )
     
     scraper.max_pages = args.max_pages
     scraper.checkpoint_interval = args.checkpoint_interval
     
     try:
-        pages = scraper.crawl()
+        if args.engine == 'async':
+            pages = asyncio.run(scraper.crawl_async(args.concurrency))
+        else:
+            pages = scraper.crawl()
         scraper.save_results(args.output, taxonomy_only=args.taxonomy_only)
         
         print(f"\nCrawl Summary:")
-        print(f"Browser: {args.browser}")
+        print(f"Browser: {args.browser} x {scraper.workers} workers")
         print(f"Total pages: {scraper.total_pages}")
         print(f"Failed pages: {scraper.failed_pages}")
+        print(f"Pages per fetch tier:\n{scraper.tier_stats.report()}")
         print(f"Max depth reached: {max([p.depth for p in pages.values()]) if pages else 0}")
         
         if args.taxonomy_only:
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Plain-HTTP fetch tier for the docs scrapers
+===========================================
+
+Many docs pages already carry their title, meta description, headings and
+``/docs`` links in the server-rendered HTML. The scrapers try a pooled
+plain GET through ``StaticFetcher`` first and only load a page in a real
+browser when the static result is missing links or content. ``TierStats``
+counts which tier served each page. ``AsyncStaticFetcher`` is the same tier
+for the asyncio crawl engine.
+
+Needs ``requests``; without it the scrapers fall back to the browser for
+every page. The async fetcher uses ``aiohttp`` when it is installed and
+otherwise runs the ``requests`` session in worker threads.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+
+
+class StaticFetcher:
+    """Fetch HTML over keep-alive connections shared by all worker threads."""
+
+    def __init__(self, pool_size: int = 10, timeout: float = 15.0):
+        if requests is None:
+            raise RuntimeError("requests is required for the static fetch tier: pip install requests")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, url: str) -> Optional[Tuple[str, str]]:
+        """Return ``(final_url, html)``, or None if the page is not plain HTML."""
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.debug(f"Static fetch failed for {url}: {e}")
+            return None
+        if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', ''):
+            logger.debug(f"Static fetch of {url} returned HTTP {response.status_code}")
+            return None
+        return response.url, response.text
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncStaticFetcher:
+    """Async counterpart of ``StaticFetcher`` with a pool of ``pool_size`` connections."""
+
+    def __init__(self, pool_size: int = 20, timeout: float = 15.0):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = None
+        self.fallback = None
+        if aiohttp is None:
+            # Raises if requests is missing too
+            self.fallback = StaticFetcher(pool_size, timeout)
+
+    async def fetch(self, url: str) -> Optional[Tuple[str, str]]:
+        """Return ``(final_url, html)``, or None if the page is not plain HTML."""
+        if self.fallback is not None:
+            return await asyncio.to_thread(self.fallback.fetch, url)
+        if self.session is None:
+            # Created lazily so it binds to the running event loop
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT})
+        try:
+            async with self.session.get(url) as response:
+                if response.status != 200 or 'html' not in response.headers.get('Content-Type', ''):
+                    logger.debug(f"Static fetch of {url} returned HTTP {response.status}")
+                    return None
+                return str(response.url), await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug(f"Static fetch failed for {url}: {e}")
+            return None
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+class TierStats:
+    """Thread-safe count of pages served by each fetch tier."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tiers: Counter = Counter()
+        self.escalations: Counter = Counter()
+
+    def served(self, tier: str):
+        with self.lock:
+            self.tiers[tier] += 1
+
+    def escalated(self, reason: str):
+        """Record why a static result was not good enough."""
+        with self.lock:
+            self.escalations[reason] += 1
+
+    def summary(self) -> Dict:
+        with self.lock:
+            total = sum(self.tiers.values())
+            return {
+                'pages': total,
+                'tiers': {tier: {'pages': count, 'share': count / total if total else 0.0}
+                          for tier, count in sorted(self.tiers.items())},
+                'escalations': dict(self.escalations),
+            }
+
+    def report(self) -> str:
+        """One line per tier, e.g. ``static: 412 pages (83.2%)``."""
+        summary = self.summary()
+        lines = [f"{tier}: {entry['pages']} pages ({entry['share']:.1%})"
+                 for tier, entry in summary['tiers'].items()]
+        if summary['escalations']:
+            reasons = ', '.join(f"{reason} {count}" for reason, count in sorted(summary['escalations'].items()))
+            lines.append(f"escalated to browser: {reasons}")
+        return '\n'.join(lines) or "no pages fetched"
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Multi-process stress test for the link storage backends
+=======================================================
+
+Starts many worker processes that write to the same store at once, the way a
+multi-process WSGI server would, while a reader process keeps re-reading it.
+The run fails if any write is lost, if two writes get the same revision, or
+if a reader ever sees a partial or empty store.
+
+Example:
+    python scripts/stress_test_storage.py --processes 16 --writes 200
+    python scripts/stress_test_storage.py --backend sqlite
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from link_storage import open_backend  # noqa: E402
+
+
+def page_url(worker: int, index: int) -> str:
+    return f"https://docs.dynatrace.com/docs/stress/{worker}/{index}"
+
+
+def open_store(backend: str, path: str):
+    if backend == 'json':
+        return open_backend('json', path, shared=True)
+    return open_backend(backend, path)
+
+
+def writer(backend: str, path: str, worker: int, writes: int) -> list:
+    """Write ``writes`` distinct pages and check the store never shrinks."""
+    store = open_store(backend, path)
+    errors = []
+    for i in range(writes):
+        store.set(page_url(worker, i), [{'url': f"https://intranet/{worker}/{i}",
+                                          'name': f"link {i}", 'description': ''}])
+        if i % 10 == 0:
+            mine = [u for u in store.all() if u.startswith(page_url(worker, ''))]
+            if len(mine) != i + 1:
+                errors.append(f"worker {worker}: saw {len(mine)} of its {i + 1} pages")
+    store.close()
+    return errors
+
+
+def reader(backend: str, path: str, stop, result) -> None:
+    """Re-read the store until told to stop; its size must never go down."""
+    store = open_store(backend, path)
+    errors = []
+    reads = 0
+    last = 0
+    while not stop.is_set():
+        if backend == 'json' and Path(path).exists():
+            # Parse the raw file as well: atomic renames mean it is always complete.
+            try:
+                with open(path) as f:
+                    json.load(f)
+            except ValueError as e:
+                errors.append(f"partial file observed: {e}")
+        size = len(store.all())
+        if size < last:
+            errors.append(f"store shrank from {last} to {size} entries")
+        last = size
+        reads += 1
+    store.close()
+    result.put((reads, errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hammer a link store from many processes')
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--processes', type=int, default=8, help='Number of writer processes')
+    parser.add_argument('--writes', type=int, default=100, help='Writes per process')
+    parser.add_argument('--data-file', help='Store location (default: a temporary file)')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    path = args.data_file or str(Path(tmpdir.name) / f"stress_links.{args.backend}")
+
+    stop = multiprocessing.Event()
+    result = multiprocessing.Queue()
+    read_proc = multiprocessing.Process(target=reader, args=(args.backend, path, stop, result))
+    read_proc.start()
+
+    start_time = time.time()
+    with multiprocessing.Pool(args.processes) as pool:
+        jobs = [pool.apply_async(writer, (args.backend, path, w, args.writes))
+                for w in range(args.processes)]
+        errors = [err for job in jobs for err in job.get()]
+    elapsed = time.time() - start_time
+
+    stop.set()
+    reads, read_errors = result.get()
+    read_proc.join()
+    errors.extend(read_errors)
+
+    store = open_store(args.backend, path)
+    expected = args.processes * args.writes
+    data = store.all()
+    missing = [page_url(w, i) for w in range(args.processes) for i in range(args.writes)
+               if page_url(w, i) not in data]
+    if missing:
+        errors.append(f"{len(missing)} writes lost, e.g. {missing[0]}")
+    if store.revision() != expected:
+        errors.append(f"revision is {store.revision()}, expected {expected}")
+    revisions = {store.url_revision(url) for url in data}
+    if len(revisions) != len(data):
+        errors.append("several writes were given the same revision")
+    store.close()
+    tmpdir.cleanup()
+
+    print(f"Backend: {args.backend}")
+    print(f"Writes: {expected} from {args.processes} processes in {elapsed:.1f}s "
+          f"({expected / elapsed:.0f}/s)")
+    print(f"Concurrent full reads: {reads}")
+    if errors:
+        print(f"FAILED with {len(errors)} errors:")
+        for err in errors[:20]:
+            print(f"  - {err}")
+        sys.exit(1)
+    print("OK: no lost writes, no duplicate revisions, no partial reads")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,164 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import json
-from pathlib import Path
+import argparse
+import atexit
+import signal
+import sys
+import time
+
+from link_metrics import CONTENT_TYPE, REQUEST_SECONDS, REQUESTS, render, watch_store
+from link_storage import StoreError, migrate_json, open_backend_from_env
+from link_streams import (CHUNK_SIZE, IMPORT_BATCH_SIZE, JSON_TYPE, NDJSON_TYPE, NdjsonDecoder,
+                          NdjsonError, compress_chunks, export_format, is_link_store,
+                          iter_export, make_etag, negotiate_encoding)
 
 app = Flask(__name__)
-CORS(app)
+# Expose the revision headers so the page can read them cross-origin.
+CORS(app, expose_headers=['ETag', 'X-Links-Revision'])
 
-DATA_FILE = Path('stored_links.json')
+store = open_backend_from_env()
+atexit.register(store.close)
+watch_store(store)
 
-def read_store():
-    if DATA_FILE.is_file():
-        try:
-            with DATA_FILE.open() as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    # Label by route pattern, not by URL, to keep the number of series bounded.
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, route=route)
+    return response
+
+def versioned(payload, revision, etag_revision=None):
+    """Build a JSON response tagged with the store revision.
 
-def write_store(store):
-    with DATA_FILE.open('w') as f:
-        json.dump(store, f)
+    ``etag_revision`` is the revision the response body depends on; when the
+    client already holds it (``If-None-Match``) a bodiless 304 is returned.
+    """
+    headers = {'X-Links-Revision': str(revision)}
+    if etag_revision is not None:
+        etag = make_etag(store.epoch(), etag_revision)
+        headers['ETag'] = etag
+        if request.if_none_match.contains(etag.strip('"')):
+            return Response(status=304, headers=headers)
+    response = jsonify(payload() if callable(payload) else payload)
+    response.headers.update(headers)
+    return response
 
 @app.route('/links/<path:url>', methods=['GET'])
 def get_links(url):
-    store = read_store()
-    return jsonify(store.get(url, []))
+    revision = store.revision()
+    return versioned(lambda: store.get(url), revision, store.url_revision(url))
 
 @app.route('/links/<path:url>', methods=['POST'])
 def save_links(url):
-    store = read_store()
-    store[url] = request.get_json(force=True, silent=True) or []
-    write_store(store)
-    return jsonify({'status': 'ok'})
+    links = request.get_json(force=True, silent=True)
+    if not isinstance(links, list):
+        return jsonify({'error': 'expected a JSON array of links'}), 400
+    revision = store.set(url, links)
+    return jsonify({'status': 'ok', 'revision': revision})
+
+@app.route('/links/batch', methods=['POST'])
+def get_links_batch():
+    payload = request.get_json(force=True, silent=True) or {}
+    urls = payload.get('urls') if isinstance(payload, dict) else payload
+    if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+        return jsonify({'error': 'expected {"urls": [...]}'}), 400
+    revision = store.revision()
+    return versioned(store.get_many(urls), revision)
+
+@app.route('/links/changes', methods=['GET'])
+def get_changes():
+    since = request.args.get('since', 0, type=int)
+    revision, changes = store.changes(since)
+    if since > revision:
+        # The client saw a newer store than this one (e.g. the data file was
+        # reset), so send everything and let it start over.
+        return versioned({'revision': revision, 'changes': store.all(), 'reset': True}, revision)
+    return versioned({'revision': revision, 'changes': changes}, revision)
 
 @app.route('/links', methods=['GET'])
 def get_all():
-    return jsonify(read_store())
+    """Stream the whole store as JSON or NDJSON, compressed if accepted."""
+    revision = store.revision()
+    fmt = export_format(request.args.get('format'), request.headers.get('Accept', ''))
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    # Every format/encoding pair is its own representation with its own ETag.
+    variant = ''.join(f'-{part}' for part in (fmt, encoding) if part and part != 'json')
+    etag = make_etag(store.epoch(), revision, variant)
+    headers = {'X-Links-Revision': str(revision), 'ETag': etag, 'Vary': 'Accept, Accept-Encoding'}
+    if request.if_none_match.contains(etag.strip('"')):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    body = compress_chunks(iter_export(store.iter_items(), fmt), encoding)
+    return Response(stream_with_context(body), headers=headers,
+                    mimetype=NDJSON_TYPE if fmt == 'ndjson' else JSON_TYPE)
 
 @app.route('/links', methods=['POST'])
 def save_all():
-    store = request.get_json(force=True, silent=True) or {}
-    write_store(store)
-    return jsonify({'status': 'ok'})
+    if request.mimetype == NDJSON_TYPE:
+        return import_ndjson()
+    payload = request.get_json(force=True, silent=True)
+    if not is_link_store(payload):
+        return jsonify({'error': 'expected {"<page url>": [...], ...}'}), 400
+    revision = store.replace(payload)
+    return jsonify({'status': 'ok', 'revision': revision})
+
+def import_ndjson():
+    """Merge an NDJSON upload into the store while it streams in.
+
+    Unlike a JSON import this does not replace the store: URLs that are not
+    in the upload keep their links. Entries are merged in batches, so memory
+    use does not depend on the size of the upload.
+    """
+    revision = store.revision()
+    imported = 0
+    batch = {}
+    try:
+        decoder = NdjsonDecoder(request.headers.get('Content-Encoding'))
+        while True:
+            chunk = request.stream.read(CHUNK_SIZE)
+            batch.update(decoder.feed(chunk) if chunk else decoder.finish())
+            if batch and (len(batch) >= IMPORT_BATCH_SIZE or not chunk):
+                revision = store.merge(batch)
+                imported += len(batch)
+                batch = {}
+            if not chunk:
+                break
+    except NdjsonError as e:
+        return jsonify({'error': str(e), 'imported': imported, 'revision': revision}), 400
+    return jsonify({'status': 'ok', 'imported': imported, 'revision': revision})
+
+@app.route('/metrics')
+def metrics():
+    return Response(render(), content_type=CONTENT_TYPE)
 
 @app.route('/ping')
 def ping():
     return 'pong'
 
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve internal links for the docs hierarchy page")
+    parser.add_argument('--port', type=int, default=5000, help='Port to listen on')
+    parser.add_argument('--migrate-from', metavar='JSON_FILE',
+                        help='Import an existing stored_links.json into the configured backend and exit')
+    args = parser.parse_args()
+
+    if args.migrate_from:
+        try:
+            count = migrate_json(args.migrate_from, store)
+        except (OSError, ValueError, StoreError) as e:
+            raise SystemExit(f"Migration failed: {e}")
+        print(f"Migrated {count} pages into {store.path}")
+        return
+
+    # Turn SIGTERM into a normal exit so the atexit flush still runs.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    app.run(port=args.port)
+
 if __name__ == '__main__':
-    app.run(port=5000)
+    main()
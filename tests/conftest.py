@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / 'scripts')]
+
+# Both servers open the configured store when they are imported. Point it at
+# a scratch file so importing them never touches stored_links.json; the
+# tests swap in their own backends.
+os.environ['STORAGE_BACKEND'] = 'json'
+os.environ['STORAGE_DATA_FILE'] = os.path.join(tempfile.mkdtemp(), 'stored_links.json')
+
+from link_storage import open_backend  # noqa: E402
+
+BACKENDS = ['json', 'sqlite', 'journal']
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    """Open backends by name in ``tmp_path`` and close them after the test."""
+    opened = []
+
+    def open_(kind, name=None):
+        store = open_backend(kind, str(tmp_path / (name or f'links.{kind}')))
+        opened.append(store)
+        return store
+
+    yield open_
+    for store in opened:
+        store.close()
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, open_store):
+    return open_store(request.param)
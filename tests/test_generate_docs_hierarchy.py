@@ -0,0 +1,225 @@
+import json
+import os
+import sys
+
+import pytest
+
+import generate_docs_hierarchy as gdh
+from conftest import ROOT
+
+TAXONOMY = json.loads((ROOT / 'dynatrace_fast_taxonomy.json').read_text(encoding='utf-8'))
+
+# Shapes the generator must cope with besides a crawled taxonomy.
+ODD_TAXONOMIES = [
+    {},
+    {'structure': {}},
+    {'metadata': {'base_url': 'https://d/docs'}, 'structure': {'ü': {'title': 'Ünïcode "q"'}}},
+    {'structure': [1, 2]},
+    {'structure': {'a': None, 'b': {'pages': [], 'subsections': {}}}, 'extra': [1.5, None]},
+    [1, {'structure': {}}],
+    'plain string',
+]
+
+
+@pytest.mark.parametrize('data', [TAXONOMY] + ODD_TAXONOMIES)
+@pytest.mark.parametrize('separators', [(', ', ': '), (',', ':')])
+def test_iter_taxonomy_json_matches_json_dumps(data, separators):
+    assert ''.join(gdh.iter_taxonomy_json(data, separators)) == json.dumps(data, separators=separators)
+
+
+def test_iter_taxonomy_json_yields_one_piece_per_section():
+    pieces = list(gdh.iter_taxonomy_json(TAXONOMY))
+    assert len(pieces) >= len(TAXONOMY['structure']) + 2
+
+
+# Pages generated from the sample taxonomy, frozen so that the streamed
+# output is checked against known bytes rather than against itself. The
+# streaming writer was checked byte for byte against the single-string
+# build_html it replaced. After a deliberate change to the page, regenerate
+# them with
+#   UPDATE_EXPECTED_PAGES=1 python -m pytest tests/test_generate_docs_hierarchy.py
+EXPECTED_PAGES = ROOT / 'tests' / 'fixtures'
+PAGE_VARIANTS = {
+    'page.html': lambda: gdh.iter_html(TAXONOMY),
+    'page_server.html': lambda: gdh.iter_html(
+        TAXONOMY, server_url='http://localhost:5000',
+        search_index_url='page.search.0123456789abcdef.js', service_worker_url='page.sw.js'),
+    'page_compact.html': lambda: gdh.iter_html(gdh.encode_compact(TAXONOMY)),
+}
+
+
+@pytest.mark.parametrize('name', PAGE_VARIANTS)
+def test_streamed_page_matches_frozen_page(tmp_path, name):
+    if os.environ.get('UPDATE_EXPECTED_PAGES'):
+        EXPECTED_PAGES.mkdir(exist_ok=True)
+        gdh.write_if_changed(EXPECTED_PAGES / name, PAGE_VARIANTS[name]())
+    output = tmp_path / name
+    assert gdh.write_if_changed(output, PAGE_VARIANTS[name]())
+    assert output.read_bytes() == (EXPECTED_PAGES / name).read_bytes()
+    # Writing the same bytes again leaves the file alone.
+    mtime = output.stat().st_mtime_ns
+    assert not gdh.write_if_changed(output, PAGE_VARIANTS[name]())
+    assert output.stat().st_mtime_ns == mtime
+    assert [p.name for p in tmp_path.iterdir()] == [name]
+
+
+def decode_compact(raw):
+    """Python transcription of the page's decodeTaxonomy."""
+    if not isinstance(raw, dict) or raw.get('format') != gdh.COMPACT_FORMAT:
+        return raw
+    tabled = set(raw['tabled'])
+
+    def decode_pages(columns):
+        if not isinstance(columns, dict):
+            return columns
+        names = list(columns)
+        count = len(columns[names[0]]) if names else 0
+        pages = []
+        for i in range(count):
+            page = {}
+            for name in names:
+                value = columns[name][i]
+                if name == 'url':
+                    value = raw['base'] + value
+                elif name in tabled and isinstance(value, int):
+                    value = raw['strings'][value]
+                page[name] = value
+            pages.append(page)
+        return pages
+
+    def decode_section(section):
+        if not isinstance(section, dict):
+            return section
+        decoded = {}
+        for key, value in section.items():
+            if key == 'pages':
+                decoded[key] = decode_pages(value)
+            elif key == 'subsections' and isinstance(value, dict):
+                decoded[key] = {k: decode_section(sub) for k, sub in value.items()}
+            else:
+                decoded[key] = value
+        return decoded
+
+    return {key: ({k: decode_section(s) for k, s in value.items()}
+                  if key == 'structure' and isinstance(value, dict) else value)
+            for key, value in raw.items() if key not in ('format', 'base', 'tabled', 'strings')}
+
+
+BASE = 'https://docs.example.com/docs'
+MIXED = {
+    'metadata': {'base_url': BASE},
+    'structure': {
+        'uniform': {'title': 'Uniform', 'pages': [
+            {'url': BASE, 'title': 'Home', 'description': 'No description available', 'depth': 0},
+            {'url': BASE + '/a?x=1', 'title': 'A', 'description': 'No description available', 'depth': 1},
+        ], 'subsections': {
+            'deep': {'title': 'Deep', 'pages': [
+                {'url': BASE + '/a/b#c', 'title': 'Home', 'description': 'Other', 'depth': 2},
+            ], 'subsections': {}},
+        }},
+        'outside': {'title': 'Outside base', 'pages': [
+            {'url': 'https://elsewhere/x', 'title': 'X', 'description': 'Other', 'depth': 1},
+            {'url': BASE + 'suffix', 'title': 'Y', 'description': 'Other', 'depth': 1},
+        ]},
+        'ragged': {'title': 'Ragged', 'pages': [
+            {'url': BASE + '/r', 'title': 'R'},
+            {'title': 'No url', 'url': BASE + '/s'},
+            {'url': BASE + '/t', 'title': 'T', 'h2_headings': ['One', 'Two']},
+        ]},
+        'typed': {'title': 'Typed', 'pages': [
+            {'url': BASE + '/n', 'title': 3, 'description': None},
+            {'url': BASE + '/m', 'title': 'No description available', 'description': None},
+        ]},
+        'empty': {'title': 'Empty', 'pages': []},
+        'none': None,
+    },
+}
+
+
+@pytest.mark.parametrize('data', [TAXONOMY, MIXED] + ODD_TAXONOMIES)
+def test_encode_compact_decodes_to_the_original(data):
+    assert decode_compact(gdh.encode_compact(data)) == data
+
+
+def test_encode_compact_shrinks_the_sample_taxonomy():
+    compact = gdh.encode_compact(TAXONOMY)
+    assert compact['base'] == TAXONOMY['metadata']['base_url']
+    assert len(json.dumps(compact, separators=(',', ':'))) < len(json.dumps(TAXONOMY, separators=(',', ':')))
+
+
+def test_page_decoder_restores_the_original(tmp_path):
+    """Run the decoder embedded in the page itself."""
+    import shutil
+    import subprocess
+
+    node = shutil.which('node')
+    if node is None:
+        pytest.skip('node is not installed')
+    html = gdh.build_html(gdh.encode_compact(MIXED))
+    start = html.index('function decodeTaxonomy(raw)')
+    decoder = html[start:html.index('\nconst rawTaxonomy', start)]
+    script = tmp_path / 'decode.js'
+    script.write_text(decoder + "\nconst raw = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+                      "\nprocess.stdout.write(JSON.stringify(decodeTaxonomy(raw)));\n")
+    for data in (MIXED, TAXONOMY):
+        encoded = json.dumps(gdh.encode_compact(data))
+        result = subprocess.run([node, str(script)], input=encoded, capture_output=True,
+                                text=True, check=True)
+        assert json.loads(result.stdout) == data
+
+
+def test_write_asset_leaves_no_partial_file(tmp_path, monkeypatch):
+    def full_disk(*args):
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(gdh.os, 'replace', full_disk)
+    with pytest.raises(OSError):
+        gdh.write_asset(tmp_path, 'index', 'json', b'{"sections": []}')
+    assert list(tmp_path.iterdir()) == []
+    monkeypatch.undo()
+    name = gdh.write_asset(tmp_path, 'index', 'json', b'{"sections": []}')
+    assert [p.name for p in tmp_path.iterdir()] == [name]
+    assert (tmp_path / name).read_bytes() == b'{"sections": []}'
+
+
+def build(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['generate_docs_hierarchy.py', *map(str, args)])
+    gdh.main()
+
+
+def stamped_assets(output):
+    stamp = json.loads(gdh.stamp_path(output).read_text(encoding='utf-8'))
+    return {(output.parent / name).resolve() for name in stamp['assets']}
+
+
+def test_prune_keeps_other_pages_in_a_shared_shard_dir(tmp_path, monkeypatch):
+    taxonomy, shards = tmp_path / 'taxonomy.json', tmp_path / 'shards'
+    taxonomy.write_text(json.dumps(TAXONOMY))
+    first, second = tmp_path / 'first.html', tmp_path / 'second.html'
+    build(monkeypatch, '--taxonomy', taxonomy, '--output', first, '--shard-dir', shards)
+    build(monkeypatch, '--taxonomy', taxonomy, '--output', second, '--shard-dir', shards,
+          '--prune')
+    assert stamped_assets(first) <= set(shards.iterdir())
+
+    changed = json.loads(json.dumps(TAXONOMY))
+    next(iter(changed['structure'].values()))['title'] += ' (renamed)'
+    taxonomy.write_text(json.dumps(changed))
+    old_first = stamped_assets(first)
+    build(monkeypatch, '--taxonomy', taxonomy, '--output', first, '--shard-dir', shards, '--prune')
+    remaining = set(shards.iterdir())
+    assert stamped_assets(second) <= remaining
+    assert stamped_assets(first) <= remaining
+    # Only the first page's replaced files are gone.
+    assert remaining == stamped_assets(first) | stamped_assets(second)
+    assert old_first - stamped_assets(first) and not (old_first - stamped_assets(first)) & remaining
+
+
+@pytest.mark.parametrize('name, payload', [
+    ('page.html', json.dumps(TAXONOMY)),
+    ('page_server.html', json.dumps(TAXONOMY)),
+    ('page_compact.html', json.dumps(gdh.encode_compact(TAXONOMY), separators=(',', ':'))),
+])
+def test_frozen_pages_embed_the_taxonomy_as_json_dumps(name, payload):
+    page = (EXPECTED_PAGES / name).read_text(encoding='utf-8')
+    start = page.index('<script id="taxonomy-data" type="application/json">') + len(
+        '<script id="taxonomy-data" type="application/json">')
+    assert page[start:page.index('</script>', start)] == payload
@@ -0,0 +1,216 @@
+import json
+import sqlite3
+
+import pytest
+
+from link_storage import SqliteBackend, StoreError, migrate_json
+
+# Links as the page writes them, plus shapes the server accepts from other
+# clients; every backend must hand them back unchanged.
+LINKS = [
+    {'url': 'https://wiki/a', 'name': 'A', 'description': 'first'},
+    {'url': 'https://wiki/b', 'name': '', 'description': '', 'tags': ['x', 'y'], 'pinned': True},
+    'https://wiki/legacy',
+    1,
+    [None, {'nested': 1.5}],
+]
+
+
+def test_links_round_trip_unchanged(store):
+    store.set('https://docs/page', LINKS)
+    assert store.get('https://docs/page') == LINKS
+    assert store.get_many(['https://docs/page', 'https://docs/none']) == {
+        'https://docs/page': LINKS, 'https://docs/none': []}
+    assert store.all() == {'https://docs/page': LINKS}
+    assert dict(store.iter_items()) == {'https://docs/page': LINKS}
+
+
+def test_links_survive_reopen(open_store, store):
+    kind = store.name
+    store.set('https://docs/a', LINKS)
+    store.merge({'https://docs/b': LINKS[:1]})
+    revision = store.revision()
+    store.close()
+    reopened = open_store(kind)
+    assert reopened.all() == {'https://docs/a': LINKS, 'https://docs/b': LINKS[:1]}
+    assert reopened.revision() == revision
+    assert reopened.url_revision('https://docs/a') == revision - 1
+
+
+def test_epoch_is_kept_on_reopen_and_new_per_store(open_store, store):
+    kind, epoch = store.name, store.epoch()
+    store.set('a', LINKS[:1])
+    store.close()
+    assert open_store(kind).epoch() == epoch
+    assert open_store(kind, name='other').epoch() != epoch
+
+
+def test_epoch_is_added_to_files_written_without_one(tmp_path, open_store):
+    (tmp_path / 'links.json').write_text(json.dumps({'a': LINKS[:1]}))
+    store = open_store('json')
+    epoch = store.epoch()
+    store.set('b', LINKS[:1])
+    store.close()
+    assert open_store('json').epoch() == epoch
+
+
+def test_every_write_bumps_the_revision(store):
+    assert store.revision() == 0
+    assert store.set('a', LINKS[:1]) == 1
+    assert store.merge({'b': LINKS[:1], 'c': LINKS[:2]}) == 2
+    assert store.replace({'a': LINKS}) == 3
+    assert [store.url_revision(url) for url in 'abcd'] == [3, 3, 3, 0]
+
+
+def test_merge_leaves_other_urls(store):
+    store.replace({'a': LINKS[:1], 'b': LINKS[:2]})
+    store.merge({'b': [], 'c': LINKS[:1]})
+    assert {url: links for url, links in store.all().items() if links} == {
+        'a': LINKS[:1], 'c': LINKS[:1]}
+
+
+def test_changes_report_writes_and_removals(store):
+    store.set('a', LINKS[:1])
+    since = store.revision()
+    store.set('b', LINKS[:2])
+    assert store.changes(since) == (since + 1, {'b': LINKS[:2]})
+    # A replace reports the URLs it dropped as emptied.
+    store.replace({'c': LINKS[:1]})
+    assert store.changes(since) == (since + 2, {'a': [], 'b': [], 'c': LINKS[:1]})
+
+
+def test_is_empty_and_stats(store):
+    assert store.is_empty()
+    store.set('a', LINKS)
+    store.set('b', [])
+    assert not store.is_empty()
+    assert store.stats()['entries'] == 1
+
+
+def test_migrate_json_keeps_every_field(tmp_path, open_store):
+    source = tmp_path / 'stored_links.json'
+    source.write_text(json.dumps({'https://docs/a': LINKS}))
+    target = open_store('sqlite')
+    assert migrate_json(source, target) == 1
+    assert target.get('https://docs/a') == LINKS
+    with pytest.raises(ValueError):
+        migrate_json(source, target)
+
+
+@pytest.mark.parametrize('content', [[], ['https://docs/a'], 'links', {'version': 2, 'links': []}])
+def test_files_that_are_not_link_stores_are_refused(tmp_path, open_store, content):
+    data = json.dumps(content)
+    json_file = tmp_path / 'links.json'
+    snapshot = tmp_path / 'links.snapshot.json'
+    for path in (json_file, snapshot):
+        path.write_text(data)
+    with pytest.raises(StoreError, match='not a link store'):
+        open_store('json')
+    with pytest.raises(StoreError, match='not a link store'):
+        open_store('journal')
+    with pytest.raises(StoreError, match='not a link store'):
+        migrate_json(json_file, open_store('sqlite'))
+    # Nothing was flushed over the user's files.
+    assert json_file.read_text() == data
+    assert snapshot.read_text() == data
+
+
+def test_sqlite_upgrades_column_layout(tmp_path):
+    path = tmp_path / 'old.db'
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE links (
+            page_url TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            name TEXT NOT NULL DEFAULT '',
+            description TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (page_url, position)
+        ) WITHOUT ROWID;
+        INSERT INTO links VALUES ('p', 0, 'https://wiki/a', 'A', ''), ('p', 1, 'https://wiki/b', '', 'd');
+    """)
+    conn.commit()
+    conn.close()
+    store = SqliteBackend(path)
+    try:
+        assert store.get('p') == [{'url': 'https://wiki/a', 'name': 'A', 'description': ''},
+                                  {'url': 'https://wiki/b', 'name': '', 'description': 'd'}]
+        store.set('q', LINKS)
+        assert store.get('q') == LINKS
+    finally:
+        store.close()
+
+
+
+def crash(journal):
+    """Stop a journal backend the way a killed process would: no compaction."""
+    journal.compact = lambda: None
+    journal._closed = True
+    journal._wakeup.set()
+    journal._compactor.join()
+    journal._journal.close()
+
+
+def test_journal_drops_torn_last_record(open_store):
+    store = open_store('journal')
+    store.set('a', LINKS[:1])
+    store.set('b', LINKS[:2])
+    crash(store)
+    with store.path.open('ab') as f:
+        f.write(b'{"revision": 3, "op": "merge", "entr')
+
+    replayed = open_store('journal')
+    assert replayed.all() == {'a': LINKS[:1], 'b': LINKS[:2]}
+    assert replayed.revision() == 2
+    # The torn bytes are cut off so the next append starts a clean line.
+    replayed.set('c', LINKS[:1])
+    assert replayed.path.read_bytes().count(b'\n') == 3
+    assert json.loads(replayed.path.read_bytes().splitlines()[-1])['revision'] == 3
+
+
+def test_journal_rejects_corruption_before_the_last_record(open_store):
+    store = open_store('journal')
+    store.set('a', LINKS[:1])
+    crash(store)
+    store.path.write_bytes(b'not json\n' + store.path.read_bytes())
+    with pytest.raises(StoreError):
+        open_store('journal')
+
+
+def test_journal_replays_on_top_of_snapshot(open_store):
+    store = open_store('journal')
+    store.set('a', LINKS[:1])
+    store.compact()
+    store.set('b', LINKS[:2])
+    store.replace({'b': LINKS})
+    crash(store)
+    assert store.snapshot_path.is_file()
+
+    replayed = open_store('journal')
+    assert replayed.all() == {'b': LINKS}
+    assert replayed.revision() == 3
+    assert replayed.changes(1) == (3, {'a': [], 'b': LINKS})
+
+
+def test_journal_keeps_working_after_a_failed_compaction(open_store, monkeypatch):
+    import link_storage
+
+    store = open_store('journal')
+    store.set('a', LINKS[:1])
+
+    def no_space(path, write, binary=False):
+        if path == store.path:
+            raise OSError(28, 'No space left on device')
+        return real_atomic_write(path, write, binary)
+    real_atomic_write = link_storage.atomic_write
+    monkeypatch.setattr(link_storage, 'atomic_write', no_space)
+    with pytest.raises(OSError):
+        store.compact()
+    monkeypatch.undo()
+
+    store.set('b', LINKS[:2])
+    store.merge({'c': LINKS[:1]})
+    assert store.revision() == 3
+    crash(store)
+    replayed = open_store('journal')
+    assert replayed.all() == {'a': LINKS[:1], 'b': LINKS[:2], 'c': LINKS[:1]}
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip('bs4')
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import benchmark_page_extraction as reference  # noqa: E402
+import page_extract  # noqa: E402
+
+PAGES = sorted(reference.FIXTURES.glob('*.html'))
+PARSERS = ['html.parser'] + (['lxml'] if page_extract.etree is not None else [])
+
+
+@pytest.mark.parametrize('parser', PARSERS)
+@pytest.mark.parametrize('path', PAGES, ids=lambda path: path.name)
+def test_single_pass_matches_reference_extractors(path, parser):
+    html = path.read_text(encoding='utf-8')
+    soup = BeautifulSoup(html, 'html.parser')
+    fields = reference.single_pass(html, stdlib=parser == 'html.parser')
+    assert reference.mismatches(soup, fields) == []
+    # mismatches compares links as a set; the scraper relies on no duplicates.
+    assert len(fields.links) == len(set(fields.links))
+
+
+def test_fixtures_are_present():
+    assert len(PAGES) >= 4
@@ -0,0 +1,209 @@
+"""Run the same requests against the Flask and the ASGI server."""
+import asyncio
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+
+import async_storage_server  # noqa: E402
+import storage_server  # noqa: E402
+from conftest import BACKENDS  # noqa: E402
+
+
+class FlaskClient:
+    def __init__(self):
+        self.client = storage_server.app.test_client()
+
+    def request(self, method, path, body=b'', headers=None):
+        response = self.client.open(path, method=method, data=body, headers=headers or {})
+        return (response.status_code, {k.lower(): v for k, v in response.headers.items()},
+                response.get_data())
+
+
+class AsgiClient:
+    def request(self, method, path, body=b'', headers=None):
+        return asyncio.run(self._request(method, path, body, headers or {}))
+
+    async def _request(self, method, path, body, headers):
+        path, _, query = path.partition('?')
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+                 'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+        # Deliver the body in two parts to exercise the streaming import.
+        half = len(body) // 2
+        messages = [{'type': 'http.request', 'body': body[:half], 'more_body': True},
+                    {'type': 'http.request', 'body': body[half:]}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await async_storage_server.app(scope, receive, send)
+        start = sent[0]
+        return (start['status'], {k.decode(): v.decode() for k, v in start['headers']},
+                b''.join(message.get('body', b'') for message in sent[1:]))
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, open_store):
+    return open_store(request.param)
+
+
+@pytest.fixture(params=['flask', 'asgi'])
+def server(request, store, monkeypatch):
+    module = storage_server if request.param == 'flask' else async_storage_server
+    monkeypatch.setattr(module, 'store', store)
+    return FlaskClient() if request.param == 'flask' else AsgiClient()
+
+
+def post_json(server, path, payload):
+    return server.request('POST', path, json.dumps(payload).encode(),
+                          {'Content-Type': 'application/json'})
+
+
+def post_ndjson(server, body, headers=None):
+    return server.request('POST', '/links', body,
+                          {'Content-Type': 'application/x-ndjson', **(headers or {})})
+
+
+LINKS = [{'url': 'https://wiki/a', 'name': 'A', 'description': '', 'tags': ['x']}]
+
+
+def test_save_and_get_page(server, store):
+    status, _, body = post_json(server, '/links/https://docs/a', LINKS)
+    assert status == 200
+    assert json.loads(body) == {'status': 'ok', 'revision': 1}
+    status, headers, body = server.request('GET', '/links/https://docs/a')
+    assert status == 200
+    assert json.loads(body) == LINKS
+    assert headers['x-links-revision'] == '1'
+    assert headers['etag'] == f'"{store.epoch():x}-r1"'
+
+
+def test_page_etag_answers_304_until_the_page_changes(server):
+    post_json(server, '/links/https://docs/a', LINKS)
+    _, headers, _ = server.request('GET', '/links/https://docs/a')
+    status, _, body = server.request('GET', '/links/https://docs/a',
+                                     headers={'If-None-Match': headers['etag']})
+    assert (status, body) == (304, b'')
+    # Writes to other pages keep this page's ETag.
+    post_json(server, '/links/https://docs/b', LINKS)
+    status, _, _ = server.request('GET', '/links/https://docs/a',
+                                  headers={'If-None-Match': headers['etag']})
+    assert status == 304
+    post_json(server, '/links/https://docs/a', [])
+    status, _, body = server.request('GET', '/links/https://docs/a',
+                                     headers={'If-None-Match': headers['etag']})
+    assert (status, json.loads(body)) == (200, [])
+
+
+def test_export_etag_depends_on_format_and_encoding(server):
+    post_json(server, '/links/https://docs/a', LINKS)
+    _, plain, body = server.request('GET', '/links')
+    assert json.loads(body) == {'https://docs/a': LINKS}
+    _, zipped, body = server.request('GET', '/links?format=ndjson',
+                                     headers={'Accept-Encoding': 'gzip'})
+    assert zipped['content-encoding'] == 'gzip'
+    assert [json.loads(line) for line in gzip.decompress(body).splitlines()] == [
+        {'url': 'https://docs/a', 'links': LINKS}]
+    assert plain['etag'] != zipped['etag']
+    status, _, _ = server.request('GET', '/links', headers={'If-None-Match': plain['etag']})
+    assert status == 304
+    post_json(server, '/links/https://docs/b', LINKS)
+    status, _, _ = server.request('GET', '/links', headers={'If-None-Match': plain['etag']})
+    assert status == 200
+
+
+def test_etags_do_not_match_across_stores(server, store, open_store, monkeypatch):
+    post_json(server, '/links/https://docs/a', LINKS)
+    _, page, _ = server.request('GET', '/links/https://docs/a')
+    _, export, _ = server.request('GET', '/links')
+    # A re-created store at the same revision holds different links.
+    other = open_store(store.name, name='recreated')
+    monkeypatch.setattr(storage_server, 'store', other)
+    monkeypatch.setattr(async_storage_server, 'store', other)
+    post_json(server, '/links/https://docs/a', [])
+    status, _, body = server.request('GET', '/links/https://docs/a',
+                                     headers={'If-None-Match': page['etag']})
+    assert (status, json.loads(body)) == (200, [])
+    status, _, _ = server.request('GET', '/links', headers={'If-None-Match': export['etag']})
+    assert status == 200
+
+
+def test_batch_and_changes(server):
+    post_json(server, '/links', {'https://docs/a': LINKS, 'https://docs/b': LINKS})
+    status, _, body = post_json(server, '/links/batch', {'urls': ['https://docs/a', 'https://docs/c']})
+    assert status == 200
+    assert json.loads(body) == {'https://docs/a': LINKS, 'https://docs/c': []}
+    post_json(server, '/links/https://docs/b', [])
+    status, _, body = server.request('GET', '/links/changes?since=1')
+    assert json.loads(body) == {'revision': 2, 'changes': {'https://docs/b': []}}
+    status, _, body = server.request('GET', '/links/changes?since=7')
+    assert json.loads(body)['reset'] is True
+
+
+def test_ndjson_import_merges(server):
+    post_json(server, '/links', {'https://docs/a': LINKS})
+    lines = b''.join(json.dumps({'url': url, 'links': links}).encode() + b'\n'
+                     for url, links in [('https://docs/b', LINKS), ('https://docs/c', [1, 'x'])])
+    status, _, body = post_ndjson(server, gzip.compress(lines), {'Content-Encoding': 'gzip'})
+    assert status == 200
+    assert json.loads(body)['imported'] == 2
+    _, _, body = server.request('GET', '/links')
+    assert json.loads(body) == {'https://docs/a': LINKS, 'https://docs/b': LINKS,
+                                'https://docs/c': [1, 'x']}
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/links/https://docs/a', b'{"url": "x"}'),
+    ('/links/https://docs/a', b'not json'),
+    ('/links/https://docs/a', b''),
+    ('/links', b'[{"url": "x"}]'),
+    ('/links', b'{"https://docs/a": {"url": "x"}}'),
+    ('/links', b'not json'),
+    ('/links/batch', b'{"urls": "https://docs/a"}'),
+])
+def test_bad_json_bodies_are_rejected(server, path, body):
+    post_json(server, '/links/https://docs/a', LINKS)
+    status, _, response = server.request('POST', path, body, {'Content-Type': 'application/json'})
+    assert status == 400
+    assert 'error' in json.loads(response)
+    _, _, stored = server.request('GET', '/links/https://docs/a')
+    assert json.loads(stored) == LINKS
+
+
+@pytest.mark.parametrize('body, headers', [
+    (b'{"url": "https://docs/b", "links": []}\nnot json\n', {}),
+    (b'{"url": "https://docs/b", "links": {}}\n', {}),
+    (b'["https://docs/b"]\n', {}),
+    (b'\x1f\x8b\x08\x00garbage', {'Content-Encoding': 'gzip'}),
+    (b'{}\n', {'Content-Encoding': 'br'}),
+])
+def test_bad_ndjson_bodies_are_rejected(server, body, headers):
+    status, _, response = post_ndjson(server, body, headers)
+    assert status == 400
+    assert set(json.loads(response)) == {'error', 'imported', 'revision'}
+
+
+def test_unknown_routes(server):
+    assert server.request('GET', '/nothing')[0] == 404
+    assert server.request('DELETE', '/links')[0] == 405
+    assert server.request('GET', '/ping')[2] == b'pong'
+
+
+@pytest.mark.parametrize('error', [RuntimeError('disk on fire'), ValueError('write to closed file'),
+                                   OSError(28, 'No space left on device')])
+def test_backend_failure_is_answered_and_counted(server, store, monkeypatch, error):
+    # Only a malformed body is the client's fault; store errors are a 500.
+    def fail(entries):
+        raise error
+    monkeypatch.setattr(store, 'merge', fail)
+    status, _, _ = post_ndjson(server, b'{"url": "https://docs/a", "links": []}\n')
+    assert status == 500
+    _, _, metrics = server.request('GET', '/metrics')
+    assert 'route="/links",method="POST",status="500"' in metrics.decode()